@@ -7,6 +7,10 @@ sumoNet = "A9.net.xml"
 mqttUpdates = False
 mqttHost = "localhost"
 mqttPort = "1883"
+# quality of service of the published mqtt messages
+mqttQos = 0
+# number of messages of a topic packed into one mqtt payload (a json list if > 1)
+mqttRecordsPerPayload = 1
 
 # should it use kafka for config changes & publishing data (else it uses json file)
 kafkaUpdates = True
@@ -22,12 +26,56 @@ kafkaTopicPlatooningData = "platooning-data"
 # where we receive system changes
 kafkaPlatoonConfigTopic = "platooning-config"
 
+# messages are queued and sent by a background thread (see streaming/KafkaPublisher.py)
+# max number of queued messages and what happens if the queue is full: "block" (wait for the sender),
+# "dropOldest" (discard the oldest message) or "aggregate" (average into the newest message of the same topic)
+publishQueueSize = 10000
+publishOverflowPolicy = "dropOldest"
+# max number of messages the background thread takes from the queue at once
+publishBatchRecords = 500
+
+# batching and compression of the kafka producer
+kafkaLingerMs = 50
+kafkaBatchSize = 65536
+kafkaCompressionType = "gzip"
+
 # Initial wait time before publishing data, should not be changed
 ignore_first_n_results = 350
 
+# Run lifecycle (see simulation/RunLifecycle.py): a run ends as soon as runSampleSize trip durations were collected
+# after the warm-up, the simulation time reaches runMaxSimTime (in seconds), or the half width of the confidence
+# interval (with confidence runConfidence: 0.9, 0.95 or 0.99) of the mean trip duration is at most
+# runRelativeCIWidth times the mean. None disables a condition, the run does not end if all are disabled.
+runSampleSize = None
+runMaxSimTime = None
+runRelativeCIWidth = None
+runConfidence = 0.95
+# the conditions are checked every runCheckInterval steps
+runCheckInterval = 100
+# True: the warm-up is detected with MSER-5 on the trip durations, False: the first ignore_first_n_results are discarded
+detectWarmup = True
+
+# Warm start: the first warmStartSteps steps are simulated once, SUMO's state and the platoon manager are saved
+# in warmStartDir and loaded by later runs with the same network, routes and parameters (see simulation/WarmStart.py)
+warmStart = False
+warmStartSteps = 1000
+warmStartDir = "warmstart"
+
+# Parameter sweeps (see simulation/ParameterSweep.py): the experiments run in parallel worker processes with one SUMO
+# each. sweepWorkers caps the number of concurrent workers (None: one per CPU), sweepPinCPUs pins each worker and
+# its SUMO to one CPU. The results and the working directories of the workers are kept in sweepDir
+sweepWorkers = None
+sweepPinCPUs = False
+sweepDir = "sweep"
+
 # True if we want to use the SUMO GUI
 sumoUseGUI = False
 
+# how simpla talks to SUMO: "traci" (SUMO process connected by a socket), "libsumo" (SUMO runs in this process,
+# no GUI) or "standin" (pure Python stand-in simulating the corridor without SUMO, for profiling and load tests),
+# see sumo/Backend.py. Must be set before the simulation modules are imported
+sumoBackend = "traci"
+
 # startEdgeID & lastEdgeID denotes lower & upper edges, i.e. extreme points of the map
 startEdgeID = "11S"
 lastEdgeID = "23805795"
@@ -3,16 +3,18 @@ import sys
 
 from app.streaming import KafkaConnector
 
-sys.path.append(os.path.join(os.environ.get("SUMO_HOME"), "tools"))
+if "SUMO_HOME" in os.environ:
+    sys.path.append(os.path.join(os.environ.get("SUMO_HOME"), "tools"))
 
 from app.logging import info
 from app.simulation.PlatoonSimulation import PlatoonSimulation
+from app.simulation import WarmStart, ExperimentWorker, ParameterSweep
 from app.streaming import KafkaPublisher
 from colorama import Fore
 from app.sumo import SUMOConnector, SUMODependency
 import app.Config as Config
 import app.simpla
-import traci
+from app.sumo.Backend import traci
 
 def initiateSimulation():
     info('#####################################', Fore.CYAN)
@@ -25,21 +27,60 @@ def initiateSimulation():
     if Config.kafkaUpdates:
         KafkaPublisher.connect()
         KafkaConnector.connect()
+    if Config.mqttUpdates:
+        KafkaPublisher.connectMqtt()
 
     # Check if sumo is installed and available
     SUMODependency.checkDeps()
     info('# SUMO-Dependency check OK!', Fore.GREEN)
-    SUMOConnector.start()
-    info("\n# Starting the simulation!", Fore.GREEN)
 
     current_dir = os.path.abspath(os.path.dirname(__file__))
     file_path = os.path.abspath(os.path.join(current_dir, "map", "simpla.cfg"))
+
+    sumoOptions, snapshot = [], None
+    if Config.warmStart:
+        # the parameters from the file are part of the warm-up
+        PlatoonSimulation.applyFileConfig()
+        sumoOptions, snapshot = WarmStart.prepare(file_path)
+
+    SUMOConnector.start(sumoOptions)
+    info("\n# Starting the simulation!", Fore.GREEN)
+
     platoon_mgr = app.simpla.load(file_path)
-    PlatoonSimulation.start(platoon_mgr)
-    app.simpla.stop()
+    if snapshot is not None:
+        platoon_mgr.restoreSnapshot(snapshot)
+    try:
+        result = PlatoonSimulation.start(platoon_mgr, warmStarted=snapshot is not None)
+    finally:
+        app.simpla.stop()
+        # send the messages which are still queued
+        KafkaPublisher.close()
+        if Config.kafkaUpdates:
+            KafkaConnector.close()
 
     # Simulation ended, so we shutdown
     info(Fore.RED + '# Shutdown' + Fore.RESET)
     traci.close()
     sys.stdout.flush()
-    return None
+    return result
+
+
+# Runs a sequence of experiments (dicts of parameters) for the given number of steps each (until the termination
+# conditions of the run lifecycle are met if steps is None) in one SUMO process,
+# which is reset between the experiments (see simulation/ExperimentWorker.py). Returns the results of all experiments.
+def initiateExperiments(experiments, steps=None):
+    SUMODependency.checkDeps()
+    info('# SUMO-Dependency check OK!', Fore.GREEN)
+    try:
+        return ExperimentWorker.runExperiments(experiments, steps)
+    finally:
+        KafkaPublisher.close()
+
+
+# Runs the experiments (dicts of parameters, see simulation/ParameterSweep.grid()) in parallel worker processes,
+# each with its own SUMO (see simulation/ParameterSweep.py). Returns the results of all experiments, they are also
+# appended to the results file in Config.sweepDir.
+def initiateSweep(experiments, steps=None):
+    SUMODependency.checkDeps()
+    info('# SUMO-Dependency check OK!', Fore.GREEN)
+    return ParameterSweep.run(experiments, steps)
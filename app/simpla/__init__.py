@@ -37,22 +37,26 @@ Notes:
    If your application does so as well, this might have unintended consequences.
 2) Currently, steps of lengths other than DeltaT are not supported (i.e. if traci.simulationStep()
    is called with argument when simpla is running this may yield undesired behaviour).
-3) simpla adds subscriptions to VAR_ROAD_ID, VAR_LANE_INDEX (and currently VAR_LANE_ID) and removes them when stopped
+3) simpla adds subscriptions to all vehicle variables read in its control loop (see _statesync.VEHICLE_VARIABLES)
+   and removes them when stopped
 """
 
 import sys
 import os
+import app.Config as Config
 
 if 'SUMO_HOME' in os.environ:
     tools = os.path.join(os.environ['SUMO_HOME'], 'tools')
     sys.path.append(tools)
-else:
+elif Config.sumoBackend != "standin":
     sys.exit("please declare environment variable 'SUMO_HOME'")
 
-import traci  # noqa
+from app.sumo.Backend import traci  # noqa
 import _config  # noqa
 import _reporting as rp  # noqa
 import _platoonmanager  # noqa
+import _parameters  # noqa
+import _network  # noqa
 import _utils # noqa
 
 warn = rp.Warner("simpla")
@@ -93,6 +97,24 @@ def stop():
     _mgr = None
 
 
+def clearCaches():
+    '''
+    Forgets the cached network properties and vType parameters. These are kept across stop() and load(), such that
+    simpla can be restarted cheaply after the same scenario was reloaded (traci.load). Must be called before
+    load() if a different network or different vTypes are used.
+    '''
+    _network.clear()
+    _platoonmanager.clearVTypeCache()
+
+
+def setParameters(parameters):
+    '''
+    Changes the given runtime parameters (dict: name -> value, see _parameters.PARAMETERS) in Config.parameters and
+    pushes them into the running PlatoonManager. Returns the applied changes.
+    '''
+    return _parameters.update(parameters)
+
+
 def update():
     '''
     Function called each simulation step. Only to be used for SUMO version < 1.0
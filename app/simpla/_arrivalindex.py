@@ -0,0 +1,83 @@
+# Eclipse SUMO, Simulation of Urban MObility; see https://eclipse.org/sumo
+# Copyright (C) 2017-2017 German Aerospace Center (DLR) and others.
+# This program and the accompanying materials
+# are made available under the terms of the Eclipse Public License v2.0
+# which accompanies this distribution, and is available at
+# http://www.eclipse.org/legal/epl-v20.html
+
+# @file    _arrivalindex.py
+# @date    2018-07-09
+# @version $Id$
+
+import numpy as np
+
+from bisect import bisect_right
+
+
+class ArrivalIntervalIndex(object):
+    '''
+    Index of the platoons by arrival edge and position along the corridor, used to find platoons further
+    downstream which a platoon may join. Positions are the driven distances (all platoon vehicles start at
+    the same edge), a platoon's position is the one of its last vehicle. The index is rebuilt in each control step.
+    '''
+
+    def __init__(self, fleet):
+        '''ArrivalIntervalIndex(FleetState) -> ArrivalIntervalIndex
+
+        The vehicles' positions are taken from the given fleet state.
+        '''
+        self._fleet = fleet
+        # map: arrival edge ID -> (positions, lower interval bounds, upper interval bounds, platoon IDs),
+        # each a list sorted by position
+        self._entries = dict()
+        # platoons to be indexed on the next query (see rebuild())
+        self._platoons = None
+
+    def rebuild(self, platoons):
+        '''rebuild(iterable(Platoon)) -> void
+
+        Indexes the given platoons. The index is built on the first query after the call.
+        '''
+        self._platoons = list(platoons)
+
+    def _build(self):
+        platoons = self._platoons
+        self._platoons = None
+        self._entries = dict()
+        if not platoons:
+            return
+        arrivalEdges = np.empty(len(platoons), dtype=object)
+        arrivalEdges[:] = [pltn.getLeader().arrivalEdge for pltn in platoons]
+        intervals = np.array([pltn.getArrivalInterval() for pltn in platoons], dtype=float)
+        platoonIDs = np.array([pltn.getID() for pltn in platoons], dtype=int)
+        lastHandles = np.array([pltn.getVehicles()[-1].state.getHandle() for pltn in platoons], dtype=int)
+        positions = self._fleet.distance[lastHandles]
+        # sort by edge and position, then split into the edges' ranges
+        order = np.lexsort((positions, arrivalEdges))
+        arrivalEdges = arrivalEdges[order]
+        bounds = np.flatnonzero(arrivalEdges[1:] != arrivalEdges[:-1]) + 1
+        for begin, end in zip(np.concatenate(([0], bounds)), np.concatenate((bounds, [len(order)]))):
+            rows = order[begin:end]
+            # stored as lists, the queries only touch a few entries each
+            self._entries[arrivalEdges[begin]] = (positions[rows].tolist(), intervals[rows, 0].tolist(),
+                                                  intervals[rows, 1].tolist(), platoonIDs[rows].tolist())
+
+    def compatiblePlatoons(self, arrivalEdge, arrivalInterval, position, dist):
+        '''compatiblePlatoons(string, tuple(float, float), float, float) -> list(int)
+
+        Returns the IDs of the platoons arriving at the given edge that are located ahead of the given
+        position by at most dist, ordered by their position. If arrivalInterval is given, only platoons
+        whose arrival interval intersects it are returned.
+        '''
+        if self._platoons is not None:
+            self._build()
+        entries = self._entries.get(arrivalEdge)
+        if entries is None:
+            return []
+        positions, lowers, uppers, platoonIDs = entries
+        begin = bisect_right(positions, position)
+        end = bisect_right(positions, position + dist, begin)
+        if arrivalInterval is None:
+            return platoonIDs[begin:end]
+        low, high = arrivalInterval
+        return [platoonIDs[i] for i in range(begin, end) if lowers[i] <= high and uppers[i] >= low]
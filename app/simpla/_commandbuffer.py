@@ -0,0 +1,154 @@
+# Eclipse SUMO, Simulation of Urban MObility; see https://eclipse.org/sumo
+# Copyright (C) 2017-2017 German Aerospace Center (DLR) and others.
+# This program and the accompanying materials
+# are made available under the terms of the Eclipse Public License v2.0
+# which accompanies this distribution, and is available at
+# http://www.eclipse.org/legal/epl-v20.html
+
+# @file    _commandbuffer.py
+# @date    2018-07-06
+# @version $Id$
+
+from app.sumo.Backend import traci
+import _reporting as rp
+
+from app.sumo.Backend import TraCIException
+
+warn = rp.Warner("CommandBuffer")
+report = rp.Reporter("CommandBuffer")
+
+# buffered vehicle attributes in the order in which they are sent
+TYPE = "type"
+SPEED_FACTOR = "speedFactor"
+LANE_CHANGE_MODE = "laneChangeMode"
+LANE = "lane"
+_ATTRIBUTES = (TYPE, SPEED_FACTOR, LANE_CHANGE_MODE, LANE)
+
+# lane change requests expire after the given duration and are therefore not skipped if repeated
+_REPEATABLE = frozenset([LANE])
+
+
+def _sendType(vehID, typeID):
+    traci.vehicle.setType(vehID, typeID)
+
+
+def _sendSpeedFactor(vehID, factor):
+    traci.vehicle.setSpeedFactor(vehID, factor)
+
+
+def _sendLaneChangeMode(vehID, lcMode):
+    traci.vehicle.setLaneChangeMode(vehID, lcMode)
+
+
+def _sendLane(vehID, laneAndDuration):
+    traci.vehicle.changeLane(vehID, laneAndDuration[0], laneAndDuration[1])
+
+
+_SENDERS = {TYPE: _sendType, SPEED_FACTOR: _sendSpeedFactor, LANE_CHANGE_MODE: _sendLaneChangeMode, LANE: _sendLane}
+
+
+class CommandBuffer(object):
+    '''
+    Collects the control commands for the vehicles during a step and sends them in flush(). Only the last value
+    written per vehicle and attribute is sent, and values equal to the one last sent to SUMO are skipped.
+    '''
+
+    def __init__(self):
+        # map: vehicle ID -> (map: attribute -> value), values to be sent in the next flush
+        self._pending = dict()
+        # map: vehicle ID -> (map: attribute -> value), values last sent to SUMO
+        self._sent = dict()
+        # number of commands sent to SUMO and number of writes which were skipped (total and during the last step)
+        self._issued = 0
+        self._suppressed = 0
+        self._lastIssued = 0
+        self._lastSuppressed = 0
+        self._stepIssued = 0
+        self._stepSuppressed = 0
+
+    def setType(self, vehID, typeID):
+        '''setType(string, string) -> void
+        '''
+        self._write(vehID, TYPE, typeID)
+
+    def setSpeedFactor(self, vehID, factor):
+        '''setSpeedFactor(string, double) -> void
+        '''
+        self._write(vehID, SPEED_FACTOR, factor)
+
+    def setLaneChangeMode(self, vehID, lcMode):
+        '''setLaneChangeMode(string, int) -> void
+        '''
+        self._write(vehID, LANE_CHANGE_MODE, lcMode)
+
+    def changeLane(self, vehID, laneIndex, duration):
+        '''changeLane(string, int, int) -> void
+
+        Requests a lane change to the given lane for the given duration [ms].
+        '''
+        self._write(vehID, LANE, (laneIndex, duration))
+
+    def _write(self, vehID, attribute, value):
+        pending = self._pending.setdefault(vehID, dict())
+        if attribute in pending:
+            # overwritten before it was sent
+            self._stepSuppressed += 1
+        pending[attribute] = value
+
+    def setKnownValue(self, vehID, attribute, value):
+        '''setKnownValue(string, string, value) -> void
+
+        Registers a value that the vehicle has in SUMO without a command sent by the buffer (e.g. the vType
+        given at insertion), such that writing the same value does not cause a command.
+        '''
+        self._sent.setdefault(vehID, dict())[attribute] = value
+
+    def forget(self, vehID):
+        '''forget(string) -> void
+
+        Drops pending commands and stored values for the vehicle, e.g., after its arrival.
+        '''
+        self._pending.pop(vehID, None)
+        self._sent.pop(vehID, None)
+
+    def flush(self):
+        '''flush() -> void
+
+        Sends the pending commands to SUMO.
+        '''
+        for vehID, pending in self._pending.items():
+            sent = self._sent.setdefault(vehID, dict())
+            for attribute in _ATTRIBUTES:
+                if attribute not in pending:
+                    continue
+                value = pending[attribute]
+                if attribute not in _REPEATABLE and sent.get(attribute) == value:
+                    self._stepSuppressed += 1
+                    continue
+                try:
+                    _SENDERS[attribute](vehID, value)
+                except TraCIException as e:
+                    if rp.VERBOSITY >= 1:
+                        warn("Setting %s for vehicle '%s' failed. Message:\n%s" % (attribute, vehID, e))
+                    continue
+                sent[attribute] = value
+                self._stepIssued += 1
+        self._pending = dict()
+
+        if rp.VERBOSITY >= 4:
+            report("Sent %s commands, skipped %s" % (self._stepIssued, self._stepSuppressed))
+        self._issued += self._stepIssued
+        self._suppressed += self._stepSuppressed
+        self._lastIssued = self._stepIssued
+        self._lastSuppressed = self._stepSuppressed
+        self._stepIssued = 0
+        self._stepSuppressed = 0
+
+    def getCounts(self):
+        '''getCounts() -> dict
+
+        Returns the numbers of sent ('issued') and skipped ('suppressed') commands, in total and
+        for the last flush ('lastIssued', 'lastSuppressed').
+        '''
+        return dict(issued=self._issued, suppressed=self._suppressed,
+                    lastIssued=self._lastIssued, lastSuppressed=self._lastSuppressed)
@@ -33,6 +33,11 @@ PLATOON_VTYPES = None
 LC_MODE = None
 SPEEDFACTOR = None
 SWITCH_IMPATIENCE_FACTOR = None
+COUNT_TRACI_CALLS = None
+LANE_ADVICE_DURATION = None
+TRIP_QUANTILE_SAMPLES = None
+STATISTICS_WINDOW = None
+STATISTICS_SAMPLES = None
 
 
 def initDefaults():
@@ -44,7 +49,8 @@ def initDefaults():
     '''
 
     global CONTROL_RATE, VEH_SELECTORS, MAX_PLATOON_GAP, CATCHUP_DISTANCE, PLATOON_SPLIT_TIME
-    global VTYPE_FILE, PLATOON_VTYPES, LC_MODE, SPEEDFACTOR, SWITCH_IMPATIENCE_FACTOR
+    global VTYPE_FILE, PLATOON_VTYPES, LC_MODE, SPEEDFACTOR, SWITCH_IMPATIENCE_FACTOR, COUNT_TRACI_CALLS
+    global LANE_ADVICE_DURATION, TRIP_QUANTILE_SAMPLES, STATISTICS_WINDOW, STATISTICS_SAMPLES
 
     # Rate for updating the platoon manager checks and advices
     CONTROL_RATE = 1.0
@@ -107,6 +113,23 @@ def initDefaults():
     # map of original to platooning vTypes
     PLATOON_VTYPES = defaultdict(dict)
 
+    # Whether the platoon manager counts the TraCI calls issued per step (for profiling)
+    COUNT_TRACI_CALLS = False
+
+    # Duration in seconds for which a lane advice to a platoon follower is valid. Advices are renewed
+    # before they expire, and are only sent anew earlier if the advised lane changes.
+    LANE_ADVICE_DURATION = 10.
+
+    # Number of samples of the speeds and fuel consumptions kept per vehicle to estimate the median and
+    # 95th percentile for the trip statistics. 0 disables the quantiles.
+    TRIP_QUANTILE_SAMPLES = 0
+
+    # Number of last arrivals covered by the rolling window of the run statistics (see PlatoonManager.get_statistics())
+    STATISTICS_WINDOW = 100
+
+    # Number of values per metric kept for the quantiles and value series of the run statistics. 0 disables both.
+    STATISTICS_SAMPLES = 1000
+
 # perform initialization
 initDefaults()
 
@@ -178,7 +201,8 @@ def load(filename):
     This loads configuration parameters from a file and overwrites default values.
     '''
     global CONTROL_RATE, VEH_SELECTORS, MAX_PLATOON_GAP, CATCHUP_DIST, PLATOON_SPLIT_TIME
-    global VTYPE_FILE, PLATOON_VTYPES, LC_MODE, SPEEDFACTOR, SWITCH_IMPATIENCE_FACTOR
+    global VTYPE_FILE, PLATOON_VTYPES, LC_MODE, SPEEDFACTOR, SWITCH_IMPATIENCE_FACTOR, COUNT_TRACI_CALLS
+    global LANE_ADVICE_DURATION, TRIP_QUANTILE_SAMPLES, STATISTICS_WINDOW, STATISTICS_SAMPLES
 
     configDir = os.path.dirname(filename)
     configElements = ET.parse(filename).getroot().getchildren()
@@ -273,6 +297,41 @@ def load(filename):
                 if ("original" in e.attrib):
                     if isValidSpeedFactor(float(e.attrib["original"])):
                         SPEEDFACTOR[PlatoonMode.NONE] = float(e.attrib["original"])
+        elif e.tag == "laneAdviceDuration":
+            if hasAttributes(e):
+                duration = float(list(e.attrib.values())[0])
+                if duration <= 0.:
+                    if rp.VERBOSITY >= 1:
+                        warn("Parameter laneAdviceDuration must be positive. Ignoring given value: %s" % (duration), True)
+                else:
+                    LANE_ADVICE_DURATION = duration
+        elif e.tag == "tripQuantileSamples":
+            if hasAttributes(e):
+                samples = int(list(e.attrib.values())[0])
+                if samples < 0:
+                    if rp.VERBOSITY >= 1:
+                        warn("Parameter tripQuantileSamples must be non-negative. Ignoring given value: %s" % (samples), True)
+                else:
+                    TRIP_QUANTILE_SAMPLES = samples
+        elif e.tag == "statisticsWindow":
+            if hasAttributes(e):
+                size = int(list(e.attrib.values())[0])
+                if size < 0:
+                    if rp.VERBOSITY >= 1:
+                        warn("Parameter statisticsWindow must be non-negative. Ignoring given value: %s" % (size), True)
+                else:
+                    STATISTICS_WINDOW = size
+        elif e.tag == "statisticsSamples":
+            if hasAttributes(e):
+                samples = int(list(e.attrib.values())[0])
+                if samples < 0:
+                    if rp.VERBOSITY >= 1:
+                        warn("Parameter statisticsSamples must be non-negative. Ignoring given value: %s" % (samples), True)
+                else:
+                    STATISTICS_SAMPLES = samples
+        elif e.tag == "countTraCICalls":
+            if hasAttributes(e):
+                COUNT_TRACI_CALLS = list(e.attrib.values())[0].lower() in ("true", "1")
         elif e.tag == "vTypeMapFile":
             if hasAttributes(e):
                 fn = os.path.join(configDir, list(e.attrib.values())[0])
@@ -344,9 +403,12 @@ def isValidSpeedFactor(value):
 def setValues(values):
     global_variables = ["CONTROL_RATE", "VEH_SELECTORS", "MAX_PLATOON_GAP",
                         "CATCHUP_DISTANCE", "PLATOON_SPLIT_TIME",
-                        "VTYPE_FILE", "PLATOON_VTYPES", "LC_MODE", "SPEEDFACTOR", "SWITCH_IMPATIENCE_FACTOR"]
+                        "VTYPE_FILE", "PLATOON_VTYPES", "LC_MODE", "SPEEDFACTOR", "SWITCH_IMPATIENCE_FACTOR",
+                        "COUNT_TRACI_CALLS", "LANE_ADVICE_DURATION", "TRIP_QUANTILE_SAMPLES",
+                        "STATISTICS_WINDOW", "STATISTICS_SAMPLES"]
     global CONTROL_RATE, VEH_SELECTORS, MAX_PLATOON_GAP, CATCHUP_DISTANCE, PLATOON_SPLIT_TIME
-    global VTYPE_FILE, PLATOON_VTYPES, LC_MODE, SPEEDFACTOR, SWITCH_IMPATIENCE_FACTOR
+    global VTYPE_FILE, PLATOON_VTYPES, LC_MODE, SPEEDFACTOR, SWITCH_IMPATIENCE_FACTOR, COUNT_TRACI_CALLS
+    global LANE_ADVICE_DURATION, TRIP_QUANTILE_SAMPLES, STATISTICS_WINDOW, STATISTICS_SAMPLES
 
     for key in values:
         if key in globals():
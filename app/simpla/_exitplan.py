@@ -0,0 +1,77 @@
+# Eclipse SUMO, Simulation of Urban MObility; see https://eclipse.org/sumo
+# Copyright (C) 2017-2017 German Aerospace Center (DLR) and others.
+# This program and the accompanying materials
+# are made available under the terms of the Eclipse Public License v2.0
+# which accompanies this distribution, and is available at
+# http://www.eclipse.org/legal/epl-v20.html
+
+# @file    _exitplan.py
+# @date    2018-07-05
+# @version $Id$
+
+'''
+Routes and arrival lanes for the exit edges in Config.edgeIDsAndNumberOfLanesForExit. Each plan is computed
+once and its routes are registered in SUMO, such that spawning a vehicle only requires a lookup.
+'''
+
+from app.sumo.Backend import traci
+import app.Config as Config
+
+from _network import getLaneLength, getCorridorEdges
+
+# map: exit edge ID -> ExitPlan
+_exitPlans = dict()
+
+
+class ExitPlan(object):
+    '''
+    Routes leading to an exit edge and the lengths of its lanes
+    '''
+
+    def __init__(self, edgeID):
+        '''ExitPlan(string) -> ExitPlan
+
+        Computes the routes to the given exit edge and adds them to SUMO.
+        '''
+        self.edgeID = edgeID
+        self.numberOfLanes = Config.edgeIDsAndNumberOfLanesForExit[edgeID]
+        self.laneLengths = [getLaneLength(edgeID + "_" + str(laneIndex)) for laneIndex in range(self.numberOfLanes)]
+
+        # platoon vehicles travel along the corridor from Config.startEdgeID up to the exit edge (included)
+        allEdges = getCorridorEdges()
+        self.edges = tuple(allEdges[:allEdges.index(edgeID) + 1])
+        # map: edge ID -> position in the route (last occurrence), shared by all vehicles using the plan
+        self.edgeIndex = dict((e, ix) for ix, e in enumerate(self.edges))
+        self.routeID = "platoon-car-route-" + edgeID
+        _addRoute(self.routeID, self.edges)
+
+        # normal vehicles use the fastest route to the exit edge
+        self.normalEdges = tuple(traci.simulation.findRoute(fromEdge=Config.startEdgeID, toEdge=edgeID).edges)
+        self.normalRouteID = "normal-car-route-" + edgeID
+        _addRoute(self.normalRouteID, self.normalEdges)
+
+
+def _addRoute(routeID, edges):
+    # routes are kept by SUMO if the plans are recreated after a restart of simpla
+    if routeID not in traci.route.getIDList():
+        traci.route.add(routeID, edges)
+
+
+def getExitPlan(edgeID):
+    '''getExitPlan(string) -> ExitPlan
+
+    Returns the plan for the given exit edge, which is created on first request.
+    '''
+    plan = _exitPlans.get(edgeID)
+    if plan is None:
+        plan = ExitPlan(edgeID)
+        _exitPlans[edgeID] = plan
+    return plan
+
+
+def clear():
+    '''clear() -> void
+
+    Forgets all plans. Must be called if the network may have changed, e.g., after loading a new simulation.
+    '''
+    _exitPlans.clear()
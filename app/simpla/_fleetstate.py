@@ -0,0 +1,297 @@
+# Eclipse SUMO, Simulation of Urban MObility; see https://eclipse.org/sumo
+# Copyright (C) 2017-2017 German Aerospace Center (DLR) and others.
+# This program and the accompanying materials
+# are made available under the terms of the Eclipse Public License v2.0
+# which accompanies this distribution, and is available at
+# http://www.eclipse.org/legal/epl-v20.html
+
+# @file    _fleetstate.py
+# @date    2018-07-04
+# @version $Id$
+
+'''
+Columnar store for the states of all connected vehicles. Each vehicle holds a row (handle) in a set
+of numpy arrays, the per-vehicle pVehicleState objects are views onto their row. Rows of arrived
+vehicles are reused for newly inserted ones.
+'''
+
+import numpy as np
+import traci.constants as tc
+
+from _tripmetrics import StreamingMetric
+
+# column name -> (dtype, value of an unused row)
+COLUMNS = (("vehID", object, None),
+           ("speed", float, 0.),
+           ("edgeID", object, ""),
+           ("laneID", object, ""),
+           ("laneIX", int, 0),
+           ("lanePosition", float, 0.),
+           ("routeIndex", int, 0),
+           ("distance", float, 0.),
+           ("maxSpeed", float, 0.),
+           # leader as given by SUMO (ID is None if there is no leader within the lookahead distance)
+           ("leaderID", object, None),
+           ("leaderGap", float, np.nan),
+           # the leader's PVehicle if it is connected
+           ("leader", object, None),
+           ("connectedVehicleAhead", bool, False),
+           # PlatoonMode value and platoon ID of the vehicle
+           ("mode", int, 0),
+           ("platoonID", int, -1),
+           # active lane advice (lane index, edge on which it was given, expiry time), see PlatoonManager._adviseLanes()
+           ("adviceLane", int, -1),
+           ("adviceEdge", object, ""),
+           ("adviceExpiry", float, -1.),
+           # trip metrics (speeds and fuel consumptions are accumulated in StreamingMetrics, see FleetState)
+           ("durationInsidePlatoon", int, 0),
+           ("durationOutsidePlatoon", int, 0))
+
+# columns accumulated over the vehicle's trip, which are kept in snapshots of the fleet (see getTripRow())
+TRIP_COLUMNS = ("durationInsidePlatoon", "durationOutsidePlatoon")
+
+# subscribed variable -> column, for the values that are copied unchanged from the subscription results
+SUBSCRIBED_COLUMNS = ((tc.VAR_SPEED, "speed"),
+                      (tc.VAR_ROAD_ID, "edgeID"),
+                      (tc.VAR_LANE_ID, "laneID"),
+                      (tc.VAR_LANE_INDEX, "laneIX"),
+                      (tc.VAR_LANEPOSITION, "lanePosition"),
+                      (tc.VAR_ROUTE_INDEX, "routeIndex"),
+                      (tc.VAR_DISTANCE, "distance"))
+
+
+class FleetState(object):
+    '''
+    Struct-of-arrays store for the vehicle states. Columns are accessible as attributes, e.g. fleet.speed,
+    and are indexed by the handles returned from allocate().
+    '''
+
+    def __init__(self, capacity=64, quantileSamples=0):
+        '''FleetState(int, int) -> FleetState
+
+        quantileSamples is the number of samples kept per vehicle to estimate quantiles of the trip metrics
+        (0 disables the quantiles), see _tripmetrics.StreamingMetric.
+        '''
+        self._capacity = 0
+        # accumulated speeds and fuel consumptions of the vehicles' trips
+        self.speedMetric = StreamingMetric(0, quantileSamples)
+        self.fuelConsumptionMetric = StreamingMetric(0, quantileSamples, seed=1)
+        for name, dtype, default in COLUMNS:
+            setattr(self, name, np.empty(0, dtype=dtype))
+        self._grow(capacity)
+        # map: vehicle ID -> handle
+        self._handles = dict()
+        # handles of rows that are not in use
+        self._freeHandles = list(range(capacity - 1, -1, -1))
+
+    def _grow(self, capacity):
+        '''_grow(int) -> void
+
+        Extends all columns to the given capacity.
+        '''
+        for name, dtype, default in COLUMNS:
+            column = np.empty(capacity, dtype=dtype)
+            column[:self._capacity] = getattr(self, name)
+            column[self._capacity:] = default
+            setattr(self, name, column)
+        self.speedMetric.grow(capacity)
+        self.fuelConsumptionMetric.grow(capacity)
+        self._capacity = capacity
+
+    def allocate(self, vehID):
+        '''allocate(string) -> int
+
+        Returns the handle of a free row for the given vehicle.
+        '''
+        if not self._freeHandles:
+            oldCapacity = self._capacity
+            self._grow(2 * oldCapacity)
+            self._freeHandles = list(range(self._capacity - 1, oldCapacity - 1, -1))
+        handle = self._freeHandles.pop()
+        self._handles[vehID] = handle
+        self.vehID[handle] = vehID
+        return handle
+
+    def release(self, vehID):
+        '''release(string) -> void
+
+        Resets the given vehicle's row and marks it for reuse.
+        '''
+        handle = self._handles.pop(vehID)
+        for name, dtype, default in COLUMNS:
+            getattr(self, name)[handle] = default
+        self.speedMetric.reset(handle)
+        self.fuelConsumptionMetric.reset(handle)
+        self._freeHandles.append(handle)
+
+    def clear(self):
+        '''clear() -> void
+
+        Releases all rows.
+        '''
+        for vehID in list(self._handles.keys()):
+            self.release(vehID)
+
+    def getHandle(self, vehID):
+        '''getHandle(string) -> int
+        '''
+        return self._handles[vehID]
+
+    def getHandles(self, vehIDs):
+        '''getHandles(list(string)) -> numpy.array(int)
+        '''
+        handles = self._handles
+        return np.fromiter((handles[vehID] for vehID in vehIDs), dtype=int, count=len(vehIDs))
+
+    def size(self):
+        '''size() -> int
+
+        Returns the number of rows in use.
+        '''
+        return len(self._handles)
+
+    def update(self, handles, vehIDs, subscriptionResults):
+        '''update(numpy.array(int), list(string), dict) -> void
+
+        Copies the subscribed variables of the given vehicles into the columns. The leader columns
+        are only written if VAR_LEADER is contained in the results.
+        '''
+        if len(handles) == 0:
+            return
+        results = [subscriptionResults[vehID] for vehID in vehIDs]
+        for var, name in SUBSCRIBED_COLUMNS:
+            getattr(self, name)[handles] = [r[var] for r in results]
+        if tc.VAR_LEADER in results[0]:
+            self.setLeaderInfos(handles, [r[tc.VAR_LEADER] for r in results])
+
+    def setLeaderInfos(self, handles, leaderInfos):
+        '''setLeaderInfos(numpy.array(int), list((string, double))) -> void
+
+        Sets the leader columns from a list of leaderInfo tuples (or None) as returned by traci.
+        '''
+        leaderIDs = np.empty(len(leaderInfos), dtype=object)
+        leaderIDs[:] = [None if info is None or info[0] == "" else info[0] for info in leaderInfos]
+        hasLeader = np.not_equal(leaderIDs, None)
+        gaps = np.full(len(leaderInfos), np.nan)
+        gaps[hasLeader] = [info[1] for info, found in zip(leaderInfos, hasLeader) if found]
+        self.leaderID[handles] = leaderIDs
+        self.leaderGap[handles] = gaps
+
+    def updateTripMetrics(self, handles, fuelConsumptions):
+        '''updateTripMetrics(numpy.array(int), list(double)) -> void
+
+        Accumulates the speed and fuel consumption samples of the current step and the time spent inside and
+        outside of platoons (counted in control steps) for the given vehicles.
+        '''
+        speeds = self.speed[handles]
+        # sometimes reported values are always -1001 (error value) so we filter them out
+        fuelConsumptions = np.asarray(fuelConsumptions, dtype=float)
+        validFuel = fuelConsumptions > 0
+        self.fuelConsumptionMetric.add(handles[validFuel], fuelConsumptions[validFuel])
+        moving = speeds > 0
+        self.speedMetric.add(handles[moving], speeds[moving])
+
+        # platoon sizes are obtained by counting the vehicles per platoon ID
+        platoonIDs = self.platoonID[handles]
+        _, inverse, counts = np.unique(platoonIDs, return_inverse=True, return_counts=True)
+        insidePlatoon = counts[inverse] > 1
+        self.durationInsidePlatoon[handles[insidePlatoon]] += 1
+        self.durationOutsidePlatoon[handles[~insidePlatoon]] += 1
+
+    def meanSpeed(self, handle):
+        '''meanSpeed(int) -> double
+
+        Returns the mean of the positive speeds recorded for the vehicle (nan if none was recorded).
+        '''
+        if self.speedMetric.count[handle] == 0:
+            return np.nan
+        return self.speedMetric.mean[handle]
+
+    def meanFuelConsumption(self, handle):
+        '''meanFuelConsumption(int) -> double
+
+        Returns the mean of the valid fuel consumptions recorded for the vehicle (nan if none was recorded).
+        '''
+        if self.fuelConsumptionMetric.count[handle] == 0:
+            return np.nan
+        return self.fuelConsumptionMetric.mean[handle]
+
+    def getTripRow(self, handle):
+        '''getTripRow(int) -> dict
+
+        Returns the trip metrics accumulated for the vehicle so far (see TRIP_COLUMNS and setTripRow()).
+        '''
+        row = dict((name, getattr(self, name)[handle].item()) for name in TRIP_COLUMNS)
+        row.update(speedMetric=self.speedMetric.getRow(handle),
+                   fuelConsumptionMetric=self.fuelConsumptionMetric.getRow(handle))
+        return row
+
+    def setTripRow(self, handle, row):
+        '''setTripRow(int, dict) -> void
+
+        Sets the trip metrics of the vehicle to values returned by getTripRow().
+        '''
+        for name in TRIP_COLUMNS:
+            getattr(self, name)[handle] = row[name]
+        self.speedMetric.setRow(handle, row["speedMetric"])
+        self.fuelConsumptionMetric.setRow(handle, row["fuelConsumptionMetric"])
+
+    def tripMetrics(self, handle):
+        '''tripMetrics(int) -> dict
+
+        Returns the summaries of the speeds and fuel consumptions recorded for the vehicle
+        (see StreamingMetric.summary()).
+        '''
+        return dict(speed=self.speedMetric.summary(handle),
+                    fuelConsumption=self.fuelConsumptionMetric.summary(handle))
+
+
+def _columnProperty(name, cast):
+    def fget(self):
+        return cast(getattr(self._fleet, name)[self._handle])
+
+    def fset(self, value):
+        getattr(self._fleet, name)[self._handle] = value
+    return property(fget, fset)
+
+
+def _identity(value):
+    return value
+
+
+class FleetStateView(object):
+    '''
+    Per-vehicle access to a row of a FleetState. Each column is exposed as an attribute.
+    '''
+    __slots__ = ("_fleet", "_handle")
+
+    def __init__(self, fleet, handle):
+        self._fleet = fleet
+        self._handle = handle
+
+    def getHandle(self):
+        '''getHandle() -> int
+        '''
+        return self._handle
+
+    @property
+    def leaderInfo(self):
+        '''(string, double) or None as returned by traci.vehicle.getLeader()
+        '''
+        leaderID = self._fleet.leaderID[self._handle]
+        if leaderID is None:
+            return None
+        return (leaderID, float(self._fleet.leaderGap[self._handle]))
+
+    @leaderInfo.setter
+    def leaderInfo(self, leaderInfo):
+        if leaderInfo is None or leaderInfo[0] == "":
+            self._fleet.leaderID[self._handle] = None
+            self._fleet.leaderGap[self._handle] = np.nan
+        else:
+            self._fleet.leaderID[self._handle] = leaderInfo[0]
+            self._fleet.leaderGap[self._handle] = leaderInfo[1]
+
+
+for _name, _dtype, _default in COLUMNS:
+    setattr(FleetStateView, _name, _columnProperty(_name, _identity if _dtype is object else _dtype))
@@ -0,0 +1,179 @@
+# Eclipse SUMO, Simulation of Urban MObility; see https://eclipse.org/sumo
+# Copyright (C) 2017-2017 German Aerospace Center (DLR) and others.
+# This program and the accompanying materials
+# are made available under the terms of the Eclipse Public License v2.0
+# which accompanies this distribution, and is available at
+# http://www.eclipse.org/legal/epl-v20.html
+
+# @file    _laneindex.py
+# @date    2018-07-03
+# @version $Id$
+
+from app.sumo.Backend import traci
+import traci.constants as tc
+import numpy as np
+
+from _network import getLaneLength, getEdgeID, getSuccessorLane
+
+
+class LaneOccupancyIndex(object):
+    '''
+    Index of the vehicles on the corridor lanes, sorted by lane position. It is rebuilt in each control
+    step from context subscriptions on the corridor edges and answers leader and downstream queries by
+    binary search, without any further TraCI calls.
+    '''
+    # variables retrieved for all vehicles on the subscribed edges
+    CONTEXT_VARIABLES = (tc.VAR_LANE_ID, tc.VAR_LANEPOSITION, tc.VAR_LENGTH)
+    # range of the edge context subscriptions. Vehicles found on other edges within this range are ignored.
+    CONTEXT_RANGE = 20.
+
+    def __init__(self, edgeIDs):
+        '''LaneOccupancyIndex(list(string)) -> LaneOccupancyIndex
+
+        Creates the index and adds a context subscription for each of the given edges.
+        '''
+        self._edgeIDs = list(edgeIDs)
+        for edgeID in self._edgeIDs:
+            traci.edge.subscribeContext(edgeID, tc.CMD_GET_VEHICLE_VARIABLE, self.CONTEXT_RANGE,
+                                        self.CONTEXT_VARIABLES)
+        # map: lane ID -> lane code (row of the lane in the index)
+        self._laneCodes = dict()
+        # vehicle IDs, front positions and back positions, sorted by (lane code, position)
+        self._vehIDs = []
+        self._positions = np.zeros(0)
+        self._backs = np.zeros(0)
+        # range [laneBegin[code], laneEnd[code]) of the sorted arrays holding the vehicles on a lane
+        self._laneBegin = np.zeros(0, dtype=int)
+        self._laneEnd = np.zeros(0, dtype=int)
+        # connectedCount[i] is the number of connected vehicles among the first i sorted vehicles
+        self._connectedCount = np.zeros(1, dtype=int)
+
+    def close(self):
+        '''close() -> void
+
+        Removes the context subscriptions.
+        '''
+        for edgeID in self._edgeIDs:
+            traci.edge.unsubscribeContext(edgeID, tc.CMD_GET_VEHICLE_VARIABLE, self.CONTEXT_RANGE)
+
+    def update(self, connectedIDs):
+        '''update(container(string)) -> void
+
+        Rebuilds the index from the latest context subscription results. 'connectedIDs' are the
+        IDs of the vehicles that may participate in platoons.
+        '''
+        vehIDs = []
+        laneCodes = []
+        positions = []
+        lengths = []
+        for edgeID, vehicles in traci.edge.getAllContextSubscriptionResults().items():
+            if not vehicles:
+                continue
+            for vehID, values in vehicles.items():
+                laneID = values[tc.VAR_LANE_ID]
+                if getEdgeID(laneID) != edgeID:
+                    # vehicle is within range, but on another edge or on an internal lane
+                    continue
+                code = self._laneCodes.get(laneID)
+                if code is None:
+                    code = len(self._laneCodes)
+                    self._laneCodes[laneID] = code
+                vehIDs.append(vehID)
+                laneCodes.append(code)
+                positions.append(values[tc.VAR_LANEPOSITION])
+                lengths.append(values[tc.VAR_LENGTH])
+
+        laneCodes = np.array(laneCodes, dtype=int)
+        positions = np.array(positions, dtype=float)
+        order = np.lexsort((positions, laneCodes))
+        laneCodes = laneCodes[order]
+        self._positions = positions[order]
+        self._backs = self._positions - np.array(lengths, dtype=float)[order]
+        self._vehIDs = [vehIDs[i] for i in order]
+        allCodes = np.arange(len(self._laneCodes))
+        self._laneBegin = np.searchsorted(laneCodes, allCodes, side="left")
+        self._laneEnd = np.searchsorted(laneCodes, allCodes, side="right")
+        connected = np.fromiter((vehID in connectedIDs for vehID in self._vehIDs), dtype=bool,
+                                count=len(self._vehIDs))
+        self._connectedCount = np.concatenate(([0], np.cumsum(connected)))
+
+    def size(self):
+        '''size() -> int
+
+        Returns the number of indexed vehicles.
+        '''
+        return len(self._vehIDs)
+
+    def _laneRange(self, laneID):
+        code = self._laneCodes.get(laneID)
+        if code is None or code >= len(self._laneBegin):
+            return None
+        return self._laneBegin[code], self._laneEnd[code]
+
+    @staticmethod
+    def _nextLane(laneID, route, routeIndex):
+        '''_nextLane(string, list(string), int) -> string
+
+        Returns the lane which a vehicle on the given lane enters next when following its route.
+        '''
+        if route is None or routeIndex < 0 or routeIndex + 1 >= len(route):
+            return None
+        return getSuccessorLane(laneID, route[routeIndex + 1])
+
+    def leader(self, laneID, pos, dist, route=None, routeIndex=0):
+        '''leader(string, double, double, list(string), int) -> (string, double)
+
+        Returns the ID of the first vehicle ahead of the given position together with the distance from
+        pos to the vehicle's back, or None if no vehicle is found within dist. The search is continued
+        on the lanes along the given route, where routeIndex is the route index of the given lane.
+        '''
+        if laneID == "" or laneID[0] == ":":
+            # vehicle is not on the road or on an internal lane, which are not indexed
+            return None
+        offset = 0.
+        searchFrom = pos
+        while True:
+            laneRange = self._laneRange(laneID)
+            if laneRange is not None:
+                begin, end = laneRange
+                i = begin + np.searchsorted(self._positions[begin:end], searchFrom, side="right")
+                if i < end:
+                    gap = offset + self._backs[i] - searchFrom
+                    return (self._vehIDs[i], gap) if gap <= dist else None
+            offset += getLaneLength(laneID) - searchFrom
+            if offset > dist:
+                return None
+            laneID = self._nextLane(laneID, route, routeIndex)
+            if laneID is None:
+                return None
+            routeIndex += 1
+            searchFrom = 0.
+
+    def connectedAhead(self, laneID, pos, dist, route=None, routeIndex=0):
+        '''connectedAhead(string, double, double, list(string), int) -> bool
+
+        Returns whether a connected vehicle is located ahead of the given position (by at most dist).
+        The search is continued on the lanes along the given route, where routeIndex is the route
+        index of the given lane.
+        '''
+        if laneID == "" or laneID[0] == ":":
+            return False
+        remaining = dist
+        searchFrom = pos
+        while True:
+            laneRange = self._laneRange(laneID)
+            if laneRange is not None:
+                begin, end = laneRange
+                lanePositions = self._positions[begin:end]
+                i = begin + np.searchsorted(lanePositions, searchFrom, side="right")
+                j = begin + np.searchsorted(lanePositions, searchFrom + remaining, side="right")
+                if self._connectedCount[j] > self._connectedCount[i]:
+                    return True
+            remaining -= getLaneLength(laneID) - searchFrom
+            if remaining <= 0.:
+                return False
+            laneID = self._nextLane(laneID, route, routeIndex)
+            if laneID is None:
+                return False
+            routeIndex += 1
+            searchFrom = 0.
@@ -0,0 +1,97 @@
+# Eclipse SUMO, Simulation of Urban MObility; see https://eclipse.org/sumo
+# Copyright (C) 2017-2017 German Aerospace Center (DLR) and others.
+# This program and the accompanying materials
+# are made available under the terms of the Eclipse Public License v2.0
+# which accompanies this distribution, and is available at
+# http://www.eclipse.org/legal/epl-v20.html
+
+# @file    _modetable.py
+# @date    2018-07-11
+# @version $Id$
+
+'''
+Per-vType tables of the mode dependent vehicle parameters. The tables are built once per original vType
+from _config and are indexed by the PlatoonMode (an int), such that switching modes only requires tuple lookups.
+'''
+
+import _reporting as rp
+import _config as cfg
+
+from _platoonmode import PlatoonMode, MODES
+
+warn = rp.Warner("ModeTable")
+report = rp.Reporter("ModeTable")
+
+# lane change mode of vehicles in PlatoonMode.NONE
+ORIGINAL_LC_MODE = 0b1001010101
+
+# map: original vType ID -> ModeTable
+_modeTables = dict()
+
+WARNED_DEFAULT = dict([(mode, False) for mode in PlatoonMode])
+
+
+def _determinePlatoonVType(origVType, mode, vehID):
+    '''_determinePlatoonVType(string, PlatoonMode, string) -> string
+
+    Returns the type ID corresponding to the given mode. Uses the map PLATOON_VTYPES between original and
+    platoon-vTypes. If the original vType is not mapped to any platoon-vtypes, the original vType is used
+    for platooning as well. 'vehID' is the vehicle for which the table is built (used in the reports).
+    '''
+    global WARNED_DEFAULT
+    if origVType not in cfg.PLATOON_VTYPES \
+            or mode not in cfg.PLATOON_VTYPES[origVType] \
+            or cfg.PLATOON_VTYPES[origVType][mode] == "":
+        if "default" in cfg.PLATOON_VTYPES and mode in cfg.PLATOON_VTYPES["default"]:
+            if rp.VERBOSITY >= 1 and not WARNED_DEFAULT[mode]:
+                warn("Using default vType '%s' for vehicle '%s' (PlatoonMode: '%s'). This warning is issued only once." %
+                     (cfg.PLATOON_VTYPES["default"][mode], vehID, PlatoonMode(mode).name))
+                WARNED_DEFAULT[mode] = True
+            return cfg.PLATOON_VTYPES["default"][mode]
+        else:
+            if rp.VERBOSITY >= 1 and not WARNED_DEFAULT[mode]:
+                warn("No vType specified for PlatoonMode '%s' for vehicle '%s'. Behavior within platoon is NOT altered. This warning is issued only once." % (
+                    PlatoonMode(mode).name, vehID))
+                WARNED_DEFAULT[mode] = True
+            return origVType
+    if rp.VERBOSITY >= 3:
+        report("Using vType '%s' for vType '%s' (PlatoonMode: '%s')." %
+               (cfg.PLATOON_VTYPES[origVType][mode], origVType, PlatoonMode(mode).name))
+    return cfg.PLATOON_VTYPES[origVType][mode]
+
+
+class ModeTable(object):
+    '''
+    vTypes, lane change modes and speed factors of the platoon modes for vehicles of an original vType.
+    All attributes are tuples indexed by PlatoonMode.
+    '''
+
+    def __init__(self, origVType, vehID):
+        '''ModeTable(string, string) -> ModeTable
+        '''
+        self.vTypes = tuple(origVType if mode == PlatoonMode.NONE else _determinePlatoonVType(origVType, mode, vehID)
+                            for mode in MODES)
+        self.laneChangeModes = tuple(ORIGINAL_LC_MODE if mode == PlatoonMode.NONE else cfg.LC_MODE[mode]
+                                     for mode in MODES)
+        # configured speed factors (the vehicles' speed factors for PlatoonMode.NONE are given at insertion)
+        self.speedFactors = tuple(cfg.SPEEDFACTOR[mode] for mode in MODES)
+
+
+def getModeTable(origVType, vehID):
+    '''getModeTable(string, string) -> ModeTable
+
+    Returns the table for the given original vType, which is built on first request.
+    '''
+    table = _modeTables.get(origVType)
+    if table is None:
+        table = ModeTable(origVType, vehID)
+        _modeTables[origVType] = table
+    return table
+
+
+def clear():
+    '''clear() -> void
+
+    Forgets all tables. Must be called if the configuration may have changed, e.g., after a restart of simpla.
+    '''
+    _modeTables.clear()
@@ -0,0 +1,83 @@
+# Eclipse SUMO, Simulation of Urban MObility; see https://eclipse.org/sumo
+# Copyright (C) 2017-2017 German Aerospace Center (DLR) and others.
+# This program and the accompanying materials
+# are made available under the terms of the Eclipse Public License v2.0
+# which accompanies this distribution, and is available at
+# http://www.eclipse.org/legal/epl-v20.html
+
+# @file    _network.py
+# @date    2018-07-03
+# @version $Id$
+
+'''
+Lookup tables for static network properties. The network does not change during the simulation,
+therefore each value is requested from SUMO only once.
+'''
+
+from app.sumo.Backend import traci
+import app.Config as Config
+
+# lane ID -> length
+laneLengths = dict()
+# (lane ID, edge ID) -> ID of the lane on the given edge that is reached from the lane (or None)
+_successorLanes = dict()
+# edges from Config.startEdgeID to Config.lastEdgeID
+_corridorEdges = None
+
+
+def getLaneLength(laneID):
+    '''getLaneLength(string) -> double
+
+    Returns the length of the given lane.
+    '''
+    if laneID not in laneLengths:
+        laneLengths[laneID] = traci.lane.getLength(laneID)
+    return laneLengths[laneID]
+
+
+def getEdgeID(laneID):
+    '''getEdgeID(string) -> string
+
+    Returns the ID of the edge the given (non-internal) lane belongs to.
+    '''
+    return laneID.rsplit("_", 1)[0]
+
+
+def getSuccessorLane(laneID, edgeID):
+    '''getSuccessorLane(string, string) -> string
+
+    Returns the lane on the given edge which is approached from the given lane,
+    or None if the lane has no connection to that edge.
+    '''
+    key = (laneID, edgeID)
+    if key not in _successorLanes:
+        successor = None
+        for link in traci.lane.getLinks(laneID):
+            if getEdgeID(link[0]) == edgeID:
+                successor = link[0]
+                break
+        _successorLanes[key] = successor
+    return _successorLanes[key]
+
+
+def getCorridorEdges():
+    '''getCorridorEdges() -> list(string)
+
+    Returns the edges of the route from Config.startEdgeID to Config.lastEdgeID, which
+    contains the routes of all vehicles.
+    '''
+    global _corridorEdges
+    if _corridorEdges is None:
+        _corridorEdges = list(traci.simulation.findRoute(fromEdge=Config.startEdgeID, toEdge=Config.lastEdgeID).edges)
+    return _corridorEdges
+
+
+def clear():
+    '''clear() -> void
+
+    Forgets all cached values. Must be called if a different network is loaded.
+    '''
+    global _corridorEdges
+    laneLengths.clear()
+    _successorLanes.clear()
+    _corridorEdges = None
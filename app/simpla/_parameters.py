@@ -0,0 +1,133 @@
+# Eclipse SUMO, Simulation of Urban MObility; see https://eclipse.org/sumo
+# Copyright (C) 2017-2017 German Aerospace Center (DLR) and others.
+# This program and the accompanying materials
+# are made available under the terms of the Eclipse Public License v2.0
+# which accompanies this distribution, and is available at
+# http://www.eclipse.org/legal/epl-v20.html
+
+# @file    _parameters.py
+# @date    2018-07-16
+# @version $Id$
+
+'''
+Registry of the parameters in app.Config.parameters that may be changed while the simulation is running
+(e.g. via Kafka, see PlatoonSimulation.changeVariables()). New values are type checked, written to
+Config.parameters and passed to the registered listeners (see PlatoonManager._applyParameters()),
+which push them into the running platoon manager, the simpla config and the live vehicles and platoons.
+'''
+
+import _reporting as rp
+import app.Config as Config
+
+from collections import OrderedDict
+
+warn = rp.Warner("Parameters")
+
+
+class Parameter(object):
+    '''
+    A runtime changeable parameter, stored in Config.parameters[section][name]
+    '''
+
+    def __init__(self, name, section, valueType, minimum=None, linked=()):
+        '''Parameter(string, string, type, number, list((string, string))) -> Parameter
+
+        Values are converted to valueType and must not be smaller than minimum (if given). The value is
+        also written to the linked entries (section, name) of Config.parameters.
+        '''
+        self.name = name
+        self.section = section
+        self.valueType = valueType
+        self.minimum = minimum
+        self.linked = linked
+
+    def convert(self, value):
+        '''convert(object) -> object
+
+        Returns the value converted to the parameter's type, raises ValueError for invalid values.
+        '''
+        if self.valueType is bool:
+            if hasattr(value, "lower"):
+                # a string (e.g. from a json config)
+                if value.lower() not in ("true", "false"):
+                    raise ValueError("'%s' is not a boolean" % value)
+                return value.lower() == "true"
+            return bool(value)
+        try:
+            value = self.valueType(value)
+        except TypeError:
+            raise ValueError("'%s' is not of type %s" % (value, self.valueType.__name__))
+        if self.minimum is not None and value < self.minimum:
+            raise ValueError("%s must be at least %s" % (value, self.minimum))
+        return value
+
+
+PARAMETERS = (
+    Parameter("maxVehiclesInPlatoon", "changeable", int, 1),
+    # the look ahead distance is set to the catchup distance, as in the experiments
+    Parameter("catchupDistance", "changeable", float, 0., linked=[("contextual", "lookAheadDistance")]),
+    Parameter("maxPlatoonGap", "changeable", float, 0.),
+    Parameter("platoonSplitTime", "changeable", float, 0.),
+    Parameter("joinDistance", "changeable", float, 0.),
+    Parameter("switchImpatienceFactor", "contextual", float, 0.),
+    Parameter("totalCarCounter", "contextual", int, 0),
+    Parameter("platoonCarCounter", "contextual", int, 0),
+    Parameter("extended_simpla_logic", "contextual", bool),
+)
+
+# map: name -> Parameter
+_parameters = OrderedDict((p.name, p) for p in PARAMETERS)
+
+# functions called with the dict of changed parameters (name -> new value) after each update
+_listeners = []
+
+
+def addListener(listener):
+    '''addListener(function(dict)) -> void
+    '''
+    _listeners.append(listener)
+
+
+def removeListener(listener):
+    '''removeListener(function(dict)) -> void
+    '''
+    if listener in _listeners:
+        _listeners.remove(listener)
+
+
+def get(name):
+    '''get(string) -> object
+
+    Returns the current value of the given parameter.
+    '''
+    parameter = _parameters[name]
+    return Config.parameters[parameter.section][name]
+
+
+def update(parameters):
+    '''update(dict) -> dict
+
+    Sets the given parameters (name -> value) and notifies the listeners once about all changes.
+    Unknown parameters and invalid values are ignored with a warning. Returns the applied changes.
+    '''
+    changes = OrderedDict()
+    for name, value in parameters.items():
+        parameter = _parameters.get(name)
+        if parameter is None:
+            if rp.VERBOSITY >= 1:
+                warn("Unknown parameter '%s'. Ignoring given value: %s" % (name, value), True)
+            continue
+        try:
+            value = parameter.convert(value)
+        except ValueError as e:
+            if rp.VERBOSITY >= 1:
+                warn("Invalid value for parameter '%s' (%s). Ignoring given value." % (name, e), True)
+            continue
+        Config.parameters[parameter.section][name] = value
+        for section, linkedName in parameter.linked:
+            Config.parameters[section][linkedName] = value
+        changes[name] = value
+    if changes:
+        for listener in list(_listeners):
+            listener(changes)
+    return changes
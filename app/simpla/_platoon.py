@@ -11,9 +11,10 @@
 # @version $Id$
 
 
-from _platoonmode import PlatoonMode
+from _platoonmode import PlatoonMode, FOLLOWER_MODE, PLATOON_MODE, ADMISSIBLE_FOR_PLATOONS
 import _reporting as rp
-from operator import itemgetter
+from bisect import bisect_left
+from itertools import islice
 from app.Config import parameters
 
 warn = rp.Warner("Platoon")
@@ -26,23 +27,27 @@ class Platoon(object):
     '''    
     '''
 
-    def __init__(self, vehicles, controlInterval, arrivalInterval=None, registerVehicles=True):
-        '''Platoon(list(PVehicle), float, tuple(float, float), bool) -> Platoon
+    def __init__(self, vehicles, controlInterval, registerVehicles=True):
+        '''Platoon(list(PVehicle), float, bool) -> Platoon
 
         Create a Platoon object that holds an ordered list of its members, which is inititialized with 'vehicles'.
         Creator is responsible for setting the platoon mode of the vehicles. If registerVehicles is set, the vehicle's
         platoon reference veh._platoon is set to the newly created platoon. 'deltaT' is the control interval provided
         to give the platoon a sense of time (used for decreasing active speed factor when trying to switch modes unsuccessfully).
+        The platoon's arrival interval spans the arrival intervals of all members.
         '''
         global _nextID
         self._ID = _nextID
         _nextID += 1
         self._vehicles = vehicles
+        # sorted lower and upper bounds of the members' arrival intervals (multisets)
+        self._arrivalLowerBounds = []
+        self._arrivalUpperBounds = []
+        self.adjustInterval()
         if registerVehicles:
             self.registerVehicles()
 
         self._controlInterval = controlInterval
-        self._arrivalInterval = arrivalInterval
         self.lifeSpan = 0
 
     def registerVehicles(self):
@@ -59,13 +64,35 @@ class Platoon(object):
         '''
         return self._vehicles[0]
 
+    def _addArrivalIntervals(self, pltn):
+        '''_addArrivalIntervals(Platoon) -> void
+
+        Adds the bounds of the given platoon's arrival interval (i.e. the arrival intervals of its members)
+        to the bounds of this platoon's arrival interval.
+        '''
+        # both bound lists are sorted, sorting their concatenation merges the two runs in linear time
+        self._arrivalLowerBounds = sorted(self._arrivalLowerBounds + pltn._arrivalLowerBounds)
+        self._arrivalUpperBounds = sorted(self._arrivalUpperBounds + pltn._arrivalUpperBounds)
+
+    def _removeArrivalIntervals(self, vehs):
+        '''_removeArrivalIntervals(list(PVehicle)) -> void
+
+        Removes the arrival intervals of the given vehicles from the bounds of the platoon's arrival interval.
+        '''
+        for veh in vehs:
+            lower, upper = veh.arrivalInterval
+            del self._arrivalLowerBounds[bisect_left(self._arrivalLowerBounds, lower)]
+            del self._arrivalUpperBounds[bisect_left(self._arrivalUpperBounds, upper)]
+
     def removeVehicles(self, vehs):
         '''removeVehicles(PVehicle)
 
         Removes the vehicles from the platoon
         '''
-        for veh in vehs:
-            self._vehicles.remove(veh)
+        # one pass over the members for all removed vehicles (instead of list.remove() for each)
+        removed = set(vehs)
+        self._vehicles[:] = [veh for veh in self._vehicles if veh not in removed]
+        self._removeArrivalIntervals(vehs)
 
         if self.size() == 0:
             return
@@ -97,22 +124,33 @@ class Platoon(object):
     def getVehicles(self):
         '''getVehicles() -> list(PVehicle)
 
-        Returns the platoon members as an ordered list. The leader is at index 0.
+        Returns the platoon members as an ordered list. The leader is at index 0. The list must not be modified.
         '''
         return self._vehicles
 
+    def getFollowers(self):
+        '''getFollowers() -> iterator(PVehicle)
+
+        Iterates over the platoon members except the leader in their order (without copying the member list).
+        '''
+        return islice(self._vehicles, 1, None)
+
     def setVehicles(self, vehs):
         '''setVehicles(list(PVehicle))
 
-        Sets the platoon members. Used for reordering, e.g..
+        Sets the platoon members. Used for reordering, e.g.. The members must be the same as before,
+        such that the bounds of the arrival interval remain valid.
         '''
         self._vehicles = vehs
 
     def getArrivalInterval(self):
-        return self._arrivalInterval
+        '''getArrivalInterval() -> tuple(float, float)
 
-    def setArrivalInterval(self, arrivalInterval):
-        self._arrivalInterval = arrivalInterval
+        Returns the smallest interval containing the arrival intervals of all members (or None for an empty platoon).
+        '''
+        if not self._arrivalLowerBounds:
+            return None
+        return self._arrivalLowerBounds[0], self._arrivalUpperBounds[-1]
 
     def size(self):
         '''size() -> int
@@ -147,57 +185,26 @@ class Platoon(object):
         Note: safety assumptions of previous versions are dropped, now
         '''
         old_mode = self.getMode()
-        success = False
-        if mode == PlatoonMode.NONE:
-            if self.size() == 1:
-                if self._vehicles[0].isSwitchSafe(mode):
-                    self._vehicles[0].setPlatoonMode(mode)
-                    success = True
-                else:
-                    success = False
-            else:
-                # PlatoonMode.NONE is only admissible for solitons
-                success = False
-
-        elif mode == PlatoonMode.LEADER:
-            if self._vehicles[0].isSwitchSafe(mode):
-                self._vehicles[0].setPlatoonMode(mode)
-                # assign follower mode to other vehicles in the platoon
-                for veh in self._vehicles[1:]:
-                    if veh.isSwitchSafe(PlatoonMode.FOLLOWER):
-                        veh.setPlatoonMode(PlatoonMode.FOLLOWER)
-                success = True
-            else:
-                success = False
-
-        elif mode == PlatoonMode.CATCHUP:
-            if self._vehicles[0].isSwitchSafe(mode):
-                self._vehicles[0].setPlatoonMode(mode)
-                # assign catchup follower mode to other vehicles in the platoon
-                for veh in self._vehicles[1:]:
-                    if veh.isSwitchSafe(PlatoonMode.CATCHUP_FOLLOWER):
-                        veh.setPlatoonMode(PlatoonMode.CATCHUP_FOLLOWER)
-                success = True
-            else:
-                success = False
-
-        elif mode == PlatoonMode.CATCHUP_FOLLOWER or mode == PlatoonMode.FOLLOWER:
-            if self._vehicles[0].isSwitchSafe(mode):
-                self._vehicles[0].setPlatoonMode(mode)
-                # assign same mode to both leader and other vehicles
-                for veh in self._vehicles[1:]:
-                    if veh.isSwitchSafe(mode):
-                        veh.setPlatoonMode(mode)
-                success = True
-            else:
-                success = False
+        if not isinstance(mode, PlatoonMode):
+            raise ValueError("Unknown PlatoonMode %s" % str(mode))
 
+        if not ADMISSIBLE_FOR_PLATOONS[mode] and self.size() > 1:
+            # PlatoonMode.NONE is only admissible for solitons
+            success = False
+        elif self._vehicles[0].isSwitchSafe(mode):
+            self._vehicles[0].setPlatoonMode(mode)
+            # assign the corresponding follower mode to the other vehicles in the platoon
+            followerMode = FOLLOWER_MODE[mode]
+            for veh in self.getFollowers():
+                if veh.isSwitchSafe(followerMode):
+                    veh.setPlatoonMode(followerMode)
+            success = True
         else:
-            raise ValueError("Unknown PlatoonMode %s" % str(mode))
-        
+            success = False
+
         if rp.VERBOSITY >= 3 and success and not old_mode == mode:
             report("Activated mode {mode} for platoon '{pltnID}' ({pltn_members})".format(
-                               mode=mode, pltnID=self.getID(), pltn_members=str([veh.getID() for veh in self.getVehicles()])))
+                               mode=PlatoonMode(mode).name, pltnID=self.getID(), pltn_members=str([veh.getID() for veh in self.getVehicles()])))
         
         return success
 
@@ -215,16 +222,12 @@ class Platoon(object):
             # TODO: increase switch impatience/(waiting time) here, too?
             pass
 
-        if mode == PlatoonMode.LEADER:
-            # use follower mode for followers if platoon is in normal mode
-            mode = PlatoonMode.FOLLOWER
-
-        if mode == PlatoonMode.CATCHUP:
-            # use catchupfollower mode for followers if platoon is in catchup mode
-            mode = PlatoonMode.CATCHUP_FOLLOWER
+        # use follower mode for followers if platoon is in normal mode and
+        # catchupfollower mode if platoon is in catchup mode
+        mode = FOLLOWER_MODE[mode]
 
         # impose mode for followers
-        for veh in vehs[1:]:
+        for veh in self.getFollowers():
             if veh.isSwitchSafe(mode):
                 veh.setPlatoonMode(mode)
             else:
@@ -246,13 +249,14 @@ class Platoon(object):
         mode = PlatoonMode.LEADER if (index < self.size() - 1) else PlatoonMode.NONE
         # splitImpatience = 1. - math.exp(min([0., splitLeader._timeUntilSplit]))
 
-        pltn = Platoon(self._vehicles[index:], self._controlInterval, None, False)
+        pltn = Platoon(self._vehicles[index:], self._controlInterval, False)
 
         if not pltn.setModeWithImpatience(mode, self._controlInterval):
             # could not split off platoon safely
             return None
 
         # split can be taken out safely -> reduce vehicles in this platoon
+        self._removeArrivalIntervals(pltn.getVehicles())
         self._vehicles = self._vehicles[:index]
 
         # print("BEFORE SPLIT", pltn.getID())
@@ -261,7 +265,6 @@ class Platoon(object):
         pltn.registerVehicles()
         # print("AFTER SPLIT", pltn.getID())
         # print("veh[0]", self._vehicles[0].getPlatoon().getID())
-        pltn.adjustInterval()
 
         if len(self._vehicles) == 1:
             # only one vehicle remains, turn off its platoon-specific behavior
@@ -280,6 +283,7 @@ class Platoon(object):
                 # for v in vehs:
                 #     v.setPlatoon(self)
                 self._vehicles.extend(vehs)
+                self._addArrivalIntervals(pltn)
 
                 # print("join-case-1 before", vehs[0].getPlatoon().getID())
                 # set reference to new platoon in splitted vehicles
@@ -302,6 +306,7 @@ class Platoon(object):
             # for v in vehs:
             #     v.setPlatoon(self)
             self._vehicles.extend(vehs)
+            self._addArrivalIntervals(pltn)
 
             # print("join-case-3 before", vehs[0].getPlatoon().getID())
             self.registerVehicles()
@@ -316,24 +321,14 @@ class Platoon(object):
 
         Returns the platoon leader's desired PlatoonMode (may return LEADER if current mode is FOLLOWER).
         '''
-        mode = self._vehicles[0].getCurrentPlatoonMode()
-        if mode == PlatoonMode.FOLLOWER:
-            # Leader was kept in FOLLOW mode due to safety constraints
-            mode = PlatoonMode.LEADER
-        elif mode == PlatoonMode.CATCHUP_FOLLOWER:
-            # Leader was kept in CATCHUP_FOLLOW mode due to safety constraints
-            mode = PlatoonMode.CATCHUP
-        return mode
-
-    # see https://stackoverflow.com/questions/13145368/find-the-maximum-value-in-a-list-of-tuples-in-python and
-    # app.tests.arrivals
-    def adjustInterval(self):
-        intervals = []
-        for veh in self._vehicles:
-            intervals.append(veh.arrivalInterval)
+        # Leader may have been kept in FOLLOW or CATCHUP_FOLLOW mode due to safety constraints
+        return PLATOON_MODE[self._vehicles[0].getCurrentPlatoonMode()]
 
-        min_interval = min(intervals, key=itemgetter(0))[0]
-        max_interval = max(intervals, key=itemgetter(1))[1]
-        self.setArrivalInterval((min_interval, max_interval))
-        # self._arrivalInterval = min_interval, max_interval
+    def adjustInterval(self):
+        '''adjustInterval() -> void
 
+        Recomputes the bounds of the platoon's arrival interval from the members' arrival intervals,
+        e.g., after these have changed.
+        '''
+        self._arrivalLowerBounds = sorted(veh.arrivalInterval[0] for veh in self._vehicles)
+        self._arrivalUpperBounds = sorted(veh.arrivalInterval[1] for veh in self._vehicles)
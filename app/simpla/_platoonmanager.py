@@ -7,13 +7,17 @@
 
 # TODO: For CATCHUP_FOLLOWER mode could also be set active if intra-platoon gap becomes too large
 
-import traci
-import traceback
+from app.sumo.Backend import traci
 import traci.constants as tc
 import _reporting as rp
 import _config as cfg
 import _pvehicle
 import _platoon
+import _statesync
+import _network
+import _exitplan
+import _modetable
+import _parameters
 import random
 import app.Config as Config
 import numpy as np
@@ -21,15 +25,36 @@ import numpy as np
 from _utils import SimplaException
 from _reporting import simTime
 from _platoonmode import PlatoonMode
+from _laneindex import LaneOccupancyIndex
+from _spawner import SpawnSampler
+from _arrivalindex import ArrivalIntervalIndex
+from _commandbuffer import CommandBuffer
+from _fleetstate import FleetState
+from _safety import SafetyEvaluator, VTypeTable
+from _statistics import StatisticsService
 from _collections import defaultdict
 from collections import namedtuple
-from traci.exceptions import TraCIException
+from app.sumo.Backend import TraCIException
 from app.streaming import KafkaPublisher
 
 warn = rp.Warner("PlatoonManager")
 report = rp.Reporter("PlatoonManager")
 PWP = namedtuple("PWP", ["first_carID", "second_carID"]) # https://stackoverflow.com/questions/4878881/python-tuples-dictionaries-as-keys-select-sort
 
+# vType mappings (original vType, mapped vTypes) which have been checked and whose parameters are stored in
+# _pvehicle.vTypeParameters. They are kept if the manager is recreated for the same scenario (see clearVTypeCache()).
+_validatedVTypes = set()
+
+
+def clearVTypeCache():
+    '''clearVTypeCache() -> void
+
+    Forgets the checked vType mappings and the vType parameters, e.g., before loading a scenario with different vTypes.
+    '''
+    _validatedVTypes.clear()
+    _pvehicle.vTypeParameters.clear()
+
+
 class PlatoonManager(traci.StepListener):
     '''
     A PlatoonManager coordinates the initialization of platoons
@@ -44,7 +69,7 @@ class PlatoonManager(traci.StepListener):
     _connectedVehicles = None
     ignore_first_n_results = None
     sample_size = None
-    extended_simpla_logic = Config
+    extended_simpla_logic = None
 
     def __init__(self):
         ''' PlatoonManager()
@@ -64,6 +89,8 @@ class PlatoonManager(traci.StepListener):
         self._maxPlatoonGap = cfg.MAX_PLATOON_GAP
         # max distance for trying to catch up
         self._catchupDist = cfg.CATCHUP_DISTANCE
+        # whether platoons are only joined if the arrival intervals overlap (see _compatiblePlatoonAhead())
+        self.extended_simpla_logic = Config.parameters["contextual"]["extended_simpla_logic"]
 
         # platoons currently in the simulation
         # map: platoon ID -> platoon objects
@@ -71,6 +98,14 @@ class PlatoonManager(traci.StepListener):
         # IDs of all potential platoon members currently in the simulation
         # map: ID -> vehicle
         self._connectedVehicles = dict()
+        # states of the connected vehicles, PVehicle.state is a view onto the vehicle's row
+        self._fleet = FleetState(quantileSamples=cfg.TRIP_QUANTILE_SAMPLES)
+        # vehicle commands issued during a step, sent at the end of the step
+        self._commands = CommandBuffer()
+        # statistics of the trips of the arrived platoon vehicles (see get_statistics())
+        self._statistics = StatisticsService(cfg.STATISTICS_WINDOW, cfg.STATISTICS_SAMPLES)
+        # mode switch safety checks, evaluated for all vehicles once per control step
+        self._safety = SafetyEvaluator(self._fleet, VTypeTable(_pvehicle.vTypeParameters))
 
         self.carIndex = 0
 
@@ -89,6 +124,11 @@ class PlatoonManager(traci.StepListener):
 
         self._timeSinceLastControl = 1000.
 
+        # index of the vehicles on the corridor lanes (used to find connected vehicles further downstream)
+        self._laneIndex = LaneOccupancyIndex(_network.getCorridorEdges())
+        # index of the platoons by arrival edge and position (used to find platoons that may be joined)
+        self._arrivalIndex = ArrivalIntervalIndex(self._fleet)
+
         # Check for undefined vtypes and fill with defaults
         for origType, specialTypes in cfg.PLATOON_VTYPES.items():
             if specialTypes[PlatoonMode.FOLLOWER] is None:
@@ -120,6 +160,10 @@ class PlatoonManager(traci.StepListener):
             if origType not in knownVTypes:
                 raise SimplaException(
                     "vType '%s' is unknown to sumo! Note: Platooning vTypes must be defined at startup." % origType)
+            mapping = (origType, tuple(sorted(mappings.items())))
+            if mapping in _validatedVTypes:
+                # checked by a previous manager (e.g. before a reload of the same scenario)
+                continue
             origLength = traci.vehicletype.getLength(origType)
             origEmergencyDecel = traci.vehicletype.getEmergencyDecel(origType)
             for typeID in list(mappings.values()) + [origType]:
@@ -143,38 +187,171 @@ class PlatoonManager(traci.StepListener):
                 _pvehicle.vTypeParameters[typeID][tc.VAR_MINGAP] = traci.vehicletype.getMinGap(typeID)
                 _pvehicle.vTypeParameters[typeID][tc.VAR_EMERGENCY_DECEL] = traci.vehicletype.getEmergencyDecel(
                     typeID)
+            _validatedVTypes.add(mapping)
+
+        # platoon vehicles are inserted with the known vTypes selected by the type substrings
+        platoonVTypes = [typeID for typeID in knownVTypes if typeID not in ("DEFAULT_PEDTYPE", "DEFAULT_VEHTYPE")
+                         and self._hasConnectedType(typeID)]
+        self._spawnSampler = SpawnSampler(platoonVTypes, random.randint(0, 2 ** 31 - 1))
+        # number of vehicles waiting for insertion (see _spawnVehicles())
+        self._spawnBacklog = dict(normal=0, platoon=0)
+        # IDs of the routes which have been checked by traci.vehicle.isRouteValid()
+        self._validRoutes = set()
+
+        # optional profiling of the TraCI traffic (see getTraCICallCounts())
+        self._traciCallCounter = None
+        self._traciCallCounts = dict(step=0, control=0, controlGetters=0)
+        if cfg.COUNT_TRACI_CALLS:
+            self._traciCallCounter = _statesync.TraCICallCounter()
+            self._traciCallCounter.install()
+
+        # runtime changes of the parameters in Config.parameters are pushed into the manager (see _applyParameters())
+        _parameters.addListener(self._applyParameters)
 
     def step(self, t=0):
-        '''step(int)
+        '''step(int) -> bool
 
-        Manages platoons at each time step.
+        Manages platoons at each time step. Returns True to stay registered as step listener.
         NOTE: argument t is unused, larger step sizes than DeltaT are not supported.
         '''
         if not t == 0 and rp.VERBOSITY >= 1:
             warn("Step lengths that differ from SUMO's simulation step length are not supported and probably lead to undesired behavior.\nConsider decreasing simpla's control rate instead.")
+        stepCallsBegin = self._countTraCICalls()
         # Handle vehicles entering and leaving the simulation
         self._removeArrived()
         self._timeSinceLastControl += self._DeltaT
         if self._timeSinceLastControl >= self._controlInterval:
+            controlCallsBegin = self._countTraCICalls()
+            controlGettersBegin = self._countTraCICalls(getters=True)
             self._updateVehicleStates()
             self._manageFollowers()
             self._updatePlatoonOrdering()
             self._manageLeaders()
             self._adviseLanes()
             self._timeSinceLastControl = 0.
+            # send the vehicle commands of the control step
+            self._commands.flush()
+            self._traciCallCounts["control"] = self._countTraCICalls() - controlCallsBegin
+            self._traciCallCounts["controlGetters"] = self._countTraCICalls(getters=True) - controlGettersBegin
+        else:
+            # send the commands of vehicles inserted in this step
+            self._commands.flush()
+        self._traciCallCounts["step"] = self._countTraCICalls() - stepCallsBegin
+        if self._traciCallCounter is not None and rp.VERBOSITY >= 3:
+            report("TraCI calls in last step: %(step)s (control loop: %(control)s, thereof getters: %(controlGetters)s)"
+                   % self._traciCallCounts)
+        return True
+
+    def _countTraCICalls(self, getters=False):
+        '''_countTraCICalls(bool) -> int
+        Returns the number of TraCI calls (or only value retrievals if getters is set) counted so far,
+        or 0 if counting is disabled.
+        '''
+        if self._traciCallCounter is None:
+            return 0
+        if getters:
+            return self._traciCallCounter.getterCount()
+        return self._traciCallCounter.count()
+
+    def getCommandCounts(self):
+        '''getCommandCounts() -> dict
+        Returns the numbers of vehicle commands sent to SUMO and of the writes which were skipped because
+        they were overwritten within the step or did not change the value, see CommandBuffer.getCounts().
+        '''
+        return self._commands.getCounts()
+
+    def getTraCICallCounts(self):
+        '''getTraCICallCounts() -> dict
+        Returns the number of TraCI calls issued during the last step ('step'), during the last
+        execution of the control loop ('control') and the number of value retrievals within the
+        control loop ('controlGetters'). Requires the config option countTraCICalls.
+        '''
+        return dict(self._traciCallCounts)
 
     def stop(self):
         '''stop()
 
         Immediately resets all vtypes, releases all vehicles from the managers control, and unsubscribe them from traci
         '''
+        _parameters.removeListener(self._applyParameters)
         for veh in self._connectedVehicles.values():
             veh.setPlatoonMode(PlatoonMode.NONE)
+        self._commands.flush()
+        for veh in self._connectedVehicles.values():
             traci.vehicle.unsubscribe(veh.getID())
+        self._commands = CommandBuffer()
+        self._laneIndex.close()
+        if self._traciCallCounter is not None:
+            self._traciCallCounter.uninstall()
+            self._traciCallCounter = None
         self._connectedVehicles = dict()
+        self._fleet.clear()
         self._platoons = dict()
         self.carIndex = 0
         _platoon._nextID = 0
+        _exitplan.clear()
+        _modetable.clear()
+
+    def getSnapshot(self):
+        '''getSnapshot() -> dict
+
+        Returns the state of the manager needed to continue the simulation from a SUMO state saved at the same time
+        (see traci.simulation.saveState() and restoreSnapshot()): the connected vehicles with their trip metrics,
+        the platoons, the counters and the random states. The snapshot can be pickled.
+        '''
+        vehicles = []
+        for veh in sorted(self._connectedVehicles.values(), key=lambda v: v.state.getHandle()):
+            snapshot = veh.getSnapshot()
+            snapshot["trip"] = self._fleet.getTripRow(veh.state.getHandle())
+            vehicles.append(snapshot)
+        platoons = [(pltn.getID(), pltn.lifeSpan, [veh.getID() for veh in pltn.getVehicles()])
+                    for pltn in self._platoons.values()]
+        return dict(simTime=simTime(), vehicles=vehicles, platoons=platoons, carIndex=self.carIndex,
+                    spawnBacklog=dict(self._spawnBacklog), validRoutes=sorted(self._validRoutes),
+                    timeSinceLastControl=self._timeSinceLastControl, nextPlatoonID=_platoon._nextID,
+                    random=random.getstate(), spawnSampler=self._spawnSampler.getRandomState())
+
+    def restoreSnapshot(self, snapshot):
+        '''restoreSnapshot(dict) -> void
+
+        Recreates the connected vehicles and platoons of a snapshot (see getSnapshot()) after SUMO loaded the state
+        saved together with the snapshot. The manager must not control any vehicles yet.
+        '''
+        if self._connectedVehicles:
+            raise SimplaException("A snapshot can only be restored into a platoon manager without vehicles.")
+        if abs(snapshot["simTime"] - simTime()) > self._DeltaT / 2.:
+            if rp.VERBOSITY >= 1:
+                warn("Restoring a snapshot taken at time %s at time %s." % (snapshot["simTime"], simTime()), True)
+        fleet = self._fleet
+        for vehSnapshot in snapshot["vehicles"]:
+            vehID = vehSnapshot["ID"]
+            veh = _pvehicle.PVehicle(vehID, vehSnapshot["currentRouteBeginTime"],
+                                     _exitplan.getExitPlan(vehSnapshot["arrivalEdge"]),
+                                     vehSnapshot["arrivalLaneNumber"], vehSnapshot["arrivalPos"])
+            veh.setState(self._controlInterval, fleet, self._commands, self._safety, vehSnapshot["vType"],
+                         vehSnapshot["maxSpeed"])
+            veh.restoreSnapshot(vehSnapshot)
+            fleet.setTripRow(veh.state.getHandle(), vehSnapshot["trip"])
+            # the subscriptions are not part of the saved state
+            _statesync.subscribe(vehID, self._catchupDist)
+            self._connectedVehicles[vehID] = veh
+        # the solitons created by setState() are replaced by the saved platoons
+        for pltnID, lifeSpan, vehIDs in snapshot["platoons"]:
+            pltn = _platoon.Platoon([self._connectedVehicles[vehID] for vehID in vehIDs], self._controlInterval)
+            pltn.setID(pltnID)
+            pltn.registerVehicles()
+            pltn.lifeSpan = lifeSpan
+            self._platoons[pltnID] = pltn
+        _platoon._nextID = snapshot["nextPlatoonID"]
+        self.carIndex = snapshot["carIndex"]
+        self._spawnBacklog = dict(snapshot["spawnBacklog"])
+        self._validRoutes = set(snapshot["validRoutes"])
+        self._timeSinceLastControl = snapshot["timeSinceLastControl"]
+        random.setstate(snapshot["random"])
+        self._spawnSampler.setRandomState(snapshot["spawnSampler"])
+        if rp.VERBOSITY >= 2:
+            report("Restored %d vehicles in %d platoons from snapshot of time %s" %
+                   (len(self._connectedVehicles), len(self._platoons), snapshot["simTime"]), True)
 
     def getPlatoonLeaders(self):
         '''getPlatoonLeaders() -> list(PVehicle)
@@ -195,58 +372,55 @@ class PlatoonManager(traci.StepListener):
         This updates the vehicles' states with information from the simulation
         '''
         self._subscriptionResults = traci.vehicle.getSubscriptionResults()
-        for veh in self._connectedVehicles.values():
-            veh.state.speed = self._subscriptionResults[veh.getID()][tc.VAR_SPEED]
-            veh.state.edgeID = self._subscriptionResults[veh.getID()][tc.VAR_ROAD_ID]
-            veh.state.laneID = self._subscriptionResults[veh.getID()][tc.VAR_LANE_ID]
-            veh.state.laneIX = self._subscriptionResults[veh.getID()][tc.VAR_LANE_INDEX]
-            veh.state.leaderInfo = traci.vehicle.getLeader(veh.getID(), self._catchupDist)
-
-            # getDistance returns the distance the vehicle has already driven [in m]
-            veh.state.distance = traci.vehicle.getDistance(veh.getID())
-
-            # Emissions
-            FuelConsumption = self._subscriptionResults[veh.getID()][tc.VAR_FUELCONSUMPTION]
-
-            # sometimes reported values are always -1001 (error value) so we filter them out
-            if FuelConsumption > 0:
-                veh.state.reportedFuelConsumptions.append(FuelConsumption)
-            if veh.state.speed > 0:
-                veh.state.reportedSpeeds.append(veh.state.speed)
-
-            # update respective metrics if there are more than 1 cars or only single car in each vehicle's platoon
-            if len(veh.getPlatoon().getVehicles()) > 1:
-                veh.state.durationInsidePlatoon += 1
+        self._laneIndex.update(self._connectedVehicles)
+        fleet = self._fleet
+        vehIDs = list(self._connectedVehicles.keys())
+        handles = fleet.getHandles(vehIDs)
+        previousLeaderIDs = fleet.leaderID[handles]
+        # copy all subscribed values into the fleet's columns
+        fleet.update(handles, vehIDs, self._subscriptionResults)
+        if not _statesync.LEADER_SUBSCRIBED:
+            # getLeader() excludes the follower's minGap from the returned distance
+            leaderInfos = []
+            for vehID, handle in zip(vehIDs, handles):
+                veh = self._connectedVehicles[vehID]
+                leaderInfo = self._laneIndex.leader(fleet.laneID[handle], fleet.lanePosition[handle],
+                                                    self._catchupDist, veh.edgesToTravel, fleet.routeIndex[handle])
+                if leaderInfo is not None:
+                    minGap = _pvehicle.vTypeParameters[veh.getCurrentVType()][tc.VAR_MINGAP]
+                    leaderInfo = (leaderInfo[0], leaderInfo[1] - minGap)
+                leaderInfos.append(leaderInfo)
+            fleet.setLeaderInfos(handles, leaderInfos)
+
+        # accumulate speeds, fuel consumptions and the time spent inside/outside of platoons for the trip statistics
+        fleet.updateTripMetrics(handles, [self._subscriptionResults[vehID][tc.VAR_FUELCONSUMPTION]
+                                          for vehID in vehIDs])
+
+        # reset the leader references for vehicles without leader
+        leaderIDs = fleet.leaderID[handles]
+        hasLeader = np.not_equal(leaderIDs, None)
+        fleet.leader[handles[~hasLeader]] = None
+        fleet.connectedVehicleAhead[handles[~hasLeader]] = False
+
+        # the leader reference has to be determined anew if the leader changed or is not connected
+        unresolved = hasLeader & (np.not_equal(leaderIDs, previousLeaderIDs) | np.equal(fleet.leader[handles], None))
+        for i in np.flatnonzero(unresolved):
+            handle = handles[i]
+            if self._isConnected(leaderIDs[i]):
+                fleet.leader[handle] = self._connectedVehicles[leaderIDs[i]]
+                fleet.connectedVehicleAhead[handle] = True
             else:
-                veh.state.durationOutsidePlatoon += 1
-
-            if veh.state.leaderInfo is None:
-                veh.state.leader = None
-                veh.state.connectedVehicleAhead = False
-                continue
-
-            if veh.state.leader is None or veh.state.leader.getID() != veh.state.leaderInfo[0]:
-                if self._isConnected(veh.state.leaderInfo[0]):
-                    veh.state.leader = self._connectedVehicles[veh.state.leaderInfo[0]]
-                    veh.state.connectedVehicleAhead = True
-                else:
-                    # leader is not connected -> check whether a connected vehicle is located further downstream
-                    veh.state.leader = None
-                    veh.state.connectedVehicleAhead = False
-                    vehAheadID = veh.state.leaderInfo[0]
-                    dist = veh.state.leaderInfo[1] + traci.vehicle.getLength(vehAheadID)
-                    while dist < self._catchupDist:
-                        nextLeaderInfo = traci.vehicle.getLeader(vehAheadID, self._catchupDist - dist)
-                        if nextLeaderInfo is None:
-                            break
-                        vehAheadID = nextLeaderInfo[0]
-                        if self._isConnected(vehAheadID):
-                            veh.state.connectedVehicleAhead = True
-                            if rp.VERBOSITY >= 4:
-                                report("Found connected vehicle '%s' downstream of vehicle '%s' (at distance %s)" %
-                                       (vehAheadID, veh.getID(), dist + nextLeaderInfo[1]))
-                            break
-                        dist += nextLeaderInfo[1] + traci.vehicle.getLength(vehAheadID)
+                # leader is not connected -> check whether a connected vehicle is located further downstream
+                fleet.leader[handle] = None
+                fleet.connectedVehicleAhead[handle] = self._laneIndex.connectedAhead(
+                    fleet.laneID[handle], fleet.lanePosition[handle], self._catchupDist,
+                    self._connectedVehicles[vehIDs[i]].edgesToTravel, fleet.routeIndex[handle])
+                if rp.VERBOSITY >= 4 and fleet.connectedVehicleAhead[handle]:
+                    report("Found connected vehicle downstream of vehicle '%s' (within %s)" %
+                           (vehIDs[i], self._catchupDist))
+
+        # evaluate the safety checks for mode switches with the new states
+        self._safety.evaluate(handles)
 
     def _removeArrived(self):
         ''' _removeArrived()
@@ -256,7 +430,8 @@ class PlatoonManager(traci.StepListener):
         '''
         count = 0
         toRemove = defaultdict(list)
-        for ID in traci.simulation.getArrivedIDList():
+        arrivedIDs = traci.simulation.getArrivedIDList()
+        for ID in arrivedIDs:
             # first store arrived vehicles platoonwise
             if not self._isConnected(ID):
                 continue
@@ -264,6 +439,8 @@ class PlatoonManager(traci.StepListener):
                 report("Removing arrived vehicle '%s'" % ID)
             veh = self._connectedVehicles.pop(ID)
             self._publishStatistics(veh)
+            self._fleet.release(ID)
+            self._commands.forget(ID)
             toRemove[veh.getPlatoon().getID()].append(veh)
             count += 1
 
@@ -275,14 +452,14 @@ class PlatoonManager(traci.StepListener):
                 self._platoons.pop(pltn.getID())
 
         # Re-add removed cars (both normal & platoon) into the system
-        # Returns a list of ids of arrived vehicles (reached their destination and removed from the road network)
-        for ID in traci.simulation.getArrivedIDList():
+        for ID in arrivedIDs:
             # The only way to distinguish the type of arrived car is to look at its id
-            # vehID is either "normal-car-idx" or "platoon-car-pltnidx", see _addNormalVehicle & _addPlatoonVehicle
+            # vehID is either "normal-car-idx" or "platoon-car-idx", see _addNormalVehicles & _addPlatoonVehicles
             if "platoon" in ID:
-                self._addPlatoonVehicle()
+                self._spawnBacklog["platoon"] += 1
             else:
-                self._addNormalVehicle()
+                self._spawnBacklog["normal"] += 1
+        self._spawnVehicles()
 
         return count
 
@@ -299,7 +476,7 @@ class PlatoonManager(traci.StepListener):
             pltn.adviseMemberModes()
             # splitIndices: indices of vehicles that request a split
             splitIndices = []
-            for ix, veh in enumerate(pltn.getVehicles()[1:]):
+            for ix, veh in enumerate(pltn.getFollowers()):
                 # check whether to split the platoon at index ix
                 leaderInfo = veh.state.leaderInfo
                 # if leaderInfo is None:
@@ -363,6 +540,7 @@ class PlatoonManager(traci.StepListener):
         '''
         # list of platoon ids that merged into another platoon
         toRemove = []
+        self._arrivalIndex.rebuild(self._platoons.values())
         for pltnID, pltn in self._platoons.items():
             # platoon leader
             pltnLeader = pltn.getLeader()
@@ -387,7 +565,7 @@ class PlatoonManager(traci.StepListener):
 
             if not self._isConnected(leaderInfo[0]):
                 # Immediate leader is not connected
-                if pltnLeader.state.connectedVehicleAhead:
+                if pltnLeader.state.connectedVehicleAhead and self._compatiblePlatoonAhead(pltn, toRemove):
                     # ... but further downstream there is a potential platooning partner
                     pltn.setModeWithImpatience(PlatoonMode.CATCHUP, self._controlInterval)
                 elif pltn.size() == 1:
@@ -408,8 +586,8 @@ class PlatoonManager(traci.StepListener):
             # Check if leader is on pltnLeader's route
             # (sometimes a 'linkLeader' on junction is returned by traci.getLeader())
             # XXX: This prevents joining attempts on internal lanes (probably doesn't hurt so much)
-            pltnLeaderRoute = traci.vehicle.getRoute(pltnLeader.getID())
-            pltnLeaderRouteIx = traci.vehicle.getRouteIndex(pltnLeader.getID())
+            # The route is fixed at insertion (see _addPlatoonVehicle()), the route index is subscribed
+            pltnLeaderRoute = pltnLeader.edgesToTravel
             leaderEdge = leader.state.edgeID
 
             # if leaderArrivalPos is not within arrivalInterval (type tuple = (min, max)) of platoon
@@ -420,7 +598,7 @@ class PlatoonManager(traci.StepListener):
             pltnLeaderLastEdgeID = pltnLeaderRoute[-1]
 
             # usual simpla logic
-            if leaderEdge not in pltnLeaderRoute[pltnLeaderRouteIx:]:
+            if not pltnLeader.isOnRemainingRoute(leaderEdge):
                 continue
 
             if leader.getPlatoon() == pltn:
@@ -428,14 +606,14 @@ class PlatoonManager(traci.StepListener):
                 continue
 
             # usual simpla logic: if currentEdge of leader is no in pltn's route, then they don't merge
-            if leadersArrivalEdge != pltnLeaderLastEdgeID:
+            # use additional restriction for the leader's arrival position if it's set
+            if leadersArrivalEdge != pltnLeaderLastEdgeID or (self.extended_simpla_logic and (
+                    leaderArrivalPos < pltnArrivalInterval[0] or leaderArrivalPos > pltnArrivalInterval[1])):
+                # the leader's platoon cannot be joined, try to catch up with a compatible platoon further downstream
+                if self._compatiblePlatoonAhead(pltn, toRemove, leader.getPlatoon()):
+                    pltn.setModeWithImpatience(PlatoonMode.CATCHUP, self._controlInterval)
                 continue
 
-            # use additional restriction if it's set
-            if self.extended_simpla_logic:
-                if leaderArrivalPos < pltnArrivalInterval[0] or leaderArrivalPos > pltnArrivalInterval[1]:
-                    continue
-
             # print("pltnLeaderLastEdgeID", pltnLeaderLastEdgeID, "pltnArrivalInterval", pltnArrivalInterval, "leadersArrivalEdge", leadersArrivalEdge, "leaderArrivalPos", leaderArrivalPos)
 
             if leaderDist <= self._maxPlatoonGap:
@@ -444,7 +622,7 @@ class PlatoonManager(traci.StepListener):
                 nrOfVehiclesCondition = True
                 if self.extended_simpla_logic:
                     # find desired result
-                    nrOfVehiclesCondition = (len(leader.getPlatoon().getVehicles()) + len(pltn.getVehicles())) <= Config.parameters["changeable"]["maxVehiclesInPlatoon"]
+                    nrOfVehiclesCondition = (leader.getPlatoon().size() + pltn.size()) <= Config.parameters["changeable"]["maxVehiclesInPlatoon"]
 
                 if nrOfVehiclesCondition:
                     # Try to join the platoon in front (usual simpla)
@@ -484,6 +662,23 @@ class PlatoonManager(traci.StepListener):
         for pltnID in toRemove:
             self._platoons.pop(pltnID)
 
+    def _compatiblePlatoonAhead(self, pltn, merged, excluded=None):
+        '''_compatiblePlatoonAhead(Platoon, list(int), Platoon) -> bool
+        Returns whether a platoon that has the same arrival edge as the given platoon (and an intersecting arrival
+        interval if extended_simpla_logic is set) is located downstream within the catchup distance. Platoons with
+        IDs in 'merged' and the excluded platoon are not considered.
+        '''
+        pltnLeader = pltn.getLeader()
+        arrivalInterval = pltn.getArrivalInterval() if self.extended_simpla_logic else None
+        for candidateID in self._arrivalIndex.compatiblePlatoons(pltnLeader.edgesToTravel[-1], arrivalInterval,
+                                                                 pltnLeader.state.distance, self._catchupDist):
+            if candidateID == pltn.getID() or candidateID in merged or candidateID not in self._platoons:
+                continue
+            if excluded is not None and candidateID == excluded.getID():
+                continue
+            return True
+        return False
+
     def _updatePlatoonOrdering(self):
         '''_manageLeaders()
         Iterates through platoons and checks whether they are in an appropriate order.
@@ -494,32 +689,27 @@ class PlatoonManager(traci.StepListener):
         for pltnID, pltn in self._platoons.items():
             if pltn.size() == 1:
                 continue
-            # collect leaders within platoon
+            # collect leaders within platoon (state.leader is the connected leader, see _updateVehicleStates())
             intraPlatoonLeaders = []
-            leaderID = None
-            for ix, veh in enumerate(pltn.getVehicles()):
-                leaderFromeSamePlatoon = False
-                if veh.state.leaderInfo is not None:
-                    # leader detected
-                    leaderID = veh.state.leaderInfo[0]
-                    if self._isConnected(leaderID):
-                        # leader is connected
-                        leader = self._connectedVehicles[leaderID]
-                        if leader.getPlatoon() == pltn:
-                            # leader belongs to same platoon
-                            leaderFromeSamePlatoon = True
-                            intraPlatoonLeaders.append(leader)
-
-                if not leaderFromeSamePlatoon:
+            for veh in pltn.getVehicles():
+                leader = veh.state.leader
+                if leader is not None and leader.getPlatoon() == pltn:
+                    # leader belongs to same platoon
+                    intraPlatoonLeaders.append(leader)
+                else:
                     intraPlatoonLeaders.append(None)
 
                 if rp.VERBOSITY >= 4:
+                    leaderInfo = veh.state.leaderInfo
                     report("Platoon %s: Leader for veh '%s' is '%s' (%s)"
-                           % (pltn.getID(), veh.getID(), str(leaderID),
+                           % (pltn.getID(), veh.getID(), str(leaderInfo[0] if leaderInfo is not None else None),
                               ("same platoon" if (intraPlatoonLeaders[-1] is not None) else "not from same platoon")),
                            3)
 
-            pltn.setVehicles(self.reorderVehicles(pltn.getVehicles(), intraPlatoonLeaders))
+            vehicles = pltn.getVehicles()
+            newVehOrder = self.reorderVehicles(vehicles, intraPlatoonLeaders)
+            if newVehOrder is not vehicles:
+                pltn.setVehicles(newVehOrder)
 
     @staticmethod
     def reorderVehicles(vehicles, actualLeaders):
@@ -528,107 +718,113 @@ class PlatoonManager(traci.StepListener):
         This method reorders the given vehicles such that the newly ordered vehicles fulfill:
         [None] + vehicles[:-1] == actualLeaders (if not several vehicles have the same actual leader.
         For those it is only guaranteed that one will be associated correctly, not specifying which one)
+        Vehicles without actual leader keep their relative order and are followed by the chain of vehicles
+        that have them as actual leader. If the order is already consistent, the given list is returned.
         '''
+        if rp.VERBOSITY >= 4:
+            report("vehicles: %s" % rp.array2String(vehicles), 3)
+            report("Actual leaders: %s" % rp.array2String(actualLeaders), 3)
 
-        #         if rp.VERBOSITY >= 4:
-        #             report("reorderVehicles(vehicles, actualLeaders)\nvehicles = %s\nactualLeaders=%s" %
-        #                    (rp.array2String(vehicles), rp.array2String(actualLeaders)), 3)
-
-        done = False
-        # this is needed as abort criterion if two have the same leader (This cannot be excluded for sublane at least)
-        iter_count = 0
-        nVeh = len(vehicles)
-        # make a copy to write into
-        actualLeaders = list(actualLeaders)
-        while(not done and iter_count < nVeh):
-            newVehOrder = None
-            registeredLeaders = [None] + vehicles[:-1]
-            if rp.VERBOSITY >= 4:
-                report("vehicles: %s" % rp.array2String(vehicles), 3)
-                report("Actual leaders: %s" % rp.array2String(actualLeaders), 3)
-                report("registered leaders: %s" % rp.array2String(registeredLeaders), 3)
-            for (ego, registeredLeader, actualLeader) in reversed(
-                    list(zip(vehicles, registeredLeaders, actualLeaders))):
-                if (ego == actualLeader):
-                    if rp.VERBOSITY >= 1:
-                        warn(("Platoon %s:\nVehicle '%s' was found as its own leader. " +
-                              "Platoon order might be corrupted.") % (
-                                 rp.array2String(vehicles), str(ego)))
-                    return vehicles
-
-                if actualLeader is None:
-                    # No actual leader was found. Could be due to platoon LC maneuver or non-connected vehicle
-                    # merging in
-                    # -> no reordering implications.
-                    continue
-                if actualLeader == registeredLeader:
-                    continue
-
-                # intra-platoon order is corrupted
-                if newVehOrder is None:
-                    # init newVehOrder
-                    newVehOrder = list(vehicles)
-
-                # relocate ego
-
-                if rp.VERBOSITY >= 4:
-                    report("relocating: %s to follow %s" % (str(ego), str(actualLeader)), 3)
-                    report("prior newVehOrder: %s" % rp.array2String(newVehOrder), 3)
-                    report("prior actualLeaders: %s" % rp.array2String(actualLeaders), 3)
-                oldEgoIndex = newVehOrder.index(ego)
-                del newVehOrder[oldEgoIndex]
-                del actualLeaders[oldEgoIndex]
-
-                if rp.VERBOSITY >= 4:
-                    report("immed newVehOrder: %s" % rp.array2String(newVehOrder), 3)
-                    report("immed actualLeaders: %s" % rp.array2String(actualLeaders), 3)
-                actualLeaderIndex = newVehOrder.index(actualLeader)
-                newVehOrder.insert(actualLeaderIndex + 1, ego)
-                actualLeaders.insert(actualLeaderIndex + 1, actualLeader)
-                if rp.VERBOSITY >= 4:
-                    report("current newVehOrder: %s" % rp.array2String(newVehOrder), 3)
-                    report("current actualLeaders: %s" % rp.array2String(actualLeaders), 3)
-
-            done = newVehOrder is None
-            if not done:
-                vehicles = newVehOrder
-                iter_count += 1
-
-        if iter_count != 0:
-            if rp.VERBOSITY >= 3:
-                report("Ordering within Platoon %s was corrupted.\nNew Order: %s\nLeaders: %s" %
-                       (vehicles[0].getPlatoon().getID(), rp.array2String(vehicles), rp.array2String(actualLeaders)), 3)
+        registeredLeaders = [None] + vehicles[:-1]
+        for actualLeader, registeredLeader in zip(actualLeaders, registeredLeaders):
+            if actualLeader is not None and actualLeader != registeredLeader:
+                break
+        else:
+            # order is consistent
+            return vehicles
 
-        return vehicles
+        # map: leader -> follower in the actual chain
+        actualFollowers = dict()
+        for ego, actualLeader, registeredLeader in zip(vehicles, actualLeaders, registeredLeaders):
+            if actualLeader is None:
+                continue
+            if ego == actualLeader:
+                if rp.VERBOSITY >= 1:
+                    warn(("Platoon %s:\nVehicle '%s' was found as its own leader. " +
+                          "Platoon order might be corrupted.") % (
+                             rp.array2String(vehicles), str(ego)))
+                return vehicles
+            if actualLeader == registeredLeader or actualLeader not in actualFollowers:
+                # for several vehicles with the same actual leader, the one already registered as its
+                # follower or otherwise the first in the current order is associated with the leader
+                actualFollowers[actualLeader] = ego
+
+        # vehicles which are the associated follower of their actual leader are placed behind it,
+        # chains start at vehicles without associated leader
+        chained = set(actualFollowers.values())
+        newVehOrder = []
+        for veh in vehicles:
+            if veh in chained:
+                continue
+            while veh is not None:
+                newVehOrder.append(veh)
+                veh = actualFollowers.get(veh)
+
+        if len(newVehOrder) < len(vehicles):
+            # vehicles on a cycle of actual leaders are not reached from any chain start, the cycle is cut
+            # at the vehicle which comes first in the current order
+            placed = set(newVehOrder)
+            for veh in vehicles:
+                while veh is not None and veh not in placed:
+                    newVehOrder.append(veh)
+                    placed.add(veh)
+                    veh = actualFollowers.get(veh)
+
+        if rp.VERBOSITY >= 3:
+            report("Ordering within Platoon %s was corrupted.\nNew Order: %s\nLeaders: %s" %
+                   (vehicles[0].getPlatoon().getID(), rp.array2String(newVehOrder), rp.array2String(actualLeaders)), 3)
+
+        return newVehOrder
 
     def _adviseLanes(self):
         '''_adviseLanes()
         At the moment this only advises all platoon followers to change to their leaders lane
         if it is on a different lane on the same edge. Otherwise, followers are told to keep their
-        lane for the next time step.
+        lane. An advice is only sent if the advised lane differs from the follower's active advice or the
+        active advice expires before the next control step. Advices of vehicles that are no longer
+        followers are cancelled.
         NOTE: Future, more sophisticated lc advices should go here.
         '''
+        fleet = self._fleet
+        followers = []
+        leaders = []
         for pltn in self._platoons.values():
-            for ix, veh in enumerate(pltn.getVehicles()[1:]):
-                laneID = veh.state.laneID
-                if laneID == "" or laneID[0] == ":":
-                    continue
-                # Find the leader in the platoon and request a lanechange if appropriate
-                leader = pltn.getVehicles()[ix]
-                if leader.state.edgeID == veh.state.edgeID:
-                    # leader is on the same edge, advise follower to use the same lane
-                    try:
-                        traci.vehicle.changeLane(veh.getID(), leader.state.laneIX, int(self._controlInterval * 1000))
-                    except traci.exceptions.TraCIException as e:
-                        if rp.VERBOSITY >= 1:
-                            warn("Lanechange advice for vehicle'%s' failed. Message:\n%s" % (veh.getID(), e.message))
-                else:
-                    # leader is on another edge, just stay on the current and hope it is the right one
-                    try:
-                        traci.vehicle.changeLane(veh.getID(), veh.state.laneIX, int(self._controlInterval * 1000))
-                    except traci.exceptions.TraCIException as e:
-                        if rp.VERBOSITY >= 1:
-                            warn("Lanechange advice for vehicle'%s' failed. Message:\n%s" % (veh.getID(), e.message))
+            vehs = pltn.getVehicles()
+            for ix in range(1, len(vehs)):
+                followers.append(vehs[ix].state.getHandle())
+                # the leader in the platoon
+                leaders.append(vehs[ix - 1].state.getHandle())
+        followers = np.array(followers, dtype=int)
+        leaders = np.array(leaders, dtype=int)
+
+        # cancel the advices of vehicles that left their platoon
+        isFollower = np.zeros(len(fleet.adviceLane), dtype=bool)
+        isFollower[followers] = True
+        for handle in np.flatnonzero((fleet.adviceLane >= 0) & ~isFollower):
+            self._commands.changeLane(fleet.vehID[handle], int(fleet.laneIX[handle]), 0)
+            fleet.adviceLane[handle] = -1
+            fleet.adviceEdge[handle] = ""
+            fleet.adviceExpiry[handle] = -1.
+
+        if len(followers) == 0:
+            return
+        edgeIDs = fleet.edgeID[followers]
+        onRegularLane = np.array([laneID != "" and laneID[0] != ":" for laneID in fleet.laneID[followers]], dtype=bool)
+        # if the leader is on the same edge, advise follower to use the same lane. If the leader
+        # is on another edge, just stay on the current and hope it is the right one
+        sameEdge = np.equal(fleet.edgeID[leaders], edgeIDs)
+        targetLanes = np.where(sameEdge, fleet.laneIX[leaders], fleet.laneIX[followers])
+        now = simTime()
+        renew = onRegularLane & ((targetLanes != fleet.adviceLane[followers])
+                                 | np.not_equal(edgeIDs, fleet.adviceEdge[followers])
+                                 | (fleet.adviceExpiry[followers] - now < self._controlInterval))
+        duration = int(cfg.LANE_ADVICE_DURATION * 1000)
+        for i in np.flatnonzero(renew):
+            self._commands.changeLane(fleet.vehID[followers[i]], int(targetLanes[i]), duration)
+        renewed = followers[renew]
+        fleet.adviceLane[renewed] = targetLanes[renew]
+        fleet.adviceEdge[renewed] = edgeIDs[renew]
+        fleet.adviceExpiry[renewed] = now + cfg.LANE_ADVICE_DURATION
 
     def _isConnected(self, vehID):
         '''_isConnected(string) -> bool
@@ -650,81 +846,158 @@ class PlatoonManager(traci.StepListener):
                 return True
         return False
 
+    def _applyParameters(self, changes):
+        '''_applyParameters(dict) -> void
+
+        Pushes changed runtime parameters (see _parameters.update()) into the manager, the simpla config
+        and the live vehicles and platoons, such that they take effect for all vehicles from the next step on.
+        '''
+        if "maxPlatoonGap" in changes:
+            cfg.MAX_PLATOON_GAP = self._maxPlatoonGap = changes["maxPlatoonGap"]
+        if "catchupDistance" in changes:
+            cfg.CATCHUP_DISTANCE = self._catchupDist = changes["catchupDistance"]
+            # the leaders are looked up within the catchup distance
+            for vehID in self._connectedVehicles:
+                _statesync.subscribe(vehID, self._catchupDist)
+        if "platoonSplitTime" in changes:
+            # running split count downs keep the time elapsed so far
+            delta = changes["platoonSplitTime"] - cfg.PLATOON_SPLIT_TIME
+            cfg.PLATOON_SPLIT_TIME = changes["platoonSplitTime"]
+            for veh in self._connectedVehicles.values():
+                veh.shiftSplitCountDown(delta)
+        if "switchImpatienceFactor" in changes:
+            cfg.SWITCH_IMPATIENCE_FACTOR = changes["switchImpatienceFactor"]
+            for veh in self._connectedVehicles.values():
+                veh.setSwitchImpatienceFactor(cfg.SWITCH_IMPATIENCE_FACTOR)
+        if "joinDistance" in changes:
+            self._updateArrivalIntervals(changes["joinDistance"])
+        if "extended_simpla_logic" in changes:
+            self.extended_simpla_logic = changes["extended_simpla_logic"]
+        if "totalCarCounter" in changes or "platoonCarCounter" in changes:
+            # missing cars are inserted in the next step
+            self._updateSpawnBacklog()
+        if rp.VERBOSITY >= 2:
+            report("Applied parameter changes %s" % dict(changes), True)
+
+    def _updateArrivalIntervals(self, joinDistance):
+        '''_updateArrivalIntervals(double) -> void
+
+        Recomputes the arrival intervals of all connected vehicles for the given join distance
+        (as done at insertion, see PVehicle.__init__()) and the arrival intervals of the platoons.
+        '''
+        vehs = list(self._connectedVehicles.values())
+        if not vehs:
+            return
+        arrivalPos = np.array([veh.arrivalPos for veh in vehs])
+        laneLength = np.array([veh.arrivalLaneLength for veh in vehs])
+        lower = np.maximum(arrivalPos - joinDistance, 0.)
+        upper = np.minimum(arrivalPos + joinDistance, laneLength)
+        for veh, interval in zip(vehs, zip(lower.tolist(), upper.tolist())):
+            veh.arrivalInterval = interval
+        for pltn in self._platoons.values():
+            pltn.adjustInterval()
+        self._arrivalIndex.rebuild(self._platoons.values())
+
     def applyCarCounter(self):
+        '''applyCarCounter() -> void
 
-        """ add normal car into the system """
-        while self.carIndex < Config.parameters["contextual"]["totalCarCounter"] - Config.parameters["contextual"]["platoonCarCounter"]:
-            self._addNormalVehicle()
-
-        """ add platooning car into the system """
-        while len(self._connectedVehicles) < Config.parameters["contextual"]["platoonCarCounter"]:
-            self._addPlatoonVehicle()
-
-    def _addNormalVehicle(self):
-        vehID = "normal-car-" + str(self.carIndex)
-        # must be same with <vType> id in flow.rou.xml if used
-        # typeID = "normal-car"
-        routeID = "normal-car-route-" + str(self.carIndex)
-        rnd_edge_id = random.choice(Config.edgeIDsAndNumberOfLanesForExit.keys())
-        edges = traci.simulation.findRoute(fromEdge=Config.startEdgeID, toEdge=rnd_edge_id).edges
-        traci.route.add(routeID, edges)
-        # no need to get a random lane and arrivalPos within this lane
-        traci.vehicle.addFull(vehID=vehID, routeID=routeID, typeID='DEFAULT_VEHTYPE', depart=str(simTime()), departLane='random', departPos='base', departSpeed='0', arrivalLane='current', arrivalPos='random')
-        self.carIndex += 1
-
-    def _addPlatoonVehicle(self):
-        '''_addPlatoonVehicle()
-
-        Creates a new PVehicle object for platooning and registers is soliton platoon
-        It filters out car types that are not related with platooning logic to ensure a valid platooning car addition to simulation
+        Inserts normal and platooning cars until the numbers given by the contextual parameters
+        totalCarCounter and platoonCarCounter are reached.
         '''
-        try:
-            # Returns a list of ids of currently loaded vehicle types
-            knownVTypes = traci.vehicletype.getIDList()
-            knownVTypes.remove("DEFAULT_PEDTYPE")
-            knownVTypes.remove("DEFAULT_VEHTYPE")
-            vType = random.choice(knownVTypes)
-
-            # register car within the platooning manager if randomly selected type is specialized for platooning
-            # other vehicles are already started moving according to defined flow(s)
-            if self._hasConnectedType(vType):
-                vehID = "platoon-car-" + str(self.carIndex)
-                veh = _pvehicle.PVehicle(vehID, simTime())
-                routeID = "platoon-car-route-" + str(self.carIndex)
-                traci.route.add(routeID, veh.edgesToTravel)
-                traci.vehicle.addFull(vehID=vehID, routeID=routeID, typeID=vType, depart=str(simTime()), departLane='random', departPos='base', departSpeed='0', arrivalPos=str(veh.arrivalPos), arrivalLane=str(veh.arrivalLaneNumber))
-                traci.vehicle.setColor(vehID=vehID, color=(255, 255, 255, 255))
-                valid = traci.vehicle.isRouteValid(vehID=vehID)
-                if valid:
-                    veh.setState(self._controlInterval)
-                    # Subscribe according to new metrics http://sumo.dlr.de/wiki/TraCI/Vehicle_Value_Retrieval
-                    traci.vehicle.subscribe(vehID,
-                                            (tc.VAR_ROAD_ID,
-                                             tc.VAR_LANE_INDEX,
-                                             tc.VAR_LANE_ID,
-                                             tc.VAR_SPEED,
-                                             tc.VAR_LANEPOSITION,
-                                             tc.VAR_FUELCONSUMPTION))
-                    if rp.VERBOSITY >= 3:
-                        report("Adding vehicle '%s', routeID: '%s', vType:'%s'" % (vehID, routeID, vType))
-                    self._connectedVehicles[vehID] = veh
-                    self._platoons[veh.getPlatoon().getID()] = veh.getPlatoon()
-                    self.carIndex += 1
-                    return veh
-                else:
-                    report("Route of vehicle '%s' is not valid" % vehID)
-                    return None
-            else:
-                raise Exception
-        except TraCIException as traci_exception:
-            # TraCIException: Vehicle 'platoon-car-51' has no valid route. No connection between edge '11S' and edge '52151764'
-            # TODO: although there's a connection described in A9.net.xml
-            traceback.print_exc()
-            print("girdim")
-            # pass #
-            raise traci_exception
-        except KeyError as e:
-            raise e
+        self._updateSpawnBacklog()
+        self._spawnVehicles()
+
+    def _updateSpawnBacklog(self):
+        '''_updateSpawnBacklog() -> void
+
+        Adds the cars missing to reach totalCarCounter and platoonCarCounter to the spawn backlog.
+        '''
+        contextual = Config.parameters["contextual"]
+        # add normal cars into the system
+        missingNormal = contextual["totalCarCounter"] - contextual["platoonCarCounter"] - self.carIndex
+        self._spawnBacklog["normal"] = max(self._spawnBacklog["normal"], missingNormal)
+        # add platooning cars into the system
+        missingPlatoon = contextual["platoonCarCounter"] - len(self._connectedVehicles)
+        self._spawnBacklog["platoon"] = max(self._spawnBacklog["platoon"], missingPlatoon)
+
+    def getSpawnBacklog(self):
+        '''getSpawnBacklog() -> dict
+
+        Returns the numbers of normal and platoon cars waiting for insertion.
+        '''
+        return dict(self._spawnBacklog)
+
+    def _spawnVehicles(self):
+        '''_spawnVehicles() -> void
+
+        Inserts all cars of the spawn backlog as one batch. Cars whose insertion fails remain in the backlog
+        and are inserted in the next step.
+        '''
+        if self._spawnBacklog["normal"] > 0:
+            self._spawnBacklog["normal"] -= self._addNormalVehicles(self._spawnBacklog["normal"])
+        if self._spawnBacklog["platoon"] > 0:
+            self._spawnBacklog["platoon"] -= self._addPlatoonVehicles(self._spawnBacklog["platoon"])
+
+    def _addNormalVehicles(self, n):
+        '''_addNormalVehicles(int) -> int
+
+        Adds n cars that are not managed by simpla. Returns the number of successfully added cars.
+        '''
+        depart = str(simTime())
+        for count, exitPlan in enumerate(self._spawnSampler.sampleExitPlans(n)):
+            vehID = "normal-car-" + str(self.carIndex)
+            # the route to the exit edge is shared by all normal vehicles leaving there
+            # no need to get a random lane and arrivalPos within this lane
+            try:
+                traci.vehicle.addFull(vehID=vehID, routeID=exitPlan.normalRouteID, typeID='DEFAULT_VEHTYPE',
+                                      depart=depart, departLane='random', departPos='base', departSpeed='0',
+                                      arrivalLane='current', arrivalPos='random')
+            except TraCIException as e:
+                if rp.VERBOSITY >= 1:
+                    warn("Adding vehicle '%s' failed, retrying in the next step. Message:\n%s" % (vehID, e))
+                return count
+            self.carIndex += 1
+        return n
+
+    def _addPlatoonVehicles(self, n):
+        '''_addPlatoonVehicles(int) -> int
+
+        Creates n new PVehicle objects for platooning and registers their soliton platoons. Exit edges, arrival
+        lanes and positions and the vTypes are drawn for all cars at once. Returns the number of successfully added cars.
+        '''
+        exitPlans, arrivalLanes, arrivalPositions = self._spawnSampler.sampleExits(n)
+        vTypes, maxSpeeds = self._spawnSampler.sampleVTypes(n)
+        currentTime = simTime()
+        depart = str(currentTime)
+        for i in range(n):
+            vehID = "platoon-car-" + str(self.carIndex)
+            exitPlan = exitPlans[i]
+            veh = _pvehicle.PVehicle(vehID, currentTime, exitPlan, int(arrivalLanes[i]), float(arrivalPositions[i]))
+            try:
+                traci.vehicle.addFull(vehID=vehID, routeID=veh.routeID, typeID=vTypes[i], depart=depart,
+                                      departLane='random', departPos='base', departSpeed='0',
+                                      arrivalPos=str(veh.arrivalPos), arrivalLane=str(veh.arrivalLaneNumber))
+            except TraCIException as e:
+                if rp.VERBOSITY >= 1:
+                    warn("Adding vehicle '%s' failed, retrying in the next step. Message:\n%s" % (vehID, e))
+                return i
+            traci.vehicle.setColor(vehID=vehID, color=(255, 255, 255, 255))
+            if veh.routeID not in self._validRoutes:
+                # all vehicles leaving at the same exit share the route, so it is checked only once
+                if not traci.vehicle.isRouteValid(vehID=vehID):
+                    raise SimplaException("Route '%s' of vehicle '%s' is not valid" % (veh.routeID, vehID))
+                self._validRoutes.add(veh.routeID)
+            veh.setState(self._controlInterval, self._fleet, self._commands, self._safety, vTypes[i],
+                         float(maxSpeeds[i]))
+            # Subscribe according to new metrics http://sumo.dlr.de/wiki/TraCI/Vehicle_Value_Retrieval
+            # all values read in the control loop are contained, see _statesync.VEHICLE_VARIABLES
+            _statesync.subscribe(vehID, self._catchupDist)
+            if rp.VERBOSITY >= 3:
+                report("Adding vehicle '%s', routeID: '%s', vType:'%s'" % (vehID, veh.routeID, vTypes[i]))
+            self._connectedVehicles[vehID] = veh
+            self._platoons[veh.getPlatoon().getID()] = veh.getPlatoon()
+            self.carIndex += 1
+        return n
 
     def get_statistics(self):
         config = dict(
@@ -743,20 +1016,33 @@ class PlatoonManager(traci.StepListener):
             joinDistance=Config.parameters["changeable"]["joinDistance"]
         )
 
-        data = dict(
-            TripDurations=self.TripDurations,
-            FuelConsumptions=self.FuelConsumptions,
-            Speeds=self.Speeds,
-            Overheads=self.Overheads,
-        )
+        # value series (bounded uniform samples of the trips, see _statistics.StatisticsService)
+        data = self._statistics.getSamples()
 
         res = dict(
             simTime=simTime(),
             config=config,
             data=data,
+            summary=self._statistics.getSummary(),
         )
         return res
 
+    def getStatisticsSummary(self):
+        '''getStatisticsSummary() -> dict
+
+        Returns the aggregated statistics of the trips finished so far (cumulative and over the last arrivals),
+        see _statistics.StatisticsService.getSummary().
+        '''
+        return self._statistics.getSummary()
+
+    def getStatisticsBatchMeans(self, name="TripDurations"):
+        '''getStatisticsBatchMeans(string) -> numpy.array(double)
+
+        Returns the batch means of the given trip metric in the order of the arrivals
+        (used for the warm-up detection and the confidence intervals of a run, see _statistics.BATCH_SIZE).
+        '''
+        return self._statistics.getBatchMeans(name)
+
     def _publishStatistics(self, veh):
         # maxSpeed = 44.44 # by observation, maxAllowedSpeed is same for all major lanes in highway
         # as indicated in _setActiveSpeedFactor() method:
@@ -767,8 +1053,10 @@ class PlatoonManager(traci.StepListener):
         overhead = actualDuration / theoreticalDuration
 
         # as this fcn is called upon vehicle arrival, we get average fuel consumption & speed
-        fuelConsumption = np.mean(veh.state.reportedFuelConsumptions)
-        speed = np.mean(veh.state.reportedSpeeds)
+        # (accumulated during the trip, see FleetState.updateTripMetrics())
+        tripMetrics = self._fleet.tripMetrics(veh.state.getHandle())
+        fuelConsumption = tripMetrics["fuelConsumption"]["mean"]
+        speed = tripMetrics["speed"]["mean"]
         tripDuration = actualDuration
         timeSpentInsidePlatoon = (100.0 * veh.state.durationInsidePlatoon) / (veh.state.durationOutsidePlatoon * 1.0) # in terms of percentage
 
@@ -778,10 +1066,19 @@ class PlatoonManager(traci.StepListener):
             overhead=overhead,
             tripDuration=tripDuration,
         )
+        if cfg.TRIP_QUANTILE_SAMPLES > 0:
+            average_metrics.update(
+                fuelConsumptionMedian=tripMetrics["fuelConsumption"]["median"],
+                fuelConsumptionP95=tripMetrics["fuelConsumption"]["p95"],
+                speedMedian=tripMetrics["speed"]["median"],
+                speedP95=tripMetrics["speed"]["p95"],
+            )
 
         platooning_metrics = dict(
             timeSpentInsidePlatoon=timeSpentInsidePlatoon
         )
 
+        self._statistics.addTrip(tripDuration, fuelConsumption, speed, overhead, veh.getPlatoon().size())
+
         KafkaPublisher.publish(average_metrics, Config.kafkaTopicMeanCarData)
         # KafkaPublisher.publish(platooning_metrics, Config.kafkaTopicPlatooningData)
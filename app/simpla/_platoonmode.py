@@ -11,14 +11,29 @@
 # @version $Id$
 
 
-from enum import Enum
+from enum import IntEnum
 
 # Platoon modes
+# The modes are ints, such that they can be compared and hashed cheaply and index tuples and arrays (see MODES).
 
 
-class PlatoonMode(Enum):
+class PlatoonMode(IntEnum):
     NONE = 0
     LEADER = 1
     FOLLOWER = 2
     CATCHUP = 3
     CATCHUP_FOLLOWER = 4
+
+
+# all modes, ordered by value (the index of a mode in tables indexed by PlatoonMode)
+MODES = tuple(sorted(PlatoonMode))
+
+# mode of the followers in a platoon in the given mode
+FOLLOWER_MODE = (PlatoonMode.NONE, PlatoonMode.FOLLOWER, PlatoonMode.FOLLOWER,
+                 PlatoonMode.CATCHUP_FOLLOWER, PlatoonMode.CATCHUP_FOLLOWER)
+
+# platoon mode desired by a leader in the given mode (the leader may be kept in a follower mode due to safety constraints)
+PLATOON_MODE = (PlatoonMode.NONE, PlatoonMode.LEADER, PlatoonMode.LEADER, PlatoonMode.CATCHUP, PlatoonMode.CATCHUP)
+
+# whether the given mode is admissible for platoons with more than one vehicle (NONE is only admissible for solitons)
+ADMISSIBLE_FOR_PLATOONS = (False, True, True, True, True)
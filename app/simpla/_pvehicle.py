@@ -5,16 +5,16 @@
 # which accompanies this distribution, and is available at
 # http://www.eclipse.org/legal/epl-v20.html
 
-import traci
-import traci.constants as tc
+from app.sumo.Backend import traci
 import _reporting as rp
 import _config as cfg
+import _commandbuffer
 import app.Config as Config
-import random
 
-from _platoonmode import PlatoonMode
+from _platoonmode import PlatoonMode, MODES
+from _modetable import getModeTable
 from _platoon import Platoon
-from traci.exceptions import TraCIException
+from _fleetstate import FleetStateView
 from collections import defaultdict
 
 warn = rp.Warner("PVehicle")
@@ -23,38 +23,23 @@ report = rp.Reporter("PVehicle")
 # lookup table for vType parameters
 vTypeParameters = defaultdict(dict)
 
-WARNED_DEFAULT = dict([(mode, False) for mode in PlatoonMode])
-
-class pVehicleState(object):
-
-    def __init__(self, ID):
-        self.speed = traci.vehicle.getSpeed(ID)
-        self.edgeID = traci.vehicle.getRoadID(ID)
-        self.laneID = traci.vehicle.getLaneID(ID)
-        self.laneIX = traci.vehicle.getLaneIndex(ID)
-        self.lanePosition = traci.vehicle.getLanePosition(ID)
-        self.maxSpeed = traci.vehicle.getMaxSpeed(ID)
-
-        # lookAheadDistance parameter defines the maximum lookahead, 0 calculates a lookahead from the brake gap.
-        # Note that the returned leader may be farther away than the given dist.
-        # type of leaderInfo is (string, double) where string ID the leading vehicle's ID and double is the distance
-        self.leaderInfo = traci.vehicle.getLeader(ID, Config.parameters["contextual"]["lookAheadDistance"])
-
-        # must be set by vehicle creator (PlatoonManager._addPlatoonVehicle()) to guarantee function in first step
-        self.leader = None
-
-        # Whether a possible platooning partner for the vehicle is located further downstream within _catchupDistance
-        # (though not necessarily being the immediate leader)
-        self.connectedVehicleAhead = False
-
-        self.reportedCO2Emissions = []
-        self.reportedFuelConsumptions = []
-        self.reportedNoiseEmissions = []
-        self.reportedSpeeds = []
+class pVehicleState(FleetStateView):
+    '''
+    State of a connected vehicle, stored in the vehicle's row of the PlatoonManager's FleetState
+    (see _fleetstate.COLUMNS for the available attributes).
+    '''
+    __slots__ = ()
 
-        self.durationInsidePlatoon = 0
-        self.durationOutsidePlatoon = 0
+    def __init__(self, ID, fleet, maxSpeed):
+        FleetStateView.__init__(self, fleet, fleet.allocate(ID))
+        # The vehicle is added to the network in the next simulation step, until then no other state is available.
+        # The remaining columns keep their defaults until the state is updated from the subscription results.
+        # leaderInfo (string, double) is the leading vehicle's ID and the distance, see traci.vehicle.getLeader()
+        self.maxSpeed = maxSpeed
 
+        # The leader's PVehicle (state.leader) is set by the platoon manager if the leader is connected.
+        # state.connectedVehicleAhead indicates whether a possible platooning partner for the vehicle is
+        # located further downstream within _catchupDistance (though not necessarily being the immediate leader).
 
 
 class PVehicle(object):
@@ -63,79 +48,33 @@ class PVehicle(object):
     Vehicle objects for platooning
     '''
 
-    def __init__(self, ID, simTime):
-        '''Constructor(string, float)
+    def __init__(self, ID, simTime, exitPlan, arrivalLaneNumber, arrivalPos):
+        '''Constructor(string, float, ExitPlan, int, float)
 
-        Create a PVehicle representing a SUMOVehicle for the PlatoonManager. The controlInterval is only piped through
-        to the singleton platoon created by the vehicle.
+        Create a PVehicle representing a SUMOVehicle for the PlatoonManager. The vehicle leaves the simulation
+        at arrivalPos on the lane with index arrivalLaneNumber of the exit plan's edge.
 
         '''
         # vehicle ID (should be the one used in SUMO)
         self._ID = ID
 
-        # store the vehicle's vTypes, speedfactors and lanechangemodes
-        self._vTypes = dict()
-        self._speedFactors = dict()
-        self._laneChangeModes = dict()
-        allEdges = traci.simulation.findRoute(fromEdge=Config.startEdgeID, toEdge=Config.lastEdgeID).edges
-        rnd_edge_id = random.choice(Config.edgeIDsAndNumberOfLanesForExit.keys())
-        rnd_edge_index = allEdges.index(rnd_edge_id) + 1 # to include randomly selected edge
-        self.edgesToTravel = allEdges[:rnd_edge_index]
-
-        # now get a random lane and select a position within this lane using edgeIDsAndNumberOfLanesForExit
-        numberOfLanes = Config.edgeIDsAndNumberOfLanesForExit[rnd_edge_id]
-        arrivalLaneNumber = random.randint(0, numberOfLanes - 1) # as indices of actual lanes start from 0
-        arrivalLane = rnd_edge_id + "_" + str(arrivalLaneNumber)
-        laneLength = traci.lane.getLength(arrivalLane)
-
-        # get a random exit location within [0, laneLength]
-        arrivalPos = random.uniform(0, laneLength)
+        # route (shared by all vehicles leaving at the same exit edge), exit edge and lanes are given by
+        # the exit plan, the arrival lane and position are drawn by the creator (see _spawner.SpawnSampler)
+        self.edgesToTravel = exitPlan.edges
+        self._routeEdgeIndex = exitPlan.edgeIndex
+        self.routeID = exitPlan.routeID
+        laneLength = exitPlan.laneLengths[arrivalLaneNumber]
 
         # set arrivalInterval relative to the edge length,
         # i.e. negative values or values greater than actual length are not allowed
         self.arrivalInterval = (max(arrivalPos - Config.parameters["changeable"]["joinDistance"], 0), min(arrivalPos + Config.parameters["changeable"]["joinDistance"], laneLength))
 
         self.arrivalPos = arrivalPos
-        self.arrivalEdge = rnd_edge_id
+        self.arrivalLaneLength = laneLength
+        self.arrivalEdge = exitPlan.edgeID
         self.arrivalLaneNumber = arrivalLaneNumber
         self.currentRouteBeginTime = simTime
 
-    def _determinePlatoonVType(self, mode):
-        '''_determinePlatoonVType(PlatoonMode) -> string
-
-        Returns the type ID corresponding to the given mode. Uses the vehicles vType and the global map PLATOON_VTYPES
-        between original and platoon-vTypes. If the original vType is not mapped to any platoon-vtypes,
-        the original vType is used for platooning as well
-        '''
-        global WARNED_DEFAULT
-        # original vType
-        origVType = self._vTypes[PlatoonMode.NONE]
-        # print("cfg.PLATOON_VTYPES", cfg.PLATOON_VTYPES)
-        # print("origVType", origVType, " origVType in cfg.PLATOON_VTYPES ?", origVType in cfg.PLATOON_VTYPES)
-        # print("cfg.PLATOON_VTYPES[origVType]", cfg.PLATOON_VTYPES[origVType])
-        # print("mode", mode, " mode in cfg.PLATOON_VTYPES[origVType] ?", mode in cfg.PLATOON_VTYPES[origVType])
-        # print("cfg.PLATOON_VTYPES[origVType][mode]", cfg.PLATOON_VTYPES[origVType][mode])
-        # print("*******************")
-        if origVType not in cfg.PLATOON_VTYPES \
-                or mode not in cfg.PLATOON_VTYPES[origVType] \
-                or cfg.PLATOON_VTYPES[origVType][mode] is "":
-            if "default" in cfg.PLATOON_VTYPES and mode in cfg.PLATOON_VTYPES["default"]:
-                if rp.VERBOSITY >= 1 and not WARNED_DEFAULT[mode]:
-                    warn("Using default vType '%s' for vehicle '%s' (PlatoonMode: '%s'). This warning is issued only once." %
-                         (cfg.PLATOON_VTYPES["default"][mode], self._ID, PlatoonMode(mode).name))
-                    WARNED_DEFAULT[mode]=True
-                return cfg.PLATOON_VTYPES["default"][mode]
-            else:
-                if rp.VERBOSITY >= 1 and not WARNED_DEFAULT[mode]:
-                    warn("No vType specified for PlatoonMode '%s' for vehicle '%s'. Behavior within platoon is NOT altered. This warning is issued only once." % (
-                    PlatoonMode(mode).name, self._ID))
-                    WARNED_DEFAULT[mode] = True
-                return origVType
-        if rp.VERBOSITY >= 3:
-            report("Using vType '%s' for vehicle '%s' (PlatoonMode: '%s')." %
-                   (cfg.PLATOON_VTYPES[origVType][mode], self._ID, PlatoonMode(mode).name))
-        return cfg.PLATOON_VTYPES[origVType][mode]
-
     def getID(self):
         '''getID() -> string
 
@@ -163,6 +102,7 @@ class PVehicle(object):
         Sets the vehicle's platoon to the given.
         '''
         self._platoon = platoon
+        self.state.platoonID = platoon.getID()
 
     def getPlatoon(self):
         '''getPlatoon() -> Platoon
@@ -178,6 +118,14 @@ class PVehicle(object):
         '''
         return self._platoon.getVehicles()[-1] == self
 
+    def isOnRemainingRoute(self, edgeID):
+        '''isOnRemainingRoute(string) -> bool
+
+        Returns whether the given edge is contained in the part of the vehicle's route that starts at
+        the current route index (equivalent to 'edgeID in edgesToTravel[routeIndex:]').
+        '''
+        return self._routeEdgeIndex.get(edgeID, -1) >= self.state.routeIndex
+
     def setPlatoonMode(self, mode):
         '''setPlatoonMode(PlatoonMode)
 
@@ -192,17 +140,18 @@ class PVehicle(object):
             report("Vehicle '%s': Setting PlatoonMode '%s'" % (self._ID, PlatoonMode(mode).name))
 
         if self._vTypes[mode] != self._vTypes[self._currentPlatoonMode]:
-            traci.vehicle.setType(self._ID, self._vTypes[mode])
+            self._commands.setType(self._ID, self._vTypes[mode])
         # if self._speedFactors[mode] != self._speedFactors[self._currentPlatoonMode]:
         # Safer to call always since active speed factor mechanism may have changed
-        # current speed factor from basic speedfactor
-        traci.vehicle.setSpeedFactor(self._ID, self._speedFactors[mode])
+        # current speed factor from basic speedfactor (the command buffer skips it if nothing changed)
+        self._commands.setSpeedFactor(self._ID, self._speedFactors[mode])
         if self._laneChangeModes[mode] != self._laneChangeModes[self._currentPlatoonMode]:
-            traci.vehicle.setLaneChangeMode(self._ID, self._laneChangeModes[mode])
+            self._commands.setLaneChangeMode(self._ID, self._laneChangeModes[mode])
 
         self.resetSplitCountDown()
         self._splitConditions = False
         self._currentPlatoonMode = mode
+        self.state.mode = mode.value
 
     def getCurrentPlatoonMode(self):
         ''' getCurrentPlatoonMode() -> PlatoonMode
@@ -239,8 +188,7 @@ class PVehicle(object):
             report("Vehicle '%s' resets switch waiting time." % self._ID, 3)
 
         if mode is None:
-            for e in PlatoonMode:
-                self._switchWaitingTime[e] = 0.
+            self._switchWaitingTime = [0.] * len(MODES)
         else:
             self._switchWaitingTime[mode] = 0.
         self._resetActiveSpeedFactor()
@@ -254,17 +202,17 @@ class PVehicle(object):
         TODO: This mechanism does not work on highways, where the vehicles maxspeed is determining
               the travel speed and not the road's speed limit.
         '''
-        self._activeSpeedFactor = cfg.SPEEDFACTOR[self._currentPlatoonMode] \
+        self._activeSpeedFactor = self._modeTable.speedFactors[self._currentPlatoonMode] \
             / (1. + self._switchImpatienceFactor * switchWaitingTime)
-        traci.vehicle.setSpeedFactor(self._ID, self._activeSpeedFactor)
+        self._commands.setSpeedFactor(self._ID, self._activeSpeedFactor)
 
     def _resetActiveSpeedFactor(self):
         '''resetActiveSpeedFactor()
 
         Resets the active speed factor to the mode specific base value
         '''
-        self._activeSpeedFactor = cfg.SPEEDFACTOR[self._currentPlatoonMode]
-        traci.vehicle.setSpeedFactor(self._ID, self._activeSpeedFactor)
+        self._activeSpeedFactor = self._modeTable.speedFactors[self._currentPlatoonMode]
+        self._commands.setSpeedFactor(self._ID, self._activeSpeedFactor)
 
     def splitCountDown(self, dt):
         '''splitCountDown(double)
@@ -283,6 +231,46 @@ class PVehicle(object):
         '''
         self._timeUntilSplit = cfg.PLATOON_SPLIT_TIME
 
+    def getSnapshot(self):
+        '''getSnapshot() -> dict
+
+        Returns the data needed to recreate the vehicle after a SUMO state saved at the same time was
+        loaded (see restoreSnapshot()).
+        '''
+        return dict(ID=self._ID, arrivalEdge=self.arrivalEdge, arrivalLaneNumber=self.arrivalLaneNumber,
+                    arrivalPos=self.arrivalPos, currentRouteBeginTime=self.currentRouteBeginTime,
+                    vType=self._vTypes[PlatoonMode.NONE], maxSpeed=self.state.maxSpeed,
+                    speedFactor=self._speedFactors[PlatoonMode.NONE], mode=int(self._currentPlatoonMode),
+                    switchWaitingTime=list(self._switchWaitingTime), timeUntilSplit=self._timeUntilSplit,
+                    splitConditions=self._splitConditions, activeSpeedFactor=self._activeSpeedFactor)
+
+    def restoreSnapshot(self, snapshot):
+        '''restoreSnapshot(dict) -> void
+
+        Restores the platoon mode, the switch waiting times and the split count down from a snapshot
+        (see getSnapshot()). The vehicle must have been created from the same snapshot and setState() been called.
+        '''
+        # setState() took the speed factor from SUMO, which may be a platoon mode's one in the loaded state
+        self._speedFactors[PlatoonMode.NONE] = snapshot["speedFactor"]
+        self.setPlatoonMode(PlatoonMode(snapshot["mode"]))
+        self._switchWaitingTime = list(snapshot["switchWaitingTime"])
+        self._timeUntilSplit = snapshot["timeUntilSplit"]
+        self._splitConditions = snapshot["splitConditions"]
+        self._activeSpeedFactor = snapshot["activeSpeedFactor"]
+        self._commands.setSpeedFactor(self._ID, self._activeSpeedFactor)
+
+    def shiftSplitCountDown(self, delta):
+        '''shiftSplitCountDown(double)
+
+        Adds delta to the time until the vehicle is split from its platoon, e.g., if PLATOON_SPLIT_TIME changes
+        '''
+        self._timeUntilSplit += delta
+
+    def setSwitchImpatienceFactor(self, factor):
+        '''setSwitchImpatienceFactor(double)
+        '''
+        self._switchImpatienceFactor = factor
+
     def getArrivalInterval(self):
         return self.arrivalInterval
 
@@ -306,8 +294,6 @@ class PVehicle(object):
         and controls to which degree the vehicle is disposed to break harder than
         its preferred decel.
         '''
-        global vTypeParameters
-
         # if target mode already equals the current, no safety check is required
         if targetMode == self._currentPlatoonMode:
             return True
@@ -322,69 +308,9 @@ class PVehicle(object):
                 warn("Given parameter switchImpatience < 0. Assuming == 0.")
             switchImpatience = 0.
 
-        # obtain the preferred deceleration and the tau of the target vType
-        decel = vTypeParameters[self._vTypes[targetMode]][tc.VAR_DECEL]
-        tau = vTypeParameters[self._vTypes[targetMode]][tc.VAR_TAU]
-        speed = self.state.speed
-        # If time until switch decreases below 0, this indicates that a switch from platoon to normal mode is required
-        maxDecel = vTypeParameters[self._vTypes[targetMode]][tc.VAR_EMERGENCY_DECEL] * switchImpatience \
-            + (1. - switchImpatience) * decel
-
-        # check whether a halt at the end of the lane would prohibit the switch to a lower deceleration
-        # TODO: restrict check to situations where a halt is really required
-        if vTypeParameters[self._vTypes[self._currentPlatoonMode]][tc.VAR_DECEL] > decel:
-            distToLaneEnd = traci.lane.getLength(self.state.laneID) - traci.vehicle.getLanePosition(self._ID)
-            if self.brakeGap(speed, maxDecel) > distToLaneEnd:
-                return False
-
-        # check whether the ego vehicle has a leader, which must be considered
-        if self.state.leaderInfo is None:
-            return True
-
-        leader = self.state.leader
-        gap = self.state.leaderInfo[1]
-        minGapDifference = vTypeParameters[self._vTypes[targetMode]][tc.VAR_MINGAP] - \
-                           vTypeParameters[self.getCurrentVType()][tc.VAR_MINGAP]
-        gap -= minGapDifference
-
-        if gap < 0.:
-            # may arise when minGap of target type differs
-            return False
-
-        if leader is None:
-            # This may occur if the leader is not connected, so no corresponding PVehicle exists
-            # I'm not sure if this is ever called, but wouldn't exclude the possibility
-            # in one of the runs, traci gave this error: "state.leaderInfo[0] -> id of the car is not known"
-            # so for this case, we (Ali & Ilias) just return True (switch is safe)
-            try:
-                leaderDecel = traci.vehicle.getDecel(self.state.leaderInfo[0])
-                leaderSpeed = traci.vehicle.getSpeed(self.state.leaderInfo[0])
-            except TraCIException as e:
-                if rp.VERBOSITY >= 2:
-                    report("leader-id does not exist in the simulation %s" % self.state.leaderInfo[0])
-                return True
-        else:
-            leaderDecel = vTypeParameters[leader.getCurrentVType()][tc.VAR_DECEL]
-            leaderSpeed = leader.state.speed
-
-        # simplified safety check: consider leaderDecel = max(leaderDecel, decel) and compare brakegaps
-        leaderDecel = max(leaderDecel, decel)
-        leaderBrakeGap = PVehicle.brakeGap(leaderSpeed, leaderDecel)
-        headwayDist = speed * tau
-        followerBrakeGap = PVehicle.brakeGap(speed, maxDecel)
-
-        if rp.VERBOSITY >= 4:
-            report("leaderSpeed = %s" % leaderSpeed +
-                   "\nleaderDecel = %s" % leaderDecel +
-                   "\ngap = %s" % gap +
-                   "\nleaderBrakeGap = %s" % leaderBrakeGap +
-                   "\nspeed = %s" % speed +
-                   "\ndecel = %s" % decel +
-                   "\nfollowerBrakeGap = %s" % followerBrakeGap +
-                   "\nheadwayDist = %s" % headwayDist)
-
-        # TODO: test without headway...
-        return gap + leaderBrakeGap - followerBrakeGap - headwayDist > 0
+        # the checks (halt at the lane end, brake gaps and headway distance w.r.t. the leader) are evaluated
+        # for all vehicles in each control step, see _safety.SafetyEvaluator
+        return self._safety.isSwitchSafe(self.state.getHandle(), targetMode, switchImpatience)
 
     @staticmethod
     def brakeGap(speed, decel):
@@ -400,36 +326,40 @@ class PVehicle(object):
         return "<PVehicle '%s'>" % self._ID
 
     # this method is called after a car is successfully added to the simulation
-    def setState(self, controlInterval):
-        # original vtype, speedFactor and lanechangemodes
-        self._vTypes[PlatoonMode.NONE] = traci.vehicle.getTypeID(self._ID)
+    def setState(self, controlInterval, fleet, commands, safety, vType, maxSpeed):
+        # vehicle state (is updated by platoon manager in every step), stored in a row of the given FleetState
+        self.state = pVehicleState(self._ID, fleet, maxSpeed)
+        # buffer for the commands sent to SUMO (flushed by the platoon manager at the end of each step)
+        self._commands = commands
+        # evaluator of the mode switch safety checks (see isSwitchSafe())
+        self._safety = safety
+        # vTypes, speedFactors and lanechangemodes parametrizing the platoon behaviour (indexed by PlatoonMode),
+        # the tables are shared by all vehicles with the same original vType (as given at insertion)
+        self._modeTable = getModeTable(vType, self._ID)
+        self._vTypes = self._modeTable.vTypes
+        self._laneChangeModes = self._modeTable.laneChangeModes
+        # the original speedFactor is the vehicle's own
+        self._speedFactors = list(self._modeTable.speedFactors)
         self._speedFactors[PlatoonMode.NONE] = traci.vehicle.getSpeedFactor(self._ID)
-        # This is the default mode
-        self._laneChangeModes[PlatoonMode.NONE] = 0b1001010101
-
-        # vTypes, speedFactors and lanechangemodes parametrizing the platoon behaviour
-        for mode in [PlatoonMode.LEADER, PlatoonMode.FOLLOWER, PlatoonMode.CATCHUP, PlatoonMode.CATCHUP_FOLLOWER]:
-            self._vTypes[mode] = self._determinePlatoonVType(mode)
-            self._laneChangeModes[mode] = cfg.LC_MODE[mode]
-            self._speedFactors[mode] = cfg.SPEEDFACTOR[mode]
+        commands.setKnownValue(self._ID, _commandbuffer.TYPE, vType)
+        commands.setKnownValue(self._ID, _commandbuffer.SPEED_FACTOR, self._speedFactors[PlatoonMode.NONE])
+        safety.register(self.state.getHandle(), self._vTypes)
         # Initialize platoon mode to none
         self._currentPlatoonMode = PlatoonMode.NONE
         # the active speed factor is decreased as the waiting time for a mode switch rises
         # (assuming that the main hindrance to switching is too close following)
-        self._activeSpeedFactor = cfg.SPEEDFACTOR[self._currentPlatoonMode]
+        self._activeSpeedFactor = self._modeTable.speedFactors[self._currentPlatoonMode]
         # The switch impatience factor determines the magnitude of the effect
         # that an increasing waiting time has on the active speed factor:
         # activeSpeedFactor = modeSpecificSpeedFactor/(1+impatienceFactor*waitingTime)
         self._switchImpatienceFactor = cfg.SWITCH_IMPATIENCE_FACTOR
-        # create a new platoon containing only this vehicle, also set its arrivalInterval
-        self._platoon = Platoon([self], controlInterval, self.arrivalInterval)
+        # create a new platoon containing only this vehicle (with the vehicle's arrivalInterval)
+        self._platoon = Platoon([self], controlInterval)
         # the time left until splitting from a platoon if loosing coherence as a follower
         self._timeUntilSplit = cfg.PLATOON_SPLIT_TIME
         # Whether split conditions are fulfilled (i.e. leader in th platoon
         # is not found directly in front of the vehicle)
         self._splitConditions = False
-        # waiting time for switching into different modes
-        self._switchWaitingTime = {}
-        self.resetSwitchWaitingTime()
-        # vehicle state (is updated by platoon manager in every step)
-        self.state = pVehicleState(self._ID)
\ No newline at end of file
+        # waiting time for switching into different modes (indexed by PlatoonMode)
+        self._switchWaitingTime = [0.] * len(MODES)
+        self.resetSwitchWaitingTime()
\ No newline at end of file
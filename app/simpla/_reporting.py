@@ -13,7 +13,7 @@
 
 from collections import deque
 import sys
-import traci
+from app.sumo.Backend import traci
 
 VERBOSITY = 1
 WARNING_LOG = deque()
@@ -0,0 +1,254 @@
+# Eclipse SUMO, Simulation of Urban MObility; see https://eclipse.org/sumo
+# Copyright (C) 2017-2017 German Aerospace Center (DLR) and others.
+# This program and the accompanying materials
+# are made available under the terms of the Eclipse Public License v2.0
+# which accompanies this distribution, and is available at
+# http://www.eclipse.org/legal/epl-v20.html
+
+# @file    _safety.py
+# @date    2018-07-10
+# @version $Id$
+
+'''
+Safety checks for platoon mode switches (see PVehicle.isSwitchSafe()). The checks for all vehicles and
+target modes are evaluated in one pass per control step, single checks are then answered by a lookup.
+'''
+
+from app.sumo.Backend import traci
+import traci.constants as tc
+import numpy as np
+import _reporting as rp
+
+from _network import getLaneLength
+from _platoonmode import MODES
+from app.sumo.Backend import TraCIException
+
+report = rp.Reporter("SafetyEvaluator")
+
+# lane position reported for vehicles which are not on a lane (not defined by older traci versions)
+INVALID_DOUBLE_VALUE = getattr(tc, "INVALID_DOUBLE_VALUE", -2. ** 30)
+
+def brakeGap(speed, decel):
+    '''brakeGap(numpy.array(double), numpy.array(double)) -> numpy.array(double)
+
+    Returns the brake gaps for constant decelerations (inf for decel <= 0), see PVehicle.brakeGap().
+    '''
+    speed, decel = np.broadcast_arrays(np.asarray(speed, dtype=float), np.asarray(decel, dtype=float))
+    gaps = np.full(speed.shape, np.inf)
+    braking = decel > 0.
+    gaps[braking] = speed[braking] * speed[braking] / (2.0 * decel[braking])
+    return gaps
+
+
+class VTypeTable(object):
+    '''
+    Dense table of the vType parameters used by the safety checks. Rows are indexed by type codes (see getCode()).
+    '''
+
+    def __init__(self, vTypeParameters):
+        '''VTypeTable(dict) -> VTypeTable
+
+        'vTypeParameters' maps type IDs to their parameters keyed by traci constants (see _pvehicle.vTypeParameters).
+        Types which are not contained are retrieved from SUMO and added on first use.
+        '''
+        self._parameters = vTypeParameters
+        # map: type ID -> type code
+        self._codes = dict()
+        self.decel = np.zeros(0)
+        self.emergencyDecel = np.zeros(0)
+        self.tau = np.zeros(0)
+        self.minGap = np.zeros(0)
+
+    def getCode(self, typeID):
+        '''getCode(string) -> int
+
+        Returns the row of the given type.
+        '''
+        code = self._codes.get(typeID)
+        if code is None:
+            parameters = self._parameters[typeID]
+            if not parameters:
+                parameters[tc.VAR_TAU] = traci.vehicletype.getTau(typeID)
+                parameters[tc.VAR_DECEL] = traci.vehicletype.getDecel(typeID)
+                parameters[tc.VAR_MINGAP] = traci.vehicletype.getMinGap(typeID)
+                parameters[tc.VAR_EMERGENCY_DECEL] = traci.vehicletype.getEmergencyDecel(typeID)
+            code = len(self._codes)
+            self._codes[typeID] = code
+            self.decel = np.append(self.decel, parameters[tc.VAR_DECEL])
+            self.emergencyDecel = np.append(self.emergencyDecel, parameters[tc.VAR_EMERGENCY_DECEL])
+            self.tau = np.append(self.tau, parameters[tc.VAR_TAU])
+            self.minGap = np.append(self.minGap, parameters[tc.VAR_MINGAP])
+        return code
+
+
+class SafetyEvaluator(object):
+    '''
+    Evaluates the safety checks for mode switches of all vehicles in a FleetState. evaluate() is called once per
+    control step, after the states were updated. isSwitchSafe() returns the stored result as long as neither the
+    vehicle's nor its leader's mode changed since, otherwise the vehicle's row is evaluated anew.
+    '''
+
+    def __init__(self, fleet, vTypeTable):
+        '''SafetyEvaluator(FleetState, VTypeTable) -> SafetyEvaluator
+        '''
+        self._fleet = fleet
+        self._vTypeTable = vTypeTable
+        # typeCodes[handle, mode] is the code of the vehicle's vType for the mode
+        self._typeCodes = np.zeros((0, len(MODES)), dtype=int)
+        # safe[handle, mode] is the result of the last evaluation for a switch into the mode.
+        # For vehicles following a vehicle that is not connected, the result is only known after a lookup
+        # of the leader's speed and decel (see _checkUnconnectedLeader()).
+        self._safe = np.zeros((0, len(MODES)), dtype=bool)
+        # complete[handle] is False if the result still depends on a leader that is not connected,
+        # gaps and followerGaps are the parts of the check required to finish it
+        self._gaps = np.zeros((0, len(MODES)))
+        self._followerGaps = np.zeros((0, len(MODES)))
+        self._complete = np.zeros(0, dtype=bool)
+        # modes of the vehicle and its leader at the last evaluation (-1: not evaluated)
+        self._evaluatedModes = np.zeros(0, dtype=int)
+        self._leaderHandles = np.zeros(0, dtype=int)
+        self._evaluatedLeaderModes = np.zeros(0, dtype=int)
+        # map: vehicle ID -> (decel, speed) of leaders that are not connected (reset in evaluate())
+        self._unconnectedLeaders = dict()
+
+    def _grow(self, capacity):
+        rows = capacity - len(self._evaluatedModes)
+        self._typeCodes = np.vstack((self._typeCodes, np.zeros((rows, len(MODES)), dtype=int)))
+        self._safe = np.vstack((self._safe, np.zeros((rows, len(MODES)), dtype=bool)))
+        self._gaps = np.vstack((self._gaps, np.zeros((rows, len(MODES)))))
+        self._followerGaps = np.vstack((self._followerGaps, np.zeros((rows, len(MODES)))))
+        self._complete = np.concatenate((self._complete, np.zeros(rows, dtype=bool)))
+        self._evaluatedModes = np.concatenate((self._evaluatedModes, np.full(rows, -1, dtype=int)))
+        self._leaderHandles = np.concatenate((self._leaderHandles, np.full(rows, -1, dtype=int)))
+        self._evaluatedLeaderModes = np.concatenate((self._evaluatedLeaderModes, np.full(rows, -1, dtype=int)))
+
+    def register(self, handle, vTypes):
+        '''register(int, dict) -> void
+
+        Sets the vTypes (indexed by PlatoonMode) of the vehicle with the given handle.
+        '''
+        if handle >= len(self._evaluatedModes):
+            self._grow(len(self._fleet.mode))
+        self._typeCodes[handle] = [self._vTypeTable.getCode(vTypes[mode]) for mode in MODES]
+        self._evaluatedModes[handle] = -1
+
+    def evaluate(self, handles):
+        '''evaluate(numpy.array(int)) -> void
+
+        Evaluates the checks for switches of the given vehicles into all modes.
+        '''
+        self._unconnectedLeaders = dict()
+        if len(handles) == 0:
+            return
+        self._evaluate(handles, 0.)
+
+    def _evaluate(self, handles, switchImpatience):
+        fleet = self._fleet
+        table = self._vTypeTable
+        modes = fleet.mode[handles]
+        typeCodes = self._typeCodes[handles]
+        currentCodes = typeCodes[np.arange(len(handles)), modes]
+        speeds = fleet.speed[handles][:, np.newaxis]
+
+        # preferred and maximal deceleration and tau of the target vTypes
+        decels = table.decel[typeCodes]
+        maxDecels = table.emergencyDecel[typeCodes] * switchImpatience + (1. - switchImpatience) * decels
+        followerGaps = brakeGap(speeds, maxDecels) + speeds * table.tau[typeCodes]
+
+        # a halt at the end of the lane may prohibit the switch to a lower deceleration
+        safe = np.ones(typeCodes.shape, dtype=bool)
+        lowerDecel = table.decel[currentCodes][:, np.newaxis] > decels
+        # vehicles waiting for insertion are on no lane (empty lane ID, invalid position), their switches to
+        # a lower deceleration are considered unsafe
+        onLane = np.not_equal(fleet.laneID[handles], "") & (fleet.lanePosition[handles] > INVALID_DOUBLE_VALUE)
+        safe[~onLane] &= ~lowerDecel[~onLane]
+        rows = np.flatnonzero(lowerDecel.any(axis=1) & onLane)
+        if len(rows) > 0:
+            distsToLaneEnd = np.array([getLaneLength(laneID) for laneID in fleet.laneID[handles[rows]]]) \
+                - fleet.lanePosition[handles[rows]]
+            safe[rows] &= ~(lowerDecel[rows] & (brakeGap(speeds[rows], maxDecels[rows])
+                                                > distsToLaneEnd[:, np.newaxis]))
+
+        # the gap to the leader (if any) is corrected by the difference of the minGaps
+        gaps = fleet.leaderGap[handles][:, np.newaxis] - (table.minGap[typeCodes]
+                                                          - table.minGap[currentCodes][:, np.newaxis])
+        hasLeader = ~np.isnan(fleet.leaderGap[handles])
+        leaders = fleet.leader[handles]
+        leaderConnected = hasLeader & np.not_equal(leaders, None)
+        leaderHandles = np.full(len(handles), -1, dtype=int)
+        leaderHandles[leaderConnected] = [leader.state.getHandle() for leader in leaders[leaderConnected]]
+        connectedRows = np.flatnonzero(leaderConnected)
+        leaderModes = fleet.mode[leaderHandles[connectedRows]]
+        leaderDecels = table.decel[self._typeCodes[leaderHandles[connectedRows], leaderModes]][:, np.newaxis]
+        leaderGaps = brakeGap(fleet.speed[leaderHandles[connectedRows]][:, np.newaxis],
+                              np.maximum(leaderDecels, decels[connectedRows]))
+        safe[connectedRows] &= (gaps[connectedRows] >= 0.) & (
+            gaps[connectedRows] + leaderGaps - followerGaps[connectedRows] > 0)
+
+        self._safe[handles] = safe
+        self._gaps[handles] = gaps
+        self._followerGaps[handles] = followerGaps
+        self._complete[handles] = leaderConnected | ~hasLeader
+        self._evaluatedModes[handles] = modes
+        self._leaderHandles[handles] = leaderHandles
+        self._evaluatedLeaderModes[handles[connectedRows]] = leaderModes
+        if rp.VERBOSITY >= 4:
+            report("Evaluated switch safety for %s vehicles, %s unsafe switches" % (len(handles), (~safe).sum()))
+
+    def _isStale(self, handle):
+        fleet = self._fleet
+        if self._evaluatedModes[handle] != fleet.mode[handle]:
+            return True
+        leaderHandle = self._leaderHandles[handle]
+        return leaderHandle >= 0 and self._evaluatedLeaderModes[handle] != fleet.mode[leaderHandle]
+
+    def isSwitchSafe(self, handle, targetMode, switchImpatience=0.):
+        '''isSwitchSafe(int, PlatoonMode, double) -> bool
+
+        Returns whether it is safe for the vehicle with the given handle to switch into the target mode
+        (see PVehicle.isSwitchSafe()).
+        '''
+        if switchImpatience != 0.:
+            # only switches without impatience are evaluated in advance
+            self._evaluate(np.array([handle]), switchImpatience)
+            result = self._finish(handle, targetMode)
+            self._evaluatedModes[handle] = -1
+            return result
+        if self._isStale(handle):
+            self._evaluate(np.array([handle]), 0.)
+        return self._finish(handle, targetMode)
+
+    def _finish(self, handle, targetMode):
+        column = targetMode
+        if not self._safe[handle, column] or self._complete[handle]:
+            return self._safe[handle, column]
+        if self._gaps[handle, column] < 0.:
+            # may arise when minGap of target type differs
+            return False
+        leaderID = self._fleet.leaderID[handle]
+        leaderDecelAndSpeed = self._checkUnconnectedLeader(leaderID)
+        if leaderDecelAndSpeed is None:
+            return True
+        leaderDecel, leaderSpeed = leaderDecelAndSpeed
+        decel = self._vTypeTable.decel[self._typeCodes[handle, column]]
+        leaderGap = brakeGap(leaderSpeed, max(leaderDecel, decel))
+        return bool(self._gaps[handle, column] + leaderGap - self._followerGaps[handle, column] > 0)
+
+    def _checkUnconnectedLeader(self, leaderID):
+        '''_checkUnconnectedLeader(string) -> (double, double)
+
+        Returns the decel and speed of a leader which is not connected (retrieved once per control step),
+        or None if the leader is not known to SUMO.
+        '''
+        if leaderID not in self._unconnectedLeaders:
+            # This may occur if the leader is not connected, so no corresponding PVehicle exists
+            # in one of the runs, traci gave this error: "state.leaderInfo[0] -> id of the car is not known"
+            # so for this case, we just consider the switch safe
+            try:
+                self._unconnectedLeaders[leaderID] = (traci.vehicle.getDecel(leaderID),
+                                                      traci.vehicle.getSpeed(leaderID))
+            except TraCIException:
+                if rp.VERBOSITY >= 2:
+                    report("leader-id does not exist in the simulation %s" % leaderID)
+                self._unconnectedLeaders[leaderID] = None
+        return self._unconnectedLeaders[leaderID]
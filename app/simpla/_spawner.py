@@ -0,0 +1,79 @@
+# Eclipse SUMO, Simulation of Urban MObility; see https://eclipse.org/sumo
+# Copyright (C) 2017-2017 German Aerospace Center (DLR) and others.
+# This program and the accompanying materials
+# are made available under the terms of the Eclipse Public License v2.0
+# which accompanies this distribution, and is available at
+# http://www.eclipse.org/legal/epl-v20.html
+
+# @file    _spawner.py
+# @date    2018-07-05
+# @version $Id$
+
+from app.sumo.Backend import traci
+import numpy as np
+import app.Config as Config
+
+from _exitplan import getExitPlan
+from _utils import SimplaException
+
+
+class SpawnSampler(object):
+    '''
+    Draws the exit edges, arrival lanes, arrival positions and vTypes for a batch of vehicles to be inserted.
+    '''
+
+    def __init__(self, platoonVTypes, seed):
+        '''SpawnSampler(list(string), int) -> SpawnSampler
+
+        'platoonVTypes' are the vTypes from which the types of platoon vehicles are drawn.
+        '''
+        if len(platoonVTypes) == 0:
+            raise SimplaException("No vType for platooning vehicles is known to sumo!")
+        self._vTypes = list(platoonVTypes)
+        self._maxSpeeds = np.array([traci.vehicletype.getMaxSpeed(typeID) for typeID in self._vTypes])
+        # sorted to obtain the same draws for the same seed
+        self._exitPlans = [getExitPlan(edgeID) for edgeID in sorted(Config.edgeIDsAndNumberOfLanesForExit.keys())]
+        self._numberOfLanes = np.array([plan.numberOfLanes for plan in self._exitPlans])
+        # laneLengths[i, j] is the length of lane j on exit edge i
+        self._laneLengths = np.zeros((len(self._exitPlans), self._numberOfLanes.max()))
+        for i, plan in enumerate(self._exitPlans):
+            self._laneLengths[i, :plan.numberOfLanes] = plan.laneLengths
+        self._rng = np.random.RandomState(seed)
+
+    def getRandomState(self):
+        '''getRandomState() -> tuple
+        '''
+        return self._rng.get_state()
+
+    def setRandomState(self, state):
+        '''setRandomState(tuple) -> void
+
+        Continues the draws from a state returned by getRandomState().
+        '''
+        self._rng.set_state(state)
+
+    def sampleExitPlans(self, n):
+        '''sampleExitPlans(int) -> list(ExitPlan)
+
+        Returns exit plans for n vehicles, drawn uniformly from the exit edges.
+        '''
+        return [self._exitPlans[i] for i in self._rng.randint(len(self._exitPlans), size=n)]
+
+    def sampleExits(self, n):
+        '''sampleExits(int) -> list(ExitPlan), numpy.array(int), numpy.array(double)
+
+        Returns exit plans, arrival lane indices and arrival positions for n vehicles.
+        Exit edges and lanes are drawn uniformly, the arrival position uniformly within the lane.
+        '''
+        exitIndices = self._rng.randint(len(self._exitPlans), size=n)
+        laneIndices = (self._rng.random_sample(n) * self._numberOfLanes[exitIndices]).astype(int)
+        arrivalPositions = self._rng.random_sample(n) * self._laneLengths[exitIndices, laneIndices]
+        return [self._exitPlans[i] for i in exitIndices], laneIndices, arrivalPositions
+
+    def sampleVTypes(self, n):
+        '''sampleVTypes(int) -> list(string), numpy.array(double)
+
+        Returns vTypes for n platoon vehicles and their max speeds.
+        '''
+        typeIndices = self._rng.randint(len(self._vTypes), size=n)
+        return [self._vTypes[i] for i in typeIndices], self._maxSpeeds[typeIndices]
@@ -0,0 +1,139 @@
+# Eclipse SUMO, Simulation of Urban MObility; see https://eclipse.org/sumo
+# Copyright (C) 2017-2017 German Aerospace Center (DLR) and others.
+# This program and the accompanying materials
+# are made available under the terms of the Eclipse Public License v2.0
+# which accompanies this distribution, and is available at
+# http://www.eclipse.org/legal/epl-v20.html
+
+# @file    _statesync.py
+# @date    2018-07-02
+# @version $Id$
+
+'''
+Subscription handling for the vehicle states kept by the PlatoonManager.
+All values the control loop reads from SUMO are requested in one per-vehicle subscription,
+such that no further getter calls are required within a control step.
+'''
+
+import inspect
+import struct
+import app.sumo.Backend as Backend
+from app.sumo.Backend import traci
+import traci.constants as tc
+import _reporting as rp
+
+warn = rp.Warner("StateSync")
+
+# variables subscribed for each connected vehicle (VAR_LEADER additionally carries the lookahead distance)
+VEHICLE_VARIABLES = (tc.VAR_ROAD_ID,
+                     tc.VAR_LANE_INDEX,
+                     tc.VAR_LANE_ID,
+                     tc.VAR_SPEED,
+                     tc.VAR_LANEPOSITION,
+                     tc.VAR_FUELCONSUMPTION,
+                     tc.VAR_LEADER,
+                     tc.VAR_DISTANCE,
+                     tc.VAR_ROUTE_INDEX)
+
+
+# newer traci and libsumo versions accept subscription parameters directly, older traci versions
+# only internally (see subscribe())
+_useParameters = Backend.subscriptionParameters()
+_useConnection = not _useParameters and hasattr(traci.vehicle, "_connection")
+# If neither is available, the leader cannot be subscribed together with the other
+# variables and has to be retrieved by getLeader() in each step
+LEADER_SUBSCRIBED = _useParameters or _useConnection
+
+if not LEADER_SUBSCRIBED and rp.VERBOSITY >= 1:
+    warn("traci does not support subscription parameters. Leaders are retrieved by separate calls.", True)
+
+
+def subscribe(vehID, leaderDist):
+    '''subscribe(string, double) -> void
+
+    Subscribes all variables of VEHICLE_VARIABLES for the given vehicle. The leader is
+    searched within the given distance.
+    '''
+    if _useParameters:
+        traci.vehicle.subscribe(vehID, VEHICLE_VARIABLES, parameters={tc.VAR_LEADER: ("d", leaderDist)})
+    elif _useConnection:
+        traci.vehicle._connection._subscribe(tc.CMD_SUBSCRIBE_VEHICLE_VARIABLE, 0, 2 ** 31 - 1, vehID,
+                                             VEHICLE_VARIABLES,
+                                             {tc.VAR_LEADER: struct.pack("!Bd", tc.TYPE_DOUBLE, leaderDist)})
+    else:
+        traci.vehicle.subscribe(vehID, [v for v in VEHICLE_VARIABLES if v != tc.VAR_LEADER])
+
+
+class TraCICallCounter(object):
+    '''
+    Counts the TraCI commands issued via the wrapped traci domains. Value retrievals (getters) are
+    additionally counted separately. Reading subscription results does not cause any socket
+    communication and is therefore not counted.
+    '''
+    DOMAINS = ("vehicle", "vehicletype", "lane", "edge", "route", "simulation")
+    LOCAL_CALLS = frozenset(["getSubscriptionResults", "getAllSubscriptionResults",
+                             "getContextSubscriptionResults", "getAllContextSubscriptionResults"])
+
+    def __init__(self):
+        self._count = 0
+        self._getterCount = 0
+        self._wrapped = []
+
+    def install(self):
+        '''install() -> void
+
+        Wraps the public functions of the traci domains to count their calls.
+        '''
+        for domainName in self.DOMAINS:
+            domain = getattr(traci, domainName, None)
+            if domain is None:
+                continue
+            for name in dir(domain):
+                if name.startswith("_") or name in self.LOCAL_CALLS:
+                    continue
+                function = getattr(domain, name)
+                if not callable(function):
+                    continue
+                isGetter = name.startswith("get") or name.startswith("is")
+                call = self._countingCall(function, isGetter)
+                if inspect.isclass(domain):
+                    # the domains of libsumo are classes with static methods
+                    self._wrapped.append((domain, name, vars(domain).get(name)))
+                    setattr(domain, name, staticmethod(call))
+                else:
+                    self._wrapped.append((domain, name, None))
+                    setattr(domain, name, call)
+
+    def uninstall(self):
+        '''uninstall() -> void
+
+        Restores the original traci functions.
+        '''
+        for domain, name, original in self._wrapped:
+            if original is None:
+                delattr(domain, name)
+            else:
+                setattr(domain, name, original)
+        self._wrapped = []
+
+    def _countingCall(self, function, isGetter):
+        def call(*args, **kwargs):
+            self._count += 1
+            if isGetter:
+                self._getterCount += 1
+            return function(*args, **kwargs)
+        return call
+
+    def count(self):
+        '''count() -> int
+
+        Returns the number of calls counted since installation.
+        '''
+        return self._count
+
+    def getterCount(self):
+        '''getterCount() -> int
+
+        Returns the number of value retrievals counted since installation.
+        '''
+        return self._getterCount
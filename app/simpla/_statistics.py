@@ -0,0 +1,154 @@
+# Eclipse SUMO, Simulation of Urban MObility; see https://eclipse.org/sumo
+# Copyright (C) 2017-2017 German Aerospace Center (DLR) and others.
+# This program and the accompanying materials
+# are made available under the terms of the Eclipse Public License v2.0
+# which accompanies this distribution, and is available at
+# http://www.eclipse.org/legal/epl-v20.html
+
+# @file    _statistics.py
+# @date    2018-07-13
+# @version $Id$
+
+'''
+Fleet-wide trip statistics of a run, aggregated incrementally on each arrival of a platoon vehicle
+(see PlatoonManager._publishStatistics()), such that a summary of the run can be queried at any time.
+'''
+
+import numpy as np
+
+from collections import Counter
+from _tripmetrics import StreamingMetric
+
+# metrics recorded per trip, the names are the ones used in PlatoonManager.get_statistics() (see tests/plots.py)
+METRICS = ("TripDurations", "FuelConsumptions", "Speeds", "Overheads", "NumberOfCarsInPlatoons")
+
+# number of consecutive values averaged into one batch mean (5 as used by MSER-5 warm-up detection)
+BATCH_SIZE = 5
+
+
+class MetricAggregate(object):
+    '''
+    Cumulative aggregates (see StreamingMetric) and aggregates over a rolling window of the last values of a metric.
+    The cumulative sample of at most 'samples' values gives the quantiles and a bounded set of raw values.
+    '''
+
+    def __init__(self, windowSize, samples, seed=0):
+        '''MetricAggregate(int, int, int) -> MetricAggregate
+        '''
+        self._cumulative = StreamingMetric(1, samples, seed)
+        # ring buffer of the last windowSize values and their running sums
+        self._window = np.zeros(windowSize)
+        self._windowPos = 0
+        self._windowCount = 0
+        self._windowSum = 0.
+        self._windowSumOfSquares = 0.
+        # means of consecutive batches of BATCH_SIZE values in the order of their arrival
+        self._batchMeans = []
+        self._batchSum = 0.
+        self._batchCount = 0
+
+    def add(self, value):
+        '''add(double) -> void
+        '''
+        self._cumulative.add(np.zeros(1, dtype=int), np.array([value], dtype=float))
+        self._batchSum += value
+        self._batchCount += 1
+        if self._batchCount == BATCH_SIZE:
+            self._batchMeans.append(self._batchSum / BATCH_SIZE)
+            self._batchSum = 0.
+            self._batchCount = 0
+        if len(self._window) == 0:
+            return
+        if self._windowCount == len(self._window):
+            # the oldest value leaves the window
+            old = self._window[self._windowPos]
+            self._windowSum -= old
+            self._windowSumOfSquares -= old * old
+        else:
+            self._windowCount += 1
+        self._window[self._windowPos] = value
+        self._windowPos = (self._windowPos + 1) % len(self._window)
+        self._windowSum += value
+        self._windowSumOfSquares += value * value
+
+    def samples(self):
+        '''samples() -> numpy.array(double)
+
+        Returns the kept raw values (a uniform sample of all values).
+        '''
+        return self._cumulative.samples(0)
+
+    def batchMeans(self):
+        '''batchMeans() -> numpy.array(double)
+
+        Returns the means of the completed batches of BATCH_SIZE consecutive values, in the order of the values.
+        '''
+        return np.array(self._batchMeans)
+
+    def summary(self):
+        '''summary() -> dict
+
+        Returns the cumulative statistics (see StreamingMetric.summary()) and the count, mean, variance, median
+        and 95th percentile of the values in the window.
+        '''
+        n = self._windowCount
+        window = dict(count=n, mean=np.nan, variance=np.nan, median=np.nan, p95=np.nan)
+        if n > 0:
+            mean = self._windowSum / n
+            window.update(mean=mean, median=np.percentile(self._window[:n], 50.),
+                          p95=np.percentile(self._window[:n], 95.))
+            if n > 1:
+                window["variance"] = max(0., (self._windowSumOfSquares - n * mean * mean) / (n - 1))
+        return dict(cumulative=self._cumulative.summary(0), window=window)
+
+
+class StatisticsService(object):
+    '''
+    Aggregates the trip metrics of the arrived vehicles (see METRICS) and the distribution of the sizes of
+    their platoons at arrival. Each arrival is added in constant time.
+    '''
+
+    def __init__(self, windowSize, samples):
+        '''StatisticsService(int, int) -> StatisticsService
+
+        windowSize is the number of last arrivals covered by the rolling window aggregates, samples the
+        number of values per metric kept for the quantiles and the raw value series (0 disables both).
+        '''
+        self._metrics = dict((name, MetricAggregate(windowSize, samples, seed))
+                             for seed, name in enumerate(METRICS))
+        # map: platoon size -> number of arrivals in platoons of that size
+        self._platoonSizes = Counter()
+
+    def addTrip(self, tripDuration, fuelConsumption, speed, overhead, platoonSize):
+        '''addTrip(double, double, double, double, int) -> void
+
+        Adds the metrics of an arrived vehicle. Undefined values (nan) are skipped.
+        '''
+        for name, value in zip(METRICS, (tripDuration, fuelConsumption, speed, overhead, platoonSize)):
+            if not np.isnan(value):
+                self._metrics[name].add(value)
+        self._platoonSizes[platoonSize] += 1
+
+    def getSummary(self):
+        '''getSummary() -> dict
+
+        Returns the summaries of all metrics (see MetricAggregate.summary()) and the platoon size distribution.
+        '''
+        res = dict((name, aggregate.summary()) for name, aggregate in self._metrics.items())
+        res["PlatoonSizes"] = dict(self._platoonSizes)
+        return res
+
+    def getBatchMeans(self, name):
+        '''getBatchMeans(string) -> numpy.array(double)
+
+        Returns the means of consecutive batches of BATCH_SIZE values of the given metric in arrival order
+        (see MetricAggregate.batchMeans()).
+        '''
+        return self._metrics[name].batchMeans()
+
+    def getSamples(self):
+        '''getSamples() -> dict
+
+        Returns the kept raw values of all metrics as lists.
+        '''
+        return dict((name, aggregate.samples().tolist()) for name, aggregate in self._metrics.items())
@@ -0,0 +1,149 @@
+# Eclipse SUMO, Simulation of Urban MObility; see https://eclipse.org/sumo
+# Copyright (C) 2017-2017 German Aerospace Center (DLR) and others.
+# This program and the accompanying materials
+# are made available under the terms of the Eclipse Public License v2.0
+# which accompanies this distribution, and is available at
+# http://www.eclipse.org/legal/epl-v20.html
+
+# @file    _tripmetrics.py
+# @date    2018-07-12
+# @version $Id$
+
+import numpy as np
+
+
+class StreamingMetric(object):
+    '''
+    Constant memory accumulators of a metric sampled for each row of a FleetState: count, sum, mean and variance
+    (Welford's algorithm), min and max. Optionally, a fixed-size uniform sample of the values (reservoir sampling)
+    is kept per row, from which quantiles are estimated.
+    '''
+
+    def __init__(self, capacity, quantileSamples=0, seed=0):
+        '''StreamingMetric(int, int, int) -> StreamingMetric
+
+        quantileSamples is the size of the per-row sample used for the quantiles (0 disables the quantiles).
+        '''
+        self._quantileSamples = quantileSamples
+        self._rng = np.random.RandomState(seed)
+        self.count = np.zeros(0, dtype=int)
+        self.sum = np.zeros(0)
+        self.mean = np.zeros(0)
+        self._m2 = np.zeros(0)
+        self.min = np.zeros(0)
+        self.max = np.zeros(0)
+        self._samples = np.zeros((0, quantileSamples))
+        self.grow(capacity)
+
+    def grow(self, capacity):
+        '''grow(int) -> void
+
+        Extends the accumulators to the given number of rows.
+        '''
+        rows = capacity - len(self.count)
+        self.count = np.concatenate((self.count, np.zeros(rows, dtype=int)))
+        self.sum = np.concatenate((self.sum, np.zeros(rows)))
+        self.mean = np.concatenate((self.mean, np.zeros(rows)))
+        self._m2 = np.concatenate((self._m2, np.zeros(rows)))
+        self.min = np.concatenate((self.min, np.full(rows, np.inf)))
+        self.max = np.concatenate((self.max, np.full(rows, -np.inf)))
+        self._samples = np.vstack((self._samples, np.zeros((rows, self._quantileSamples))))
+
+    def reset(self, handles):
+        '''reset(numpy.array(int) or int) -> void
+        '''
+        self.count[handles] = 0
+        self.sum[handles] = 0.
+        self.mean[handles] = 0.
+        self._m2[handles] = 0.
+        self.min[handles] = np.inf
+        self.max[handles] = -np.inf
+
+    def add(self, handles, values):
+        '''add(numpy.array(int), numpy.array(double)) -> void
+
+        Adds one value for each of the given (distinct) rows.
+        '''
+        if len(handles) == 0:
+            return
+        count = self.count[handles] + 1
+        delta = values - self.mean[handles]
+        mean = self.mean[handles] + delta / count
+        self._m2[handles] += delta * (values - mean)
+        self.mean[handles] = mean
+        self.count[handles] = count
+        self.sum[handles] += values
+        self.min[handles] = np.minimum(self.min[handles], values)
+        self.max[handles] = np.maximum(self.max[handles], values)
+        if self._quantileSamples > 0:
+            # reservoir sampling: the n-th value replaces a random sample with probability quantileSamples/n
+            slots = np.where(count <= self._quantileSamples, count - 1,
+                             (self._rng.random_sample(len(count)) * count).astype(int))
+            kept = slots < self._quantileSamples
+            self._samples[handles[kept], slots[kept]] = values[kept]
+
+    def getRow(self, handle):
+        '''getRow(int) -> dict
+
+        Returns the accumulators of the given row (see setRow()).
+        '''
+        return dict(count=int(self.count[handle]), sum=float(self.sum[handle]), mean=float(self.mean[handle]),
+                    m2=float(self._m2[handle]), min=float(self.min[handle]), max=float(self.max[handle]),
+                    samples=self._samples[handle].tolist())
+
+    def setRow(self, handle, row):
+        '''setRow(int, dict) -> void
+
+        Sets the accumulators of the given row to values returned by getRow().
+        '''
+        self.count[handle] = row["count"]
+        self.sum[handle] = row["sum"]
+        self.mean[handle] = row["mean"]
+        self._m2[handle] = row["m2"]
+        self.min[handle] = row["min"]
+        self.max[handle] = row["max"]
+        if self._quantileSamples > 0 and len(row["samples"]) == self._quantileSamples:
+            self._samples[handle] = row["samples"]
+
+    def variance(self, handle):
+        '''variance(int) -> double
+
+        Returns the sample variance of the values (nan if less than two values were added).
+        '''
+        if self.count[handle] < 2:
+            return np.nan
+        return self._m2[handle] / (self.count[handle] - 1)
+
+    def quantile(self, handle, q):
+        '''quantile(int, double) -> double
+
+        Returns the estimated q-quantile (q in [0, 1]) of the values, nan if no value was added or
+        the quantiles are disabled.
+        '''
+        if self._quantileSamples == 0 or self.count[handle] == 0:
+            return np.nan
+        return np.percentile(self.samples(handle), 100. * q)
+
+    def samples(self, handle):
+        '''samples(int) -> numpy.array(double)
+
+        Returns the sampled values of the given row (a uniform sample of at most quantileSamples values).
+        '''
+        return self._samples[handle, :min(self.count[handle], self._quantileSamples)]
+
+    def summary(self, handle):
+        '''summary(int) -> dict
+
+        Returns count, sum, mean, variance, min and max of the values of the given row, and the median
+        and 95th percentile if the quantiles are enabled. Statistics of empty rows are nan.
+        '''
+        count = int(self.count[handle])
+        res = dict(count=count,
+                   sum=float(self.sum[handle]),
+                   mean=float(self.mean[handle]) if count > 0 else np.nan,
+                   variance=self.variance(handle),
+                   min=float(self.min[handle]) if count > 0 else np.nan,
+                   max=float(self.max[handle]) if count > 0 else np.nan)
+        if self._quantileSamples > 0:
+            res.update(median=self.quantile(handle, 0.5), p95=self.quantile(handle, 0.95))
+        return res
@@ -15,7 +15,7 @@
 Utility functions and classes for simpla
 '''
 
-import traci
+from app.sumo.Backend import traci
 
 
 class SimplaException(Exception):
@@ -0,0 +1,78 @@
+import copy
+import os
+import time
+from app.sumo.Backend import traci
+import app.Config as Config
+import app.simpla
+from collections import OrderedDict
+from app.logging import *
+from app.simulation.PlatoonSimulation import PlatoonSimulation
+from app.simulation.RunLifecycle import RunLifecycle
+from app.sumo import SUMOConnector
+
+# Long-lived SUMO worker: SUMO is started once and reset with traci.load (same network) between experiments.
+# simpla is stopped and loaded again for each experiment, the network properties and vType parameters cached by
+# simpla are kept in memory (see app.simpla.clearCaches()).
+
+simplaConfig = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir, "map", "simpla.cfg"))
+
+
+# Runs each experiment (dict of parameters, see PlatoonSimulation.changeVariables()) for the given number of steps,
+# or until the termination conditions of the run lifecycle are met if steps is None (see RunLifecycle.py).
+# Parameters not given by an experiment keep the values from Config.py. Returns for each experiment its
+# parameters, the statistics of the platoon manager, the state of the run and the time spent in each phase (in seconds).
+def runExperiments(experiments, steps=None):
+    return list(iterateExperiments(experiments, steps))
+
+
+# Like runExperiments, but yields the result of each experiment as soon as it is finished. The experiments may be any
+# iterable, it is only consumed when the next experiment starts (e.g. a generator reading from a queue of tasks).
+# SUMO is started with the given TraCI port and connection label (default: chosen by traci).
+def iterateExperiments(experiments, steps=None, port=None, label=None):
+    baseParameters = copy.deepcopy(Config.parameters)
+    total = "/%d" % len(experiments) if hasattr(experiments, "__len__") else ""
+    started = False
+    try:
+        for i, parameters in enumerate(experiments):
+            timings = OrderedDict()
+            start = time.time()
+            if not started:
+                SUMOConnector.start(port=port, label=label)
+                started = True
+                timings["sumoStart"] = time.time() - start
+            else:
+                SUMOConnector.reload()
+                timings["sumoReload"] = time.time() - start
+
+            start = time.time()
+            platoon_mgr = app.simpla.load(simplaConfig)
+            # all parameters are pushed into the new manager, such that no value of the previous experiment remains
+            experimentParameters = dict((name, value) for section in baseParameters.values()
+                                        for name, value in section.items() if name != "lookAheadDistance")
+            experimentParameters.update(parameters)
+            PlatoonSimulation.changeVariables(experimentParameters)
+            timings["simplaLoad"] = time.time() - start
+
+            start = time.time()
+            platoon_mgr.applyCarCounter()
+            lifecycle = RunLifecycle(platoon_mgr)
+            step = 1
+            while step <= steps if steps is not None else \
+                    not (step % Config.runCheckInterval == 0 and lifecycle.finished()):
+                traci.simulationStep()
+                step += 1
+            timings["simulation"] = time.time() - start
+
+            start = time.time()
+            statistics = platoon_mgr.get_statistics()
+            app.simpla.stop()
+            timings["simplaStop"] = time.time() - start
+
+            info("# Experiment %d%s: %s" % (i + 1, total, ", ".join("%s %.2fs" % item for item in timings.items())),
+                 Fore.GREEN)
+            yield dict(parameters=parameters, statistics=statistics, run=lifecycle.getResult(), timings=timings)
+    finally:
+        if started:
+            traci.close()
+        for section, values in baseParameters.items():
+            Config.parameters[section].update(values)
@@ -0,0 +1,206 @@
+import itertools
+import json
+import multiprocessing
+import os
+import random
+import socket
+import subprocess
+import time
+import traceback
+import xml.etree.ElementTree as ET
+import app.Config as Config
+from app.logging import *
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+# Parameter sweep: the experiments (dicts of parameters, see PlatoonSimulation.changeVariables()) are run by
+# several worker processes. Each worker runs its own SUMO, which is started once and reset between the experiments
+# of the worker (see ExperimentWorker.py), connected with its own TraCI label and port. A worker works in its own
+# directory with its own copy of the SUMO config, so parallel workers share no files. The workers take the next
+# experiment from a common queue, the calling process collects all results in one file (one json record per line).
+
+RESULTS_FILE = "results.jsonl"
+
+# resolved on import, the workers change their working directory
+map_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir, "map"))
+
+# the parameters of Config.parameters a sweep may vary (the look ahead distance follows the catchup distance)
+SWEEP_PARAMETERS = sorted(name for section in ("changeable", "contextual") for name in Config.parameters[section]
+                          if name != "lookAheadDistance")
+
+
+# Returns the experiments for all combinations of the given values (dict: parameter name -> list of values)
+def grid(values):
+    names = sorted(values)
+    checkParameters(names)
+    return [dict(zip(names, combination)) for combination in itertools.product(*[values[name] for name in names])]
+
+
+# Raises a ValueError if one of the given parameter names can not be varied by a sweep
+def checkParameters(names):
+    unknown = sorted(set(names) - set(SWEEP_PARAMETERS))
+    if unknown:
+        raise ValueError("Unknown sweep parameters %s, expected some of %s" % (", ".join(unknown),
+                                                                               ", ".join(SWEEP_PARAMETERS)))
+
+
+# Returns the CPUs this process may run on
+def availableCPUs():
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(multiprocessing.cpu_count()))
+
+
+# Restricts this process and the processes it starts afterwards (i.e. its SUMO) to the given CPU
+def pinToCPU(cpu):
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, [cpu])
+    else:
+        # python 2 has no affinity functions, taskset is part of util-linux
+        with open(os.devnull, "w") as devnull:
+            subprocess.check_call(["taskset", "-p", "-c", str(cpu), str(os.getpid())], stdout=devnull)
+
+
+# Returns a TCP port which is currently not in use
+def freePort():
+    s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    try:
+        s.bind(("localhost", 0))
+        return s.getsockname()[1]
+    finally:
+        s.close()
+
+
+# Writes a copy of the SUMO config (Config.sumoConfig) into the given directory, which refers to the input files in
+# the map directory and uses the given TraCI port. Returns the path of the copy.
+def isolatedSumoConfig(directory, port):
+    source = os.path.join(map_dir, Config.sumoConfig)
+    tree = ET.parse(source)
+    inputs = tree.getroot().find("input")
+    for element in inputs if inputs is not None else []:
+        element.set("value", ",".join(os.path.join(map_dir, f.strip()) for f in element.get("value").split(",")))
+    remotePort = tree.getroot().find("traci_server/remote-port")
+    if remotePort is not None:
+        remotePort.set("value", str(port))
+    path = os.path.join(directory, os.path.basename(source))
+    tree.write(path)
+    return path
+
+
+# The settings of Config.py of the calling process, applied by the workers
+def configSettings():
+    return dict((name, value) for name, value in vars(Config).items()
+                if not name.startswith("_") and isinstance(value, (bool, int, float, str, dict, list, type(None))))
+
+
+# Main function of a worker process: runs the experiments (index, parameters) from the task queue until it receives
+# None and puts their results into the result queue. Errors are reported as results with the traceback.
+def _work(workerID, cpu, settings, tasks, results, steps, directory, seed):
+    current = []
+    try:
+        for name, value in settings.items():
+            setattr(Config, name, value)
+        # the workers do not take part in the kafka / mqtt communication
+        Config.kafkaUpdates = False
+        Config.mqttUpdates = False
+        # imported after the settings are applied (the backend is selected when the simulation modules are imported)
+        # and before the working directory changes (the repository may be on the module path as relative path)
+        from app.simulation import ExperimentWorker
+        if cpu is not None:
+            pinToCPU(cpu)
+        workDir = os.path.join(directory, "worker-%d" % workerID)
+        if not os.path.isdir(workDir):
+            os.makedirs(workDir)
+        # relative paths (e.g. parameters.json, SUMO outputs) refer to the directory of the worker
+        os.chdir(workDir)
+        port = freePort()
+        Config.sumoConfig = isolatedSumoConfig(workDir, port)
+
+        def experiments():
+            for index, parameters in iter(tasks.get, None):
+                # the experiment is reproducible, whichever worker runs it
+                random.seed(seed + index)
+                current[:] = [index]
+                yield parameters
+
+        # the next task is only taken from the queue when the experiment before is finished
+        for result in ExperimentWorker.iterateExperiments(experiments(), steps, port, "sweep-%d" % workerID):
+            result.update(index=current[0], worker=workerID, cpu=cpu)
+            results.put(result)
+    except Exception:
+        results.put(dict(index=current[0] if current else None, worker=workerID, cpu=cpu,
+                         error=traceback.format_exc()))
+
+
+# Converts the values json does not know (numpy numbers)
+def jsonValue(value):
+    return value.item() if hasattr(value, "item") else str(value)
+
+
+# Runs the experiments (list of dicts: parameter name -> value, see grid()) in parallel worker processes, each for
+# the given number of steps or until the termination conditions of the run lifecycle are met if steps is None.
+# workers caps the number of concurrent workers (default: Config.sweepWorkers), pinCPUs pins each worker and its
+# SUMO to one CPU (default: Config.sweepPinCPUs). The results are appended to the results file in directory
+# (default: Config.sweepDir) as soon as they arrive. Python's random generator is seeded with seed + the index of
+# the experiment. Returns the results (see ExperimentWorker.runExperiments()) in the order of the experiments,
+# failed experiments have an error entry instead.
+def run(experiments, steps=None, workers=None, pinCPUs=None, directory=None, seed=0):
+    experiments = list(experiments)
+    for parameters in experiments:
+        checkParameters(parameters)
+    if not experiments:
+        return []
+    directory = os.path.abspath(directory or Config.sweepDir)
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    workers = min(workers or Config.sweepWorkers or multiprocessing.cpu_count(), len(experiments))
+    pinCPUs = Config.sweepPinCPUs if pinCPUs is None else pinCPUs
+    cpus = availableCPUs() if pinCPUs else [None]
+    if pinCPUs and workers > len(cpus):
+        info("# %d workers share %d CPUs" % (workers, len(cpus)), Fore.YELLOW)
+
+    tasks, results = multiprocessing.Queue(), multiprocessing.Queue()
+    for task in enumerate(experiments):
+        tasks.put(task)
+    for _ in range(workers):
+        tasks.put(None)
+    settings = configSettings()
+    processes = [multiprocessing.Process(target=_work, name="SweepWorker-%d" % i,
+                                         args=(i, cpus[i % len(cpus)], settings, tasks, results, steps, directory,
+                                               seed))
+                 for i in range(workers)]
+
+    sweepID = time.strftime("%Y-%m-%dT%H:%M:%S")
+    info("# Sweep %s: %d experiments on %d workers" % (sweepID, len(experiments), workers), Fore.GREEN)
+    start = time.time()
+    for process in processes:
+        process.start()
+    collected = {}
+    with open(os.path.join(directory, RESULTS_FILE), "a") as store:
+        while len(collected) < len(experiments):
+            try:
+                result = results.get(timeout=1.)
+            except queue.Empty:
+                if any(process.is_alive() for process in processes):
+                    continue
+                # all workers ended without reporting the remaining experiments
+                break
+            result["sweep"] = sweepID
+            store.write(json.dumps(result, default=jsonValue) + "\n")
+            store.flush()
+            if "error" in result:
+                info("# Worker %d failed: %s" % (result["worker"], result["error"]), Fore.RED)
+            if result["index"] is not None:
+                collected[result["index"]] = result
+                info("# Sweep %d/%d done (worker %d)" % (len(collected), len(experiments), result["worker"]),
+                     Fore.GREEN)
+    for process in processes:
+        process.join()
+
+    missing = len(experiments) - len(collected)
+    info("# Sweep finished in %.1fs%s" % (time.time() - start, ", %d experiments not run" % missing if missing else ""),
+         Fore.GREEN if not missing else Fore.RED)
+    return [collected[index] for index in sorted(collected)]
@@ -1,9 +1,11 @@
 import json
-import traci
+from app.sumo.Backend import traci
 from app.streaming import KafkaPublisher, KafkaConnector
 from app.logging import *
 import os.path
 import app.Config as Config
+import app.simpla
+from app.simulation.RunLifecycle import RunLifecycle
 
 simulationEnded = False
 
@@ -25,57 +27,43 @@ class PlatoonSimulation(object):
 
     @classmethod
     def applyKafkaConfig(cls):
-        """ Gets a new configuration value from Kafka"""
+        """ Applies the latest values of the parameters changed via Kafka since the last call """
         new_conf = KafkaConnector.checkForNewConfiguration()
         if new_conf is not None:
             info("new configuration arrived" + str(new_conf), Fore.GREEN)
             cls.changeVariables(parameters=new_conf)
+            KafkaConnector.configurationApplied(new_conf)
 
     @classmethod
-    def start(cls, platoon_mgr):
-        """ start the simulation """
+    def start(cls, platoon_mgr, warmStarted=False):
+        """ start the simulation, runs until one of the termination conditions in Config.py is met and
+         returns the state of the run (see RunLifecycle.getResult()) """
         info("# Applying file config")
         cls.applyFileConfig()
 
         info("# Started adding initial cars to the simulation", Fore.GREEN)
         platoon_mgr.applyCarCounter()
 
-        kafkaIndex = 1
+        lifecycle = RunLifecycle(platoon_mgr, warmStarted)
+        step = 1
         while 1:
             # let the cars process this step via platoonmgr
             traci.simulationStep()
-            # apply kafka config in 10 ticks
-            if kafkaIndex % 10 == 0:
-                cls.applyKafkaConfig()
-            kafkaIndex += 1
+            # new configurations are received in the background, checking for them is cheap
+            cls.applyKafkaConfig()
+            if step % Config.runCheckInterval == 0 and lifecycle.finished():
+                break
+            step += 1
+
+        result = lifecycle.getResult()
+        info("# Run finished (" + result["reason"] + ") -> " + str(result), Fore.GREEN)
+        return result
 
     @classmethod
     def changeVariables(cls, parameters):
         '''
         :param parameters: dict that contains parameters to be changed
-        :return:
+        :return: dict of the applied changes (unknown parameters and invalid values are ignored)
         '''
-        for variable_name in parameters:
-            value = parameters[variable_name]
-            # there should be a better way instead of these statements
-            if variable_name == "maxVehiclesInPlatoon":
-                Config.parameters["changeable"]["maxVehiclesInPlatoon"] = value
-            elif variable_name == "catchupDistance":
-                Config.parameters["changeable"]["catchupDistance"] = value
-                Config.parameters["contextual"]["lookAheadDistance"] = value # set same value of catchupDist, as we did in experiments
-            elif variable_name == "maxPlatoonGap":
-                Config.parameters["changeable"]["maxPlatoonGap"] = value
-            elif variable_name == "platoonSplitTime":
-                Config.parameters["changeable"]["platoonSplitTime"] = value
-            elif variable_name == "joinDistance":
-                Config.parameters["changeable"]["joinDistance"] = value
-            elif variable_name == "switchImpatienceFactor":
-                Config.parameters["contextual"]["switchImpatienceFactor"] = value
-            elif variable_name == "totalCarCounter":
-                Config.parameters["contextual"]["totalCarCounter"] = value
-            elif variable_name == "platoonCarCounter":
-                Config.parameters["contextual"]["platoonCarCounter"] = value
-            elif variable_name == "extended_simpla_logic":
-                Config.parameters["contextual"]["extended_simpla_logic"] = value
-            else:
-                warn(str(variable_name) + " does not exist in Config.py", Fore.RED)
+        # the new values are also pushed into the running platoon manager and its vehicles
+        return app.simpla.setParameters(parameters)
@@ -0,0 +1,103 @@
+import numpy as np
+import app.Config as Config
+from app.simpla._statistics import BATCH_SIZE
+from app.simpla._reporting import simTime
+
+# Termination of a run and detection of its warm-up on the stream of trip durations of the arriving platoon cars.
+# The warm-up is detected with MSER-5: the batch means of 5 consecutive trip durations are truncated at the point
+# which minimizes the standard error of the mean of the remaining batch means. The confidence interval of the
+# mean trip duration is computed with the method of batch means from CI_BATCHES batches after the warm-up.
+
+# number of batches used for the confidence interval and the t quantiles for CI_BATCHES - 1 degrees of freedom
+CI_BATCHES = 20
+T_QUANTILES = {0.9: 1.729, 0.95: 2.093, 0.99: 2.861}
+
+# min number of batch means before MSER-5 is applied
+MIN_BATCHES = 10
+
+
+# Returns the number of batch means to truncate as warm-up (MSER-5), or None if the truncation point is in the
+# second half of the series, i.e. the run is still in its warm-up
+def mser5(batchMeans):
+    k = len(batchMeans)
+    if k < MIN_BATCHES:
+        return None
+    # sums of the batch means from d to the end, for all truncation points d
+    suffixSums = np.cumsum(batchMeans[::-1])[::-1]
+    suffixSquares = np.cumsum((batchMeans * batchMeans)[::-1])[::-1]
+    remaining = np.arange(k, 0, -1, dtype=float)
+    mser = (suffixSquares - suffixSums * suffixSums / remaining) / (remaining * remaining)
+    d = int(np.argmin(mser[:k // 2 + 1]))
+    if d == k // 2:
+        return None
+    return d
+
+
+# Returns mean and half width of the confidence interval of the mean of the given batch means (rebatched into
+# CI_BATCHES batches, the oldest values that do not fill a batch are dropped), or None if there are too few values
+def confidenceInterval(batchMeans, confidence):
+    size = len(batchMeans) // CI_BATCHES
+    if size == 0:
+        return None
+    batches = batchMeans[len(batchMeans) - size * CI_BATCHES:].reshape(CI_BATCHES, size).mean(axis=1)
+    halfWidth = T_QUANTILES[confidence] * batches.std(ddof=1) / np.sqrt(CI_BATCHES)
+    return batches.mean(), halfWidth
+
+
+class RunLifecycle(object):
+    """ decides when a run has collected enough results (see Config.py for the termination conditions) """
+
+    def __init__(self, platoon_mgr, warmStarted=False):
+        self.platoon_mgr = platoon_mgr
+        # a run restored from a warm start snapshot has no warm-up
+        self.warmStarted = warmStarted
+        # number of trip durations discarded as warm-up (None while not detected)
+        self.warmup = 0 if warmStarted else None
+        self.samples = 0
+        self.interval = None
+        self.reason = None
+        if Config.runConfidence not in T_QUANTILES:
+            raise ValueError("runConfidence must be one of " + str(sorted(T_QUANTILES.keys())))
+
+    def _update(self):
+        batchMeans = self.platoon_mgr.getStatisticsBatchMeans("TripDurations")
+        truncation = 0
+        if not self.warmStarted:
+            if Config.detectWarmup:
+                truncation = mser5(batchMeans)
+            else:
+                # fixed warm-up of ignore_first_n_results trips
+                truncation = -(-Config.ignore_first_n_results // BATCH_SIZE)
+                if truncation > len(batchMeans):
+                    truncation = None
+        if truncation is None:
+            self.warmup, self.samples, self.interval = None, 0, None
+            return
+        self.warmup = truncation * BATCH_SIZE
+        self.samples = (len(batchMeans) - truncation) * BATCH_SIZE
+        self.interval = confidenceInterval(batchMeans[truncation:], Config.runConfidence)
+        # reported in the run statistics (see PlatoonManager.get_statistics())
+        self.platoon_mgr.ignore_first_n_results = self.warmup
+        self.platoon_mgr.sample_size = self.samples
+
+    # checks the termination conditions, returns True if the run should end
+    def finished(self):
+        if Config.runMaxSimTime is not None and simTime() >= Config.runMaxSimTime:
+            self.reason = "simulation time limit"
+        else:
+            self._update()
+            if self.warmup is None:
+                return False
+            if Config.runSampleSize is not None and self.samples >= Config.runSampleSize:
+                self.reason = "sample size reached"
+            elif Config.runRelativeCIWidth is not None and self.interval is not None \
+                    and self.interval[1] <= Config.runRelativeCIWidth * abs(self.interval[0]):
+                self.reason = "confidence interval width reached"
+        return self.reason is not None
+
+    # returns the state of the run, e.g. to be logged at its end
+    def getResult(self):
+        return dict(reason=self.reason, simTime=simTime(), warmup=self.warmup, samples=self.samples,
+                    meanTripDuration=self.interval[0] if self.interval is not None else None,
+                    ciHalfWidth=self.interval[1] if self.interval is not None else None,
+                    confidence=Config.runConfidence)
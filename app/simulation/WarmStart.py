@@ -0,0 +1,89 @@
+import hashlib
+import json
+import os
+import pickle
+import time
+from app.sumo.Backend import traci
+import xml.etree.ElementTree as ET
+import app.Config as Config
+import app.simpla
+from app.logging import *
+from app.sumo import SUMOConnector
+
+# Warm start: the warm-up of the simulation (filling the corridor and letting the traffic settle) is run once.
+# SUMO's state and a snapshot of the platoon manager (see PlatoonManager.getSnapshot()) are saved afterwards,
+# later runs with the same inputs load both and start measuring right away.
+
+# increase if the format of the snapshots changes
+SNAPSHOT_VERSION = 1
+
+map_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir, "map"))
+
+
+# Returns the files read by SUMO for the given sumo config (the config itself, the net and the route files)
+def sumoInputFiles(sumoConfig):
+    files = [sumoConfig]
+    inputs = ET.parse(sumoConfig).getroot().find("input")
+    for tag in ["net-file", "route-files", "additional-files"]:
+        element = inputs.find(tag) if inputs is not None else None
+        if element is not None:
+            files += [os.path.join(os.path.dirname(sumoConfig), f.strip()) for f in element.get("value").split(",")]
+    return files
+
+
+# Hash over the network, route and config inputs of the warm-up, a snapshot is rebuilt if one of them changes
+def cacheKey(simplaConfig):
+    key = hashlib.sha1()
+    for path in sumoInputFiles(os.path.join(map_dir, Config.sumoConfig)) + [simplaConfig]:
+        with open(path, "rb") as f:
+            key.update(f.read())
+    key.update(json.dumps(dict(version=SNAPSHOT_VERSION,
+                               steps=Config.warmStartSteps,
+                               parameters=Config.parameters,
+                               exits=Config.edgeIDsAndNumberOfLanesForExit,
+                               startEdgeID=Config.startEdgeID,
+                               lastEdgeID=Config.lastEdgeID), sort_keys=True).encode("utf-8"))
+    return key.hexdigest()
+
+
+# Returns the files of the SUMO state and the manager snapshot for the given cache key
+def snapshotFiles(key):
+    return (os.path.abspath(os.path.join(Config.warmStartDir, key + ".state.xml")),
+            os.path.abspath(os.path.join(Config.warmStartDir, key + ".snapshot.pickle")))
+
+
+# Runs the warm-up and saves SUMO's state and the snapshot of the platoon manager
+def buildSnapshot(simplaConfig, stateFile, snapshotFile):
+    start = time.time()
+    SUMOConnector.start()
+    platoon_mgr = app.simpla.load(simplaConfig)
+    platoon_mgr.applyCarCounter()
+    for _ in range(Config.warmStartSteps):
+        traci.simulationStep()
+    if not os.path.isdir(Config.warmStartDir):
+        os.makedirs(Config.warmStartDir)
+    traci.simulation.saveState(stateFile)
+    snapshot = platoon_mgr.getSnapshot()
+    app.simpla.stop()
+    traci.close()
+    # written to a temporary file first, such that an interrupted run leaves no broken snapshot behind
+    with open(snapshotFile + ".tmp", "wb") as f:
+        pickle.dump(snapshot, f, pickle.HIGHEST_PROTOCOL)
+    os.rename(snapshotFile + ".tmp", snapshotFile)
+    info("# Warm start snapshot built in %.1fs (%d steps, %d vehicles)"
+         % (time.time() - start, Config.warmStartSteps, len(snapshot["vehicles"])), Fore.GREEN)
+
+
+# Makes sure a snapshot for the current inputs exists (runs the warm-up if not).
+# Returns the additional SUMO options to load the saved state and the snapshot of the platoon manager
+# (to be passed to PlatoonManager.restoreSnapshot() after the manager was created).
+def prepare(simplaConfig):
+    key = cacheKey(simplaConfig)
+    stateFile, snapshotFile = snapshotFiles(key)
+    if not os.path.exists(stateFile) or not os.path.exists(snapshotFile):
+        info("# No warm start snapshot for the current inputs, running the warm-up", Fore.YELLOW)
+        buildSnapshot(simplaConfig, stateFile, snapshotFile)
+    with open(snapshotFile, "rb") as f:
+        snapshot = pickle.load(f)
+    info("# Warm start from " + snapshotFile, Fore.GREEN)
+    return ["--load-state", stateFile], snapshot
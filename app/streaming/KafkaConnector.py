@@ -1,12 +1,27 @@
 from kafka import KafkaConsumer
 from app import Config
 import sys
+import threading
+import time
 from colorama import Fore
 import json
 
 # Starting the producer
 consumer = None
 
+# The config topic is drained by a background thread, which merges the received changes into the latest value
+# per parameter. The simulation loop takes the merged changes from this slot (see checkForNewConfiguration()).
+_pending = None
+# map: parameter -> time of receipt of its pending value, and the same for the changes taken by the simulation loop
+_receivedAt = {}
+_takenReceivedAt = {}
+_lock = threading.Lock()
+_worker = None
+_stopping = False
+
+# counters exposed by getStats(), latencies are from receipt to being applied in seconds
+_stats = dict(received=0, coalesced=0, applied=0, meanLatency=0., maxLatency=0.)
+
 
 # Try to connect to Kafka, else exits the process
 def connect():
@@ -14,21 +29,96 @@ def connect():
         global consumer
         consumer = KafkaConsumer(bootstrap_servers=Config.kafkaHost,
                                  value_deserializer=lambda m: json.loads(m.decode('utf-8')),
-                                 group_id=None,
-                                 consumer_timeout_ms=100)
+                                 group_id=None)
         consumer.subscribe([Config.kafkaPlatoonConfigTopic])
         print(Fore.GREEN + '# KafkaConnector OK!' + Fore.RESET)
     except RuntimeError:
         sys.exit(Fore.RED + "Connection to Kafka failed!" + Fore.RESET)
+    _startWorker()
 
 
-# checks if we got a new configuration from the server
-def checkForNewConfiguration():
-    if Config.kafkaUpdates:
+def _startWorker():
+    global _worker, _stopping
+    if _worker is not None and _worker.is_alive():
+        return
+    _stopping = False
+    _worker = threading.Thread(target=_run, name="KafkaConnector")
+    _worker.daemon = True
+    _worker.start()
+
+
+# Background thread: waits for new configurations and merges them into the pending changes
+def _run():
+    while not _stopping:
         try:
-            # @todo get last value
-            return next(consumer).value
-        except:
-            return None
-    else:
-        return None
\ No newline at end of file
+            records = consumer.poll(timeout_ms=500)
+        except Exception as e:
+            print("Error polling kafka configuration: " + str(e))
+            time.sleep(1.)
+            continue
+        for partitionRecords in records.values():
+            for record in partitionRecords:
+                _merge(record.value)
+
+
+# Merges a configuration (dict: parameter -> value) into the pending changes, later values overwrite earlier ones
+def _merge(configuration):
+    global _pending
+    if not isinstance(configuration, dict):
+        print(Fore.RED + "Ignoring configuration " + str(configuration) + ", it is not a dict" + Fore.RESET)
+        return
+    now = time.time()
+    with _lock:
+        pending = dict(_pending) if _pending is not None else {}
+        for name, value in configuration.items():
+            if name in pending:
+                _stats["coalesced"] += 1
+            else:
+                _receivedAt[name] = now
+            pending[name] = value
+        _stats["received"] += 1
+        _pending = pending
+
+
+# checks if we got a new configuration from the server, returns the latest value of each changed parameter
+# since the last call (or None). This is cheap if nothing arrived, such that it can be called every step.
+def checkForNewConfiguration():
+    global _pending, _receivedAt, _takenReceivedAt
+    if not Config.kafkaUpdates or _pending is None:
+        return None
+    with _lock:
+        configuration, _pending = _pending, None
+        _takenReceivedAt, _receivedAt = _receivedAt, {}
+    return configuration
+
+
+# Records the time from the receipt of the given changes (see checkForNewConfiguration()) until now
+def configurationApplied(configuration):
+    now = time.time()
+    with _lock:
+        for name in configuration:
+            receivedAt = _takenReceivedAt.pop(name, None)
+            if receivedAt is None:
+                continue
+            latency = now - receivedAt
+            _stats["applied"] += 1
+            _stats["meanLatency"] += (latency - _stats["meanLatency"]) / _stats["applied"]
+            _stats["maxLatency"] = max(_stats["maxLatency"], latency)
+
+
+# Stops the background thread and closes the consumer, called on shutdown
+def close(timeout=10.):
+    global _stopping
+    _stopping = True
+    if _worker is not None:
+        _worker.join(timeout)
+    if consumer is not None:
+        consumer.close()
+
+
+# Returns the number of pending parameters and the counters of the config listener
+def getStats():
+    with _lock:
+        stats = dict(_stats)
+        stats["pending"] = len(_pending) if _pending is not None else 0
+    return stats
@@ -1,11 +1,34 @@
 from kafka import KafkaProducer
 from app import Config
 import sys
+import threading
+import time
+from collections import deque, defaultdict
 from colorama import Fore
 import json
 
 # Starting the producer
 producer = None
+# long-lived mqtt client, its network loop runs in a thread of its own (see connectMqtt())
+mqttClient = None
+
+# Messages are put into a bounded queue by publish() and sent by a background thread, such that the
+# simulation never waits for the broker. The queue holds (topic, message) records.
+_queue = deque()
+_condition = threading.Condition()
+_worker = None
+_stopping = False
+# number of records taken from the queue but not yet sent
+_inFlight = 0
+
+# counters exposed by getStats()
+_stats = dict(published=0, dropped=0, aggregated=0, batches=0, lastBatchSize=0, maxBatchSize=0, maxQueueDepth=0,
+              mqttPublished=0, mqttDelivered=0, mqttFailed=0)
+
+# overflow policies (Config.publishOverflowPolicy) if the queue holds Config.publishQueueSize records
+BLOCK = "block"
+DROP_OLDEST = "dropOldest"
+AGGREGATE = "aggregate"
 
 
 # Try to connect to Kafka, else exits the process
@@ -14,25 +37,176 @@ def connect():
         global producer
         producer = KafkaProducer(bootstrap_servers=Config.kafkaHost,
                                  value_serializer=lambda v: json.dumps(v).encode('utf-8'),
-                                 request_timeout_ms=5000)
+                                 request_timeout_ms=5000,
+                                 linger_ms=Config.kafkaLingerMs,
+                                 batch_size=Config.kafkaBatchSize,
+                                 compression_type=Config.kafkaCompressionType)
         print(Fore.GREEN + '# KafkaForword OK!' + Fore.RESET)
     except RuntimeError:
         sys.exit(Fore.RED + "Connection to Kafka failed!" + Fore.RESET)
 
 
-# Publishes a message to the configured kafka server
+# Connects the mqtt client once, it reconnects automatically if the connection is lost
+def connectMqtt():
+    global mqttClient
+    from paho.mqtt import client as mqtt
+    mqttClient = mqtt.Client(client_id="CrowdNav")
+    mqttClient.on_publish = _onMqttPublish
+    mqttClient.reconnect_delay_set(min_delay=1, max_delay=30)
+    # messages are buffered by the client while it is (re)connecting
+    mqttClient.max_queued_messages_set(Config.publishQueueSize)
+    mqttClient.connect_async(Config.mqttHost, int(Config.mqttPort), keepalive=60)
+    mqttClient.loop_start()
+    print(Fore.GREEN + '# MQTT client started!' + Fore.RESET)
+
+
+# Called by the mqtt network thread when a message was delivered (acknowledged for qos > 0)
+def _onMqttPublish(client, userdata, mid):
+    with _condition:
+        _stats["mqttDelivered"] += 1
+
+
+# Enqueues a message for the configured kafka server (and mqtt broker), it is sent by the background thread
 def publish(message, topic):
-    if Config.mqttUpdates:
-        from paho.mqtt import publish
-        try:
-            publish.single(topic, payload=json.dumps(message).encode('utf-8'),
-                           qos=0, retain=False, hostname=Config.mqttHost,
-                           port=Config.mqttPort, client_id="CrowdNav", keepalive=60)
-        except:
-            print("Error sending mqtt status")
-
-    if Config.kafkaUpdates:
-        producer.send(topic, message)
-    else:
+    if not Config.kafkaUpdates and not Config.mqttUpdates:
         # we ignore this in json mode
-        pass
+        return
+    _startWorker()
+    with _condition:
+        if len(_queue) >= Config.publishQueueSize:
+            if Config.publishOverflowPolicy == BLOCK:
+                while len(_queue) >= Config.publishQueueSize and not _stopping:
+                    _condition.wait()
+            elif Config.publishOverflowPolicy == AGGREGATE and _aggregate(message, topic):
+                return
+            else:
+                _queue.popleft()
+                _stats["dropped"] += 1
+        _queue.append((topic, message))
+        _stats["maxQueueDepth"] = max(_stats["maxQueueDepth"], len(_queue))
+        _condition.notify_all()
+
+
+# Merges the message into the newest queued message of the same topic, averaging the numeric fields.
+# The number of merged messages is stored in the field 'aggregatedCount'. Returns False if there is no such message.
+def _aggregate(message, topic):
+    for i in range(len(_queue) - 1, -1, -1):
+        queuedTopic, queued = _queue[i]
+        if queuedTopic != topic or not isinstance(queued, dict) or not isinstance(message, dict):
+            continue
+        count = queued.get("aggregatedCount", 1)
+        merged = dict(queued)
+        for key, value in message.items():
+            if isinstance(value, (int, float)) and isinstance(queued.get(key), (int, float)):
+                merged[key] = (queued[key] * count + value) / (count + 1.)
+        merged["aggregatedCount"] = count + 1
+        _queue[i] = (topic, merged)
+        _stats["aggregated"] += 1
+        return True
+    return False
+
+
+def _startWorker():
+    global _worker, _stopping
+    if _worker is not None and _worker.is_alive():
+        return
+    _stopping = False
+    _worker = threading.Thread(target=_run, name="KafkaPublisher")
+    _worker.daemon = True
+    _worker.start()
+
+
+# Background thread: takes up to Config.publishBatchRecords records from the queue and sends them grouped by topic
+def _run():
+    global _inFlight
+    while True:
+        with _condition:
+            while not _queue and not _stopping:
+                _condition.wait()
+            if not _queue and _stopping:
+                return
+            batch = []
+            while _queue and len(batch) < Config.publishBatchRecords:
+                batch.append(_queue.popleft())
+            _inFlight = len(batch)
+            # wake up publishers waiting for space
+            _condition.notify_all()
+        _sendBatch(batch)
+        with _condition:
+            _inFlight = 0
+            _stats["published"] += len(batch)
+            _stats["batches"] += 1
+            _stats["lastBatchSize"] = len(batch)
+            _stats["maxBatchSize"] = max(_stats["maxBatchSize"], len(batch))
+            _condition.notify_all()
+
+
+def _sendBatch(batch):
+    byTopic = defaultdict(list)
+    for topic, message in batch:
+        byTopic[topic].append(message)
+
+    if Config.mqttUpdates:
+        if mqttClient is None:
+            connectMqtt()
+        published = failed = 0
+        for topic, messages in byTopic.items():
+            # up to Config.mqttRecordsPerPayload messages are packed into one payload (a json list if more than one)
+            n = max(1, Config.mqttRecordsPerPayload)
+            for i in range(0, len(messages), n):
+                records = messages[i] if n == 1 else messages[i:i + n]
+                info = mqttClient.publish(topic, payload=json.dumps(records).encode('utf-8'),
+                                          qos=Config.mqttQos, retain=False)
+                if info.rc == 0:
+                    published += 1
+                else:
+                    failed += 1
+        with _condition:
+            _stats["mqttPublished"] += published
+            _stats["mqttFailed"] += failed
+
+    if Config.kafkaUpdates and producer is not None:
+        for topic, messages in byTopic.items():
+            for message in messages:
+                try:
+                    producer.send(topic, message)
+                except Exception as e:
+                    print("Error sending kafka message: " + str(e))
+
+
+# Waits until all queued messages are sent (at most timeout seconds) and flushes the producer
+def flush(timeout=10.):
+    end = time.time() + timeout
+    with _condition:
+        while (_queue or _inFlight > 0) and _worker is not None and _worker.is_alive():
+            remaining = end - time.time()
+            if remaining <= 0:
+                break
+            _condition.wait(remaining)
+    if producer is not None:
+        producer.flush(timeout=max(0., end - time.time()))
+
+
+# Sends the remaining messages and stops the background thread, called on shutdown
+def close(timeout=10.):
+    global _stopping
+    flush(timeout)
+    with _condition:
+        _stopping = True
+        _condition.notify_all()
+    if _worker is not None:
+        _worker.join(timeout)
+    if producer is not None:
+        producer.close(timeout=timeout)
+    if mqttClient is not None:
+        mqttClient.disconnect()
+        mqttClient.loop_stop()
+
+
+# Returns the current queue depth and the counters of the publish pipeline
+def getStats():
+    with _condition:
+        stats = dict(_stats)
+        stats["queueDepth"] = len(_queue)
+        stats["meanBatchSize"] = float(_stats["published"]) / _stats["batches"] if _stats["batches"] > 0 else 0.
+    return stats
@@ -0,0 +1,131 @@
+import inspect
+import os
+import sys
+
+import app.Config as Config
+
+if 'SUMO_HOME' in os.environ:
+    sys.path.append(os.path.join(os.environ['SUMO_HOME'], 'tools'))
+
+# The SUMO backend selected in Config.sumoBackend. All modules use the traci module imported from here, such that
+# the same code runs against a SUMO process connected by a socket ("traci"), SUMO running in-process ("libsumo")
+# or the pure Python stand-in without SUMO ("standin", see TraCIStandIn.py).
+# Differences between the backends are normalized below: step listeners, subscription parameters, the start
+# of the simulation and the exceptions.
+STANDIN = Config.sumoBackend == "standin"
+if STANDIN:
+    import app.sumo.TraCIStandIn as _standIn
+    # the stand-in replaces the traci package, also for the modules importing traci.constants directly
+    sys.modules["traci"] = _standIn
+    sys.modules["traci.constants"] = _standIn.constants
+    sys.modules["traci.exceptions"] = _standIn.exceptions
+
+import traci as _traci
+import traci.constants as tc
+from traci.exceptions import TraCIException as _TraCIException
+
+if Config.sumoBackend in ("traci", "standin"):
+    traci = _traci
+elif Config.sumoBackend == "libsumo":
+    import libsumo as traci
+else:
+    raise ValueError("Unknown sumoBackend '%s', expected 'traci', 'libsumo' or 'standin'" % Config.sumoBackend)
+
+LIBSUMO = traci is not _traci
+
+# exceptions raised by failed commands of the selected backend, libsumo may raise its own type
+if getattr(traci, "TraCIException", _TraCIException) is not _TraCIException:
+    TraCIException = (_TraCIException, traci.TraCIException)
+else:
+    TraCIException = _TraCIException
+
+if LIBSUMO and not hasattr(traci, "constants"):
+    traci.constants = tc
+
+
+# Step listeners are called after each simulation step with the step argument. A listener whose step()
+# returns False is removed. Used if the backend does not manage listeners itself (older libsumo versions).
+_listeners = {}
+_nextListenerID = [0]
+_backendSimulationStep = traci.simulationStep
+
+
+def _addStepListener(listener):
+    listenerID = _nextListenerID[0]
+    _nextListenerID[0] += 1
+    if hasattr(listener, "setID"):
+        listener.setID(listenerID)
+    _listeners[listenerID] = listener
+    return listenerID
+
+
+def _removeStepListener(listenerID):
+    if listenerID not in _listeners:
+        return False
+    _listeners.pop(listenerID).cleanUp()
+    return True
+
+
+def _simulationStep(step=0.):
+    result = _backendSimulationStep(step)
+    for listenerID, listener in list(_listeners.items()):
+        if not listener.step(step):
+            _removeStepListener(listenerID)
+    return result
+
+
+if not hasattr(traci, "StepListener"):
+    traci.StepListener = _traci.StepListener
+if not hasattr(traci, "addStepListener"):
+    traci.addStepListener = _addStepListener
+    traci.simulationStep = _simulationStep
+    traci.removeStepListener = _removeStepListener
+_backendRemoveStepListener = traci.removeStepListener
+
+
+# Older traci versions remove a listener by the listener itself, newer ones (and libsumo) by the ID returned
+# from addStepListener(). Both are accepted.
+def _removeStepListenerByIDOrListener(listener):
+    try:
+        listener = listener.getID()
+    except AttributeError:
+        pass
+    return _backendRemoveStepListener(listener)
+
+
+traci.removeStepListener = _removeStepListenerByIDOrListener
+
+
+# Returns True if subscriptions of the backend accept parameters (e.g. the lookahead distance of VAR_LEADER)
+def subscriptionParameters():
+    subscribe = traci.vehicle.subscribe
+    try:
+        return "parameters" in getattr(inspect, "getfullargspec", inspect.getargspec)(subscribe).args
+    except (TypeError, AttributeError, ValueError):
+        # libsumo functions are built-in, their signature is only contained in the docstring
+        return "parameters" in (getattr(subscribe, "__doc__", None) or "")
+
+
+# Starts the simulation with the given command line (the SUMO binary followed by its arguments). The TraCI port
+# (default: a free port chosen by traci) and the label of the connection only apply to the socket backend, several
+# connections in one process are told apart by their label (traci.switch)
+def start(cmd, port=None, label=None):
+    if not LIBSUMO:
+        options = dict(port=port)
+        if label is not None:
+            options["label"] = label
+        traci.start(cmd, **options)
+    elif hasattr(traci, "start"):
+        traci.start(cmd[:1] + _inProcessArguments(cmd[1:]))
+    else:
+        traci.load(_inProcessArguments(cmd[1:]))
+
+
+# Resets the running simulation using the given arguments (without the SUMO binary)
+def load(args):
+    traci.load(_inProcessArguments(args) if LIBSUMO else args)
+
+
+# SUMO runs within this process and must not wait for a TraCI client on the port given in the config
+def _inProcessArguments(args):
+    return list(args) + ["--remote-port", "0"]
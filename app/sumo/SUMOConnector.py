@@ -1,19 +1,41 @@
-from sumolib import checkBinary
+from colorama import Fore
+from app.logging import info
 import app.Config as Config
-import traci
+import app.sumo.Backend as Backend
 
 import os.path
 
-# Starts SUMO in the background using the defined network
-def start():
-    if Config.sumoUseGUI:
-        sumoBinary = checkBinary('sumo-gui')
-    else:
-        sumoBinary = checkBinary('sumo')
 
+# Returns the SUMO arguments (without the binary) for the defined network, options are appended
+def sumoArguments(options=()):
     current_dir = os.path.abspath(os.path.dirname(__file__))
     parent_dir = os.path.abspath(os.path.join(current_dir, os.pardir))
     map_dir = os.path.abspath(os.path.join(parent_dir, "map"))
     sumo_map = os.path.abspath(os.path.join(map_dir, Config.sumoConfig))
-    traci.start([sumoBinary, "-c", sumo_map, "--no-step-log", "true", "--no-warnings", "true"])
+    return ["-c", sumo_map, "--no-step-log", "true", "--no-warnings", "true"] + list(options)
+
+
+# Starts SUMO in the background (in this process for the libsumo backend, the stand-in for the standin backend)
+# using the defined network, options are appended to the command line. port and label of the TraCI connection,
+# see Backend.start()
+def start(options=(), port=None, label=None):
+    if Backend.STANDIN:
+        # no SUMO installation needed
+        Backend.start(["sumo"] + sumoArguments(options), port, label)
+        return
+
+    from sumolib import checkBinary
+    if Config.sumoUseGUI and not Backend.LIBSUMO:
+        sumoBinary = checkBinary('sumo-gui')
+    else:
+        if Config.sumoUseGUI:
+            info("# The SUMO GUI is not available with libsumo, running without GUI", Fore.YELLOW)
+        sumoBinary = checkBinary('sumo')
+
+    Backend.start([sumoBinary] + sumoArguments(options), port, label)
+
 
+# Resets the running SUMO to the beginning of the scenario (the network and routes are read again by SUMO,
+# but the process and the TraCI connection are kept)
+def reload(options=()):
+    Backend.load(sumoArguments(options))
@@ -3,10 +3,14 @@ import os
 import sys
 
 from colorama import Fore
+import app.Config as Config
 
 
 # checks for SUMO and adds the SUMO_HOME directory to the list of dependencies
 def checkDeps():
+    if Config.sumoBackend == "standin":
+        # the stand-in does not need SUMO
+        return
     try:
         sys.path.append(os.environ.get("SUMO_HOME"))  # tutorial in docs
         from sumolib import checkBinary
@@ -0,0 +1,889 @@
+import heapq
+import os.path
+import pickle
+import types
+import xml.etree.ElementTree as ET
+from collections import defaultdict, namedtuple
+
+import numpy as np
+import app.Config as Config
+
+# Pure Python stand-in for the parts of the TraCI API used by simpla, selected with Config.sumoBackend = "standin"
+# (see Backend.py, which makes it importable as traci). No SUMO installation is needed.
+# It simulates a straight multi-lane corridor: the fastest path from Config.startEdgeID to Config.lastEdgeID in the
+# network of the SUMO config, or the edges given to loadCorridor(). Vehicles drive on the lane index they were
+# inserted on (clipped to the lanes of the current edge), follow their leader with the safe speed of the Krauss
+# model without dawdling and only change lanes if requested by changeLane(). The state of all vehicles is kept
+# in numpy arrays and each step, including the subscription results, is computed for all vehicles at once.
+# The simulation is deterministic given the seed. It is meant for profiling and load tests of simpla,
+# its traffic is no substitute for SUMO's results.
+
+constants = types.ModuleType("constants")
+for _name, _value in dict(CMD_GET_VEHICLE_VARIABLE=0xa4,
+                          CMD_SUBSCRIBE_VEHICLE_VARIABLE=0xd4,
+                          TYPE_DOUBLE=0x0b,
+                          VAR_SPEED=0x40,
+                          VAR_MAXSPEED=0x41,
+                          VAR_LENGTH=0x44,
+                          VAR_ACCEL=0x46,
+                          VAR_DECEL=0x47,
+                          VAR_TAU=0x48,
+                          VAR_MINGAP=0x4c,
+                          VAR_TYPE=0x4f,
+                          VAR_ROAD_ID=0x50,
+                          VAR_LANE_ID=0x51,
+                          VAR_LANE_INDEX=0x52,
+                          VAR_ROUTE_ID=0x53,
+                          VAR_LANEPOSITION=0x56,
+                          VAR_SPEED_FACTOR=0x5e,
+                          VAR_FUELCONSUMPTION=0x65,
+                          VAR_LEADER=0x68,
+                          VAR_ROUTE_INDEX=0x69,
+                          VAR_EMERGENCY_DECEL=0x7b,
+                          VAR_DISTANCE=0x84,
+                          INVALID_DOUBLE_VALUE=-1073741824.,
+                          INVALID_INT_VALUE=-1073741824).items():
+    setattr(constants, _name, _value)
+tc = constants
+
+
+class TraCIException(Exception):
+    """ raised for invalid commands, like traci.exceptions.TraCIException """
+
+
+class FatalTraCIError(Exception):
+    """ raised if the simulation is not running, like traci.exceptions.FatalTraCIError """
+
+
+exceptions = types.ModuleType("exceptions")
+exceptions.TraCIException = TraCIException
+exceptions.FatalTraCIError = FatalTraCIError
+
+
+class StepListener(object):
+    """ base class of the step listeners, like traci.StepListener """
+
+    def step(self, t=0):
+        return True
+
+    def cleanUp(self):
+        pass
+
+    def setID(self, ID):
+        self._ID = ID
+
+    def getID(self):
+        return self._ID
+
+
+# result of simulation.findRoute()
+Stage = namedtuple("Stage", ["edges", "length", "travelTime"])
+
+# parameters of the vTypes and their defaults (SUMO's passenger car)
+VTYPE_PARAMETERS = ("length", "minGap", "accel", "decel", "emergencyDecel", "tau", "maxSpeed", "speedFactor")
+VTYPE_DEFAULTS = dict(length=5., minGap=2.5, accel=2.6, decel=4.5, emergencyDecel=9., tau=1., maxSpeed=55.55,
+                      speedFactor=1.)
+
+# per-vehicle columns and their initial values
+_COLUMNS = (("alive", bool, False),
+            ("pending", bool, False),
+            ("order", int, 0),
+            ("pos", float, 0.),
+            ("lane", int, 0),
+            ("targetLane", int, -1),
+            ("speed", float, 0.),
+            ("accel", float, 0.),
+            ("distance", float, 0.),
+            ("depart", float, 0.),
+            ("arrivalPos", float, 0.),
+            ("speedFactor", float, 1.),
+            ("forcedSpeed", float, -1.),
+            ("typeIndex", int, 0),
+            ("routeCode", int, 0),
+            ("leader", int, -1),
+            ("leaderGap", float, np.inf))
+
+# corridors read from network files (net file, from edge, to edge) -> list of edges
+_corridors = dict()
+
+
+# Returns the edges (ID, number of lanes, length, speed limit) of the fastest path between the given edges
+def readCorridor(netFile, fromEdge, toEdge):
+    key = (os.path.abspath(netFile), fromEdge, toEdge)
+    if key in _corridors:
+        return _corridors[key]
+    edges = dict()
+    successors = defaultdict(set)
+    for _, element in ET.iterparse(netFile):
+        if element.tag == "edge":
+            if element.get("function") != "internal":
+                lanes = [lane for lane in element if lane.tag == "lane"]
+                edges[element.get("id")] = (len(lanes), float(lanes[0].get("length")), float(lanes[0].get("speed")))
+            element.clear()
+        elif element.tag == "connection" and not element.get("from").startswith(":"):
+            successors[element.get("from")].add(element.get("to"))
+    if fromEdge not in edges or toEdge not in edges:
+        raise TraCIException("The edges '%s' and '%s' are not contained in '%s'" % (fromEdge, toEdge, netFile))
+    # Dijkstra on the travel times at the speed limits
+    times = {fromEdge: 0.}
+    previous = dict()
+    queue = [(0., fromEdge)]
+    while queue:
+        time, edgeID = heapq.heappop(queue)
+        if edgeID == toEdge:
+            break
+        if time > times[edgeID]:
+            continue
+        for nextID in successors[edgeID]:
+            nextTime = time + edges[nextID][1] / edges[nextID][2]
+            if nextTime < times.get(nextID, np.inf):
+                times[nextID] = nextTime
+                previous[nextID] = edgeID
+                heapq.heappush(queue, (nextTime, nextID))
+    if toEdge not in previous and toEdge != fromEdge:
+        raise TraCIException("No route from '%s' to '%s' in '%s'" % (fromEdge, toEdge, netFile))
+    path = [toEdge]
+    while path[-1] != fromEdge:
+        path.append(previous[path[-1]])
+    _corridors[key] = [(edgeID,) + edges[edgeID] for edgeID in reversed(path)]
+    return _corridors[key]
+
+
+# Returns the vTypes (ID -> parameters) and routes (ID -> edges) defined in the given route files
+def readRouteFiles(routeFiles):
+    vTypes, routes = [], []
+    for routeFile in routeFiles:
+        with open(routeFile, "rb") as f:
+            # like SUMO, NUL bytes after the root element are accepted
+            root = ET.fromstring(f.read().replace(b"\0", b""))
+        for element in root:
+            if element.tag == "vType":
+                vTypes.append((element.get("id"), dict((name, float(element.get(name))) for name in VTYPE_PARAMETERS
+                                                       if element.get(name) is not None)))
+            elif element.tag == "route" and element.get("id") is not None:
+                routes.append((element.get("id"), element.get("edges").split()))
+    return vTypes, routes
+
+
+class _World(object):
+    """ the state of the simulated corridor and its vehicles """
+
+    def __init__(self, corridor, vTypes=(), routes=(), seed=42, stepLength=1.):
+        self.rng = np.random.RandomState(seed)
+        self.stepLength = stepLength
+        self.time = 0.
+        # edges of the corridor, positions on the corridor are measured from the beginning of the first edge
+        self.edgeIDs = [edge[0] for edge in corridor]
+        self.edgeCodes = dict((edgeID, code) for code, edgeID in enumerate(self.edgeIDs))
+        self.edgeLanes = np.array([edge[1] for edge in corridor], dtype=int)
+        self.edgeLengths = np.array([edge[2] for edge in corridor], dtype=float)
+        self.edgeSpeeds = np.array([edge[3] for edge in corridor], dtype=float)
+        self.edgeOffsets = np.concatenate(([0.], np.cumsum(self.edgeLengths)[:-1]))
+        self.maxLanes = int(self.edgeLanes.max())
+        # laneIDs[edge code * maxLanes + lane index]
+        self.laneIDs = ["%s_%d" % (edgeID, laneIndex) for edgeID in self.edgeIDs for laneIndex in range(self.maxLanes)]
+
+        self.vTypeIDs = []
+        self.vTypeParameters = np.zeros((0, len(VTYPE_PARAMETERS)))
+        for typeID, parameters in [("DEFAULT_VEHTYPE", {}), ("DEFAULT_PEDTYPE", {})] + list(vTypes):
+            self.addVType(typeID, parameters)
+        # routeIndices[route code, edge code] is the index of the edge in the route (or invalid)
+        self.routeIDs = []
+        self.routeEdges = []
+        self.routeIndices = np.zeros((0, len(self.edgeIDs)), dtype=int)
+        for routeID, edges in routes:
+            self.addRoute(routeID, edges)
+
+        self.vehIDs = []
+        self.slots = dict()
+        self.freeSlots = []
+        self.insertions = 0
+        for name, dtype, default in _COLUMNS:
+            setattr(self, name, np.full(64, default, dtype=dtype))
+        self.arrivedIDs = []
+        self.departedIDs = []
+        # vehID -> (variables, leader distance) and results
+        self.subscriptions = dict()
+        self.subscriptionResults = dict()
+        # edge ID -> variables and results
+        self.contextSubscriptions = dict()
+        self.contextResults = dict()
+
+    def __getstate__(self):
+        # like SUMO's saved states, subscriptions are not contained
+        state = dict(self.__dict__)
+        for name in ("subscriptions", "subscriptionResults", "contextSubscriptions", "contextResults"):
+            state[name] = dict()
+        return state
+
+    def addVType(self, typeID, parameters):
+        row = [parameters.get(name, VTYPE_DEFAULTS[name]) for name in VTYPE_PARAMETERS]
+        if typeID in self.vTypeIDs:
+            self.vTypeParameters[self.vTypeIDs.index(typeID)] = row
+        else:
+            self.vTypeIDs.append(typeID)
+            self.vTypeParameters = np.vstack((self.vTypeParameters, row))
+
+    def vTypeIndex(self, typeID):
+        try:
+            return self.vTypeIDs.index(typeID)
+        except ValueError:
+            raise TraCIException("Vehicle type '%s' is not known" % typeID)
+
+    def vTypeParameter(self, name, slots):
+        return self.vTypeParameters[self.typeIndex[slots], VTYPE_PARAMETERS.index(name)]
+
+    def addRoute(self, routeID, edges):
+        if routeID in self.routeIDs:
+            raise TraCIException("Could not add route '%s'" % routeID)
+        unknown = [edgeID for edgeID in edges if edgeID not in self.edgeCodes]
+        if len(edges) == 0 or unknown:
+            raise TraCIException("Route '%s' contains edges outside of the corridor: %s" % (routeID, unknown))
+        codes = [self.edgeCodes[edgeID] for edgeID in edges]
+        if codes != list(range(codes[0], codes[0] + len(codes))):
+            raise TraCIException("Route '%s' is not connected" % routeID)
+        indices = np.full(len(self.edgeIDs), tc.INVALID_INT_VALUE, dtype=int)
+        indices[codes] = np.arange(len(codes))
+        self.routeIDs.append(routeID)
+        self.routeEdges.append(tuple(edges))
+        self.routeIndices = np.vstack((self.routeIndices, indices))
+
+    def slot(self, vehID):
+        try:
+            return self.slots[vehID]
+        except KeyError:
+            raise TraCIException("Vehicle '%s' is not known" % vehID)
+
+    def edgeOf(self, positions):
+        return np.minimum(np.searchsorted(self.edgeOffsets, positions, side="right") - 1, len(self.edgeIDs) - 1)
+
+    def laneOf(self, slots, edges):
+        return np.minimum(self.lane[slots], self.edgeLanes[edges] - 1)
+
+    def _grow(self):
+        for name, dtype, default in _COLUMNS:
+            column = getattr(self, name)
+            setattr(self, name, np.concatenate((column, np.full(len(column), default, dtype=dtype))))
+
+    def add(self, vehID, routeID, typeID, depart, departLane, arrivalPos):
+        if vehID in self.slots:
+            raise TraCIException("Vehicle '%s' to add already exists." % vehID)
+        if routeID not in self.routeIDs:
+            raise TraCIException("Invalid route '%s' for vehicle '%s'" % (routeID, vehID))
+        typeIndex = self.vTypeIndex(typeID)
+        routeCode = self.routeIDs.index(routeID)
+        firstEdge = self.edgeCodes[self.routeEdges[routeCode][0]]
+        lastEdge = self.edgeCodes[self.routeEdges[routeCode][-1]]
+        if departLane == "random":
+            departLane = self.rng.randint(self.edgeLanes[firstEdge])
+        elif departLane in ("first", "free", "best", "allowed", None):
+            departLane = 0
+        if arrivalPos == "random":
+            arrivalPos = self.rng.random_sample() * self.edgeLengths[lastEdge]
+        elif arrivalPos in ("max", None):
+            arrivalPos = self.edgeLengths[lastEdge]
+        if self.freeSlots:
+            s = self.freeSlots.pop()
+        else:
+            s = len(self.vehIDs)
+            self.vehIDs.append(None)
+            if s == len(self.alive):
+                self._grow()
+        for name, dtype, default in _COLUMNS:
+            getattr(self, name)[s] = default
+        self.vehIDs[s] = vehID
+        self.slots[vehID] = s
+        self.pending[s] = True
+        self.order[s] = self.insertions
+        self.insertions += 1
+        self.depart[s] = self.time if depart in ("now", None) else float(depart)
+        self.typeIndex[s] = typeIndex
+        self.speedFactor[s] = self.vTypeParameters[typeIndex, VTYPE_PARAMETERS.index("speedFactor")]
+        self.routeCode[s] = routeCode
+        self.lane[s] = min(int(departLane), self.edgeLanes[firstEdge] - 1)
+        self.pos[s] = self.edgeOffsets[firstEdge]
+        self.arrivalPos[s] = self.edgeOffsets[lastEdge] + min(float(arrivalPos), self.edgeLengths[lastEdge])
+
+    def remove(self, slots):
+        for s in slots:
+            vehID = self.vehIDs[s]
+            del self.slots[vehID]
+            self.subscriptions.pop(vehID, None)
+            self.vehIDs[s] = None
+            self.freeSlots.append(s)
+        self.alive[slots] = False
+        self.pending[slots] = False
+
+    def step(self):
+        self.time += self.stepLength
+        # requested lane changes are done at the beginning of the step
+        changing = np.flatnonzero(self.alive & (self.targetLane >= 0))
+        self.lane[changing] = self.targetLane[changing]
+        self.targetLane[changing] = -1
+        self._insert()
+        self._move()
+        self._updateLeaders()
+        self._collectSubscriptions()
+
+    def _sortedByLane(self, slots):
+        edges = self.edgeOf(self.pos[slots])
+        lanes = self.laneOf(slots, edges)
+        order = np.lexsort((self.pos[slots], lanes))
+        return slots[order], lanes[order]
+
+    def _insert(self):
+        waiting = np.flatnonzero(self.pending & (self.depart <= self.time + 1e-6))
+        self.departedIDs = []
+        if len(waiting) == 0:
+            return
+        # only the first waiting vehicle of each lane (in the order of their addition) is tried
+        firstEdges = self.edgeOf(self.pos[waiting])
+        keys = firstEdges * self.maxLanes + self.laneOf(waiting, firstEdges)
+        order = np.lexsort((self.order[waiting], keys))
+        keys = keys[order]
+        isFirst = np.concatenate(([True], keys[1:] != keys[:-1]))
+        candidates, keys = waiting[order][isFirst], keys[isFirst]
+        # rearmost back position on each lane of each edge
+        rearmost = np.full(len(self.edgeIDs) * self.maxLanes, np.inf)
+        driving = np.flatnonzero(self.alive)
+        if len(driving):
+            backs = self.pos[driving] - self.vTypeParameter("length", driving)
+            backEdges = self.edgeOf(backs)
+            np.minimum.at(rearmost, backEdges * self.maxLanes + self.laneOf(driving, backEdges), backs)
+        fronts = self.pos[candidates] + self.vTypeParameter("length", candidates)
+        inserted = candidates[rearmost[keys] - fronts >= self.vTypeParameter("minGap", candidates)]
+        inserted = inserted[np.argsort(self.order[inserted])]
+        self.pos[inserted] += self.vTypeParameter("length", inserted)
+        self.pending[inserted] = False
+        self.alive[inserted] = True
+        self.departedIDs = [self.vehIDs[s] for s in inserted]
+
+    def _move(self):
+        self.arrivedIDs = []
+        driving = np.flatnonzero(self.alive)
+        if len(driving) == 0:
+            return
+        slots, lanes = self._sortedByLane(driving)
+        sameLane = np.zeros(len(slots), dtype=bool)
+        sameLane[:-1] = lanes[:-1] == lanes[1:]
+        leaders = np.roll(slots, -1)[sameLane]
+        gaps = np.full(len(slots), np.inf)
+        gaps[sameLane] = self.pos[leaders] - self.vTypeParameter("length", leaders) - self.pos[slots[sameLane]] \
+            - self.vTypeParameter("minGap", slots[sameLane])
+        speeds = self.speed[slots]
+        leaderSpeeds = np.zeros(len(slots))
+        leaderSpeeds[sameLane] = self.speed[leaders]
+        tau = self.vTypeParameter("tau", slots)
+        decel = self.vTypeParameter("decel", slots)
+        maxSpeeds = np.minimum(self.vTypeParameter("maxSpeed", slots),
+                               self.edgeSpeeds[self.edgeOf(self.pos[slots])] * self.speedFactor[slots])
+        with np.errstate(invalid="ignore"):
+            safeSpeeds = leaderSpeeds + (gaps - leaderSpeeds * tau) / ((speeds + leaderSpeeds) / (2. * decel) + tau)
+        newSpeeds = np.minimum(np.minimum(speeds + self.vTypeParameter("accel", slots) * self.stepLength, maxSpeeds),
+                               safeSpeeds)
+        forced = self.forcedSpeed[slots]
+        newSpeeds = np.maximum(np.where(forced >= 0, np.minimum(forced, safeSpeeds), newSpeeds), 0.)
+        self.accel[slots] = (newSpeeds - speeds) / self.stepLength
+        self.speed[slots] = newSpeeds
+        self.pos[slots] += newSpeeds * self.stepLength
+        self.distance[slots] += newSpeeds * self.stepLength
+        arrived = slots[self.pos[slots] >= self.arrivalPos[slots]]
+        arrived = arrived[np.argsort(self.order[arrived])]
+        self.arrivedIDs = [self.vehIDs[s] for s in arrived]
+        self.remove(arrived)
+
+    def _updateLeaders(self):
+        self.leader[:] = -1
+        self.leaderGap[:] = np.inf
+        driving = np.flatnonzero(self.alive)
+        if len(driving) < 2:
+            return
+        slots, lanes = self._sortedByLane(driving)
+        followers = slots[:-1][lanes[:-1] == lanes[1:]]
+        leaders = slots[1:][lanes[:-1] == lanes[1:]]
+        self.leader[followers] = leaders
+        self.leaderGap[followers] = self.pos[leaders] - self.vTypeParameter("length", leaders) - self.pos[followers] \
+            - self.vTypeParameter("minGap", followers)
+
+    # Returns the values of the given variable for the given vehicles as a list. Vehicles waiting for their
+    # insertion report SUMO's invalid values. The leader is searched within the given distances (the brake gap if 0).
+    def values(self, slots, varID, leaderDistances=0.):
+        getter = _VARIABLES.get(varID)
+        if getter is None:
+            raise TraCIException("Variable 0x%x is not supported by the stand-in" % varID)
+        edges = self.edgeOf(self.pos[slots])
+        values = getter(self, slots, edges, leaderDistances)
+        waiting = np.flatnonzero(~self.alive[slots])
+        if len(waiting) and varID in _INVALID_VALUES:
+            for i in waiting:
+                values[i] = _INVALID_VALUES[varID]
+        return values
+
+    def _collectSubscriptions(self):
+        self.subscriptionResults = dict()
+        groups = defaultdict(list)
+        for vehID, (varIDs, leaderDistance) in self.subscriptions.items():
+            groups[varIDs].append(vehID)
+        for varIDs, vehIDs in groups.items():
+            self.subscriptionResults.update(self.results(vehIDs, varIDs))
+        self.contextResults = dict()
+        if self.contextSubscriptions:
+            driving = np.flatnonzero(self.alive)
+            edges = self.edgeOf(self.pos[driving])
+            for edgeID, varIDs in self.contextSubscriptions.items():
+                vehIDs = [self.vehIDs[s] for s in driving[edges == self.edgeCodes[edgeID]]]
+                self.contextResults[edgeID] = self.results(vehIDs, varIDs)
+
+    # Returns the values of the given variables as dict: vehID -> (dict: variable -> value)
+    def results(self, vehIDs, varIDs):
+        if len(vehIDs) == 0:
+            return dict()
+        slots = np.array([self.slots[vehID] for vehID in vehIDs])
+        leaderDistances = np.array([self.subscriptions[vehID][1] if vehID in self.subscriptions else 0.
+                                    for vehID in vehIDs])
+        columns = [self.values(slots, varID, leaderDistances) for varID in varIDs]
+        return dict((vehID, dict(zip(varIDs, row))) for vehID, row in zip(vehIDs, zip(*columns)))
+
+
+def _leaders(world, slots, edges, leaderDistances):
+    leaders = world.leader[slots]
+    gaps = world.leaderGap[slots]
+    speeds = world.speed[slots]
+    # like SUMO, a distance of 0 stands for the brake gap
+    brakeGaps = speeds * (speeds / (2. * world.vTypeParameter("decel", slots)) + world.vTypeParameter("tau", slots))
+    found = (leaders >= 0) & (gaps <= np.where(np.asarray(leaderDistances) > 0, leaderDistances, brakeGaps))
+    return [(world.vehIDs[leader], gap) if isFound else None
+            for leader, gap, isFound in zip(leaders.tolist(), gaps.tolist(), found.tolist())]
+
+
+def _fuelConsumptions(world, slots, edges, leaderDistances):
+    # simple polynomial of speed and acceleration [ml/s], not an emission model
+    speeds = world.speed[slots]
+    return (0.2 + 8e-5 * speeds ** 3 + 0.05 * np.maximum(world.accel[slots], 0.) * speeds).tolist()
+
+
+def _vTypeParameter(name):
+    return lambda world, slots, edges, leaderDistances: world.vTypeParameter(name, slots).tolist()
+
+
+_VARIABLES = {
+    tc.VAR_SPEED: lambda world, slots, edges, d: world.speed[slots].tolist(),
+    tc.VAR_ROAD_ID: lambda world, slots, edges, d: [world.edgeIDs[e] for e in edges.tolist()],
+    tc.VAR_LANE_ID: lambda world, slots, edges, d: [world.laneIDs[i] for i in
+                                                   (edges * world.maxLanes + world.laneOf(slots, edges)).tolist()],
+    tc.VAR_LANE_INDEX: lambda world, slots, edges, d: world.laneOf(slots, edges).tolist(),
+    tc.VAR_LANEPOSITION: lambda world, slots, edges, d: (world.pos[slots] - world.edgeOffsets[edges]).tolist(),
+    tc.VAR_DISTANCE: lambda world, slots, edges, d: world.distance[slots].tolist(),
+    tc.VAR_ROUTE_INDEX: lambda world, slots, edges, d: world.routeIndices[world.routeCode[slots], edges].tolist(),
+    tc.VAR_ROUTE_ID: lambda world, slots, edges, d: [world.routeIDs[r] for r in world.routeCode[slots].tolist()],
+    tc.VAR_TYPE: lambda world, slots, edges, d: [world.vTypeIDs[t] for t in world.typeIndex[slots].tolist()],
+    tc.VAR_SPEED_FACTOR: lambda world, slots, edges, d: world.speedFactor[slots].tolist(),
+    tc.VAR_LEADER: _leaders,
+    tc.VAR_FUELCONSUMPTION: _fuelConsumptions,
+    tc.VAR_LENGTH: _vTypeParameter("length"),
+    tc.VAR_MINGAP: _vTypeParameter("minGap"),
+    tc.VAR_ACCEL: _vTypeParameter("accel"),
+    tc.VAR_DECEL: _vTypeParameter("decel"),
+    tc.VAR_EMERGENCY_DECEL: _vTypeParameter("emergencyDecel"),
+    tc.VAR_TAU: _vTypeParameter("tau"),
+    tc.VAR_MAXSPEED: _vTypeParameter("maxSpeed"),
+}
+
+# values of vehicles which are not yet inserted (see SUMO's TraCI)
+_INVALID_VALUES = {
+    tc.VAR_SPEED: tc.INVALID_DOUBLE_VALUE,
+    tc.VAR_ROAD_ID: "",
+    tc.VAR_LANE_ID: "",
+    tc.VAR_LANE_INDEX: tc.INVALID_INT_VALUE,
+    tc.VAR_LANEPOSITION: tc.INVALID_DOUBLE_VALUE,
+    tc.VAR_DISTANCE: tc.INVALID_DOUBLE_VALUE,
+    tc.VAR_ROUTE_INDEX: tc.INVALID_INT_VALUE,
+    tc.VAR_LEADER: None,
+    tc.VAR_FUELCONSUMPTION: tc.INVALID_DOUBLE_VALUE,
+}
+
+_world = None
+_listeners = dict()
+_nextListenerID = [0]
+
+
+def _running():
+    if _world is None:
+        raise FatalTraCIError("Not connected.")
+    return _world
+
+
+class _VehicleDomain(object):
+
+    def _value(self, vehID, varID):
+        world = _running()
+        return world.values(np.array([world.slot(vehID)]), varID)[0]
+
+    def getIDList(self):
+        world = _running()
+        return tuple(world.vehIDs[s] for s in np.flatnonzero(world.alive))
+
+    def getIDCount(self):
+        return int(_running().alive.sum())
+
+    def getSpeed(self, vehID):
+        return self._value(vehID, tc.VAR_SPEED)
+
+    def getRoadID(self, vehID):
+        return self._value(vehID, tc.VAR_ROAD_ID)
+
+    def getLaneID(self, vehID):
+        return self._value(vehID, tc.VAR_LANE_ID)
+
+    def getLaneIndex(self, vehID):
+        return self._value(vehID, tc.VAR_LANE_INDEX)
+
+    def getLanePosition(self, vehID):
+        return self._value(vehID, tc.VAR_LANEPOSITION)
+
+    def getDistance(self, vehID):
+        return self._value(vehID, tc.VAR_DISTANCE)
+
+    def getRouteIndex(self, vehID):
+        return self._value(vehID, tc.VAR_ROUTE_INDEX)
+
+    def getRouteID(self, vehID):
+        return self._value(vehID, tc.VAR_ROUTE_ID)
+
+    def getRoute(self, vehID):
+        world = _running()
+        return world.routeEdges[world.routeCode[world.slot(vehID)]]
+
+    def getTypeID(self, vehID):
+        return self._value(vehID, tc.VAR_TYPE)
+
+    def getLength(self, vehID):
+        return self._value(vehID, tc.VAR_LENGTH)
+
+    def getMinGap(self, vehID):
+        return self._value(vehID, tc.VAR_MINGAP)
+
+    def getDecel(self, vehID):
+        return self._value(vehID, tc.VAR_DECEL)
+
+    def getMaxSpeed(self, vehID):
+        return self._value(vehID, tc.VAR_MAXSPEED)
+
+    def getSpeedFactor(self, vehID):
+        return self._value(vehID, tc.VAR_SPEED_FACTOR)
+
+    def getFuelConsumption(self, vehID):
+        return self._value(vehID, tc.VAR_FUELCONSUMPTION)
+
+    def getLeader(self, vehID, dist=0.):
+        world = _running()
+        return world.values(np.array([world.slot(vehID)]), tc.VAR_LEADER, dist)[0]
+
+    def isRouteValid(self, vehID):
+        _running().slot(vehID)
+        return True
+
+    def add(self, vehID, routeID, typeID="DEFAULT_VEHTYPE", depart=None, departLane="first", departPos="base",
+            departSpeed="0", arrivalLane="current", arrivalPos="max", arrivalSpeed="current", line="",
+            personCapacity=0, personNumber=0):
+        # vehicles are inserted at the beginning of their first edge with speed 0, the arrival lane is ignored
+        _running().add(vehID, routeID, typeID, depart, departLane, arrivalPos)
+
+    addFull = add
+
+    def remove(self, vehID, reason=3):
+        world = _running()
+        world.remove([world.slot(vehID)])
+
+    def setType(self, vehID, typeID):
+        world = _running()
+        world.typeIndex[world.slot(vehID)] = world.vTypeIndex(typeID)
+
+    def setSpeedFactor(self, vehID, factor):
+        world = _running()
+        world.speedFactor[world.slot(vehID)] = factor
+
+    def setSpeed(self, vehID, speed):
+        world = _running()
+        world.forcedSpeed[world.slot(vehID)] = speed
+
+    def changeLane(self, vehID, laneIndex, duration):
+        world = _running()
+        world.targetLane[world.slot(vehID)] = laneIndex
+
+    def setLaneChangeMode(self, vehID, lcm):
+        _running().slot(vehID)
+
+    def setColor(self, vehID, color):
+        _running().slot(vehID)
+
+    def subscribe(self, vehID, varIDs=(tc.VAR_ROAD_ID, tc.VAR_LANEPOSITION), begin=0, end=2 ** 31 - 1,
+                  parameters=None):
+        world = _running()
+        world.slot(vehID)
+        leaderDistance = (parameters or {}).get(tc.VAR_LEADER, ("d", 0.))
+        if isinstance(leaderDistance, tuple):
+            leaderDistance = leaderDistance[1]
+        world.subscriptions[vehID] = (tuple(varIDs), float(leaderDistance))
+        # like TraCI, the subscription already returns the current values
+        world.subscriptionResults.update(world.results([vehID], tuple(varIDs)))
+
+    def unsubscribe(self, vehID):
+        world = _running()
+        world.subscriptions.pop(vehID, None)
+        world.subscriptionResults.pop(vehID, None)
+
+    def getSubscriptionResults(self, vehID=None):
+        results = _running().subscriptionResults
+        if vehID is None:
+            return results
+        return results.get(vehID, {})
+
+    def getAllSubscriptionResults(self):
+        return _running().subscriptionResults
+
+
+class _VehicleTypeDomain(object):
+
+    def _parameter(self, typeID, name):
+        world = _running()
+        return float(world.vTypeParameters[world.vTypeIndex(typeID), VTYPE_PARAMETERS.index(name)])
+
+    def getIDList(self):
+        return tuple(_running().vTypeIDs)
+
+    def getLength(self, typeID):
+        return self._parameter(typeID, "length")
+
+    def getMinGap(self, typeID):
+        return self._parameter(typeID, "minGap")
+
+    def getAccel(self, typeID):
+        return self._parameter(typeID, "accel")
+
+    def getDecel(self, typeID):
+        return self._parameter(typeID, "decel")
+
+    def getEmergencyDecel(self, typeID):
+        return self._parameter(typeID, "emergencyDecel")
+
+    def getTau(self, typeID):
+        return self._parameter(typeID, "tau")
+
+    def getMaxSpeed(self, typeID):
+        return self._parameter(typeID, "maxSpeed")
+
+    def getSpeedFactor(self, typeID):
+        return self._parameter(typeID, "speedFactor")
+
+    def copy(self, origTypeID, newTypeID):
+        world = _running()
+        row = world.vTypeParameters[world.vTypeIndex(origTypeID)]
+        world.addVType(newTypeID, dict(zip(VTYPE_PARAMETERS, row)))
+
+    def setColor(self, typeID, color):
+        _running().vTypeIndex(typeID)
+
+
+class _LaneDomain(object):
+
+    def _lane(self, laneID):
+        world = _running()
+        edgeID, _, laneIndex = laneID.rpartition("_")
+        code = world.edgeCodes.get(edgeID)
+        if code is None or not laneIndex.isdigit() or int(laneIndex) >= world.edgeLanes[code]:
+            raise TraCIException("Lane '%s' is not known" % laneID)
+        return world, code, int(laneIndex)
+
+    def getIDList(self):
+        world = _running()
+        return tuple(world.laneIDs[code * world.maxLanes + laneIndex] for code in range(len(world.edgeIDs))
+                     for laneIndex in range(world.edgeLanes[code]))
+
+    def getLength(self, laneID):
+        world, code, _ = self._lane(laneID)
+        return float(world.edgeLengths[code])
+
+    def getMaxSpeed(self, laneID):
+        world, code, _ = self._lane(laneID)
+        return float(world.edgeSpeeds[code])
+
+    def getEdgeID(self, laneID):
+        world, code, _ = self._lane(laneID)
+        return world.edgeIDs[code]
+
+    def getLinks(self, laneID, extended=True):
+        # each lane is connected to the lane with the same index (or the outermost lane) on the next edge
+        world, code, laneIndex = self._lane(laneID)
+        if code + 1 == len(world.edgeIDs):
+            return []
+        approached = "%s_%d" % (world.edgeIDs[code + 1], min(laneIndex, world.edgeLanes[code + 1] - 1))
+        if extended:
+            return [(approached, True, True, False, "", "M", "s", 0.)]
+        return [(approached, True, True, False)]
+
+
+class _EdgeDomain(object):
+
+    def getIDList(self):
+        return tuple(_running().edgeIDs)
+
+    def getLaneNumber(self, edgeID):
+        world = _running()
+        if edgeID not in world.edgeCodes:
+            raise TraCIException("Edge '%s' is not known" % edgeID)
+        return int(world.edgeLanes[world.edgeCodes[edgeID]])
+
+    def subscribeContext(self, edgeID, domain, dist, varIDs=(tc.VAR_ROAD_ID, tc.VAR_LANEPOSITION), begin=0,
+                         end=2 ** 31 - 1):
+        # the context contains the vehicles on the edge (the range is ignored)
+        world = _running()
+        if edgeID not in world.edgeCodes:
+            raise TraCIException("Edge '%s' is not known" % edgeID)
+        world.contextSubscriptions[edgeID] = tuple(varIDs)
+
+    def unsubscribeContext(self, edgeID, domain, dist):
+        world = _running()
+        world.contextSubscriptions.pop(edgeID, None)
+        world.contextResults.pop(edgeID, None)
+
+    def getContextSubscriptionResults(self, edgeID):
+        return _running().contextResults.get(edgeID, {})
+
+    def getAllContextSubscriptionResults(self):
+        return _running().contextResults
+
+
+class _RouteDomain(object):
+
+    def getIDList(self):
+        return tuple(_running().routeIDs)
+
+    def getEdges(self, routeID):
+        world = _running()
+        if routeID not in world.routeIDs:
+            raise TraCIException("Route '%s' is not known" % routeID)
+        return world.routeEdges[world.routeIDs.index(routeID)]
+
+    def add(self, routeID, edges):
+        _running().addRoute(routeID, list(edges))
+
+
+class _SimulationDomain(object):
+
+    def getDeltaT(self):
+        # in ms, as the traci versions simpla was written for
+        return int(round(_running().stepLength * 1000))
+
+    def getCurrentTime(self):
+        return int(round(_running().time * 1000))
+
+    def getTime(self):
+        return _running().time
+
+    def getArrivedIDList(self):
+        return tuple(_running().arrivedIDs)
+
+    def getDepartedIDList(self):
+        return tuple(_running().departedIDs)
+
+    def getMinExpectedNumber(self):
+        world = _running()
+        return int(world.alive.sum() + world.pending.sum())
+
+    def findRoute(self, fromEdge, toEdge, vType="", depart=-1., routingMode=0):
+        world = _running()
+        first, last = world.edgeCodes.get(fromEdge), world.edgeCodes.get(toEdge)
+        if first is None or last is None or last < first:
+            return Stage((), -1., -1.)
+        return Stage(tuple(world.edgeIDs[first:last + 1]), float(world.edgeLengths[first:last + 1].sum()),
+                     float((world.edgeLengths / world.edgeSpeeds)[first:last + 1].sum()))
+
+    def saveState(self, fileName):
+        with open(fileName, "wb") as f:
+            pickle.dump(_running(), f, 2)
+
+    def loadState(self, fileName):
+        global _world
+        with open(fileName, "rb") as f:
+            _world = pickle.load(f)
+
+
+vehicle = _VehicleDomain()
+vehicletype = _VehicleTypeDomain()
+lane = _LaneDomain()
+edge = _EdgeDomain()
+route = _RouteDomain()
+simulation = _SimulationDomain()
+
+
+# Starts the simulation of the given corridor (list of (edge ID, number of lanes, length, speed limit), see
+# readCorridor()), vTypes (list of (ID, dict: parameter -> value), see VTYPE_PARAMETERS) and routes
+def loadCorridor(corridor, vTypes=(), routes=(), seed=42, stepLength=1.):
+    global _world
+    _world = _World(corridor, vTypes, routes, seed, stepLength)
+
+
+# Starts the simulation for the given SUMO arguments (without the binary). The network of the SUMO config (-c) or the
+# net file (-n) defines the corridor, the route files (-r) the vTypes and routes. Supported further options are
+# --seed, --step-length and --load-state, all other options are ignored.
+def load(args):
+    options = dict(zip(args[::2], args[1::2]))
+    netFile, routeFiles, directory = None, [], "."
+    configFile = options.get("-c", options.get("--configuration-file"))
+    if configFile is not None:
+        directory = os.path.dirname(os.path.abspath(configFile))
+        for element in ET.parse(configFile).getroot().iter():
+            if element.get("value") is not None:
+                options.setdefault("--" + element.tag, element.get("value"))
+    netFile = options.get("-n", options.get("--net-file"))
+    if netFile is None:
+        raise TraCIException("No network given")
+    routeFiles = options.get("-r", options.get("--route-files"))
+    routeFiles = [os.path.join(directory, f) for f in routeFiles.split(",")] if routeFiles else []
+    vTypes, routes = readRouteFiles(routeFiles)
+    loadCorridor(readCorridor(os.path.join(directory, netFile), Config.startEdgeID, Config.lastEdgeID), vTypes,
+                 routes, int(options.get("--seed", 23423)), float(options.get("--step-length", 1.)))
+    if "--load-state" in options:
+        simulation.loadState(options["--load-state"])
+
+
+# Starts the simulation for the given command line (the binary is ignored), see load()
+def start(cmd, port=None, numRetries=0, label="default", stdout=None):
+    load(cmd[1:])
+    return getVersion()
+
+
+def getVersion():
+    return (0, "TraCIStandIn")
+
+
+def simulationStep(step=0.):
+    _running().step()
+    # like traci, listeners returning False are removed
+    for listenerID, listener in list(_listeners.items()):
+        if not listener.step(step):
+            removeStepListener(listenerID)
+    return []
+
+
+def addStepListener(listener):
+    listenerID = _nextListenerID[0]
+    _nextListenerID[0] += 1
+    listener.setID(listenerID)
+    _listeners[listenerID] = listener
+    return listenerID
+
+
+def removeStepListener(listenerID):
+    listener = _listeners.pop(listenerID, None)
+    if listener is None:
+        return False
+    listener.cleanUp()
+    return True
+
+
+def close(wait=True):
+    global _world
+    _running()
+    _world = None
@@ -0,0 +1,61 @@
+# benchmark of the step throughput with the TraCI socket and the in-process libsumo backend (see sumo/Backend.py)
+# for growing numbers of platooning vehicles. Requires SUMO (and libsumo for the second backend) in SUMO_HOME.
+# Each measurement runs in its own process, since the backend is selected when the simulation modules are imported.
+# Run from the repository root: python -m app.tests.backendBenchmark [steps]
+import os
+import subprocess
+import sys
+import time
+
+BACKENDS = ["traci", "libsumo"]
+CAR_COUNTS = [250, 1000, 5000]
+
+repository = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir, os.pardir))
+simplaConfig = os.path.join(repository, "app", "map", "simpla.cfg")
+
+
+def run(backend, cars, steps):
+    ''' simulates the given number of steps with the given backend, returns the steps per second '''
+    import app.Config as Config
+    Config.sumoBackend = backend
+    Config.kafkaUpdates = False
+    Config.parameters["contextual"]["platoonCarCounter"] = cars
+    Config.parameters["contextual"]["totalCarCounter"] = cars
+
+    import app.simpla
+    from app.sumo import SUMOConnector
+    from app.sumo.Backend import traci
+    SUMOConnector.start()
+    platoon_mgr = app.simpla.load(simplaConfig)
+    platoon_mgr.applyCarCounter()
+    start = time.time()
+    for _ in range(steps):
+        traci.simulationStep()
+    elapsed = time.time() - start
+    app.simpla.stop()
+    traci.close()
+    return steps / elapsed
+
+
+def measure(backend, cars, steps):
+    ''' runs the benchmark in a new process, returns the steps per second or None if the backend failed '''
+    try:
+        output = subprocess.check_output([sys.executable, "-m", "app.tests.backendBenchmark", backend, str(cars),
+                                          str(steps)], cwd=repository)
+    except subprocess.CalledProcessError:
+        return None
+    # simpla may print warnings, the result is the last line
+    return float(output.decode().strip().splitlines()[-1])
+
+
+if __name__ == '__main__':
+    if len(sys.argv) == 4:
+        print(run(sys.argv[1], int(sys.argv[2]), int(sys.argv[3])))
+        sys.exit(0)
+    steps = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    print("vehicles  " + "  ".join("%14s" % ("%s [steps/s]" % backend) for backend in BACKENDS) + "  speedup")
+    for cars in CAR_COUNTS:
+        throughput = [measure(backend, cars, steps) for backend in BACKENDS]
+        speedup = throughput[1] / throughput[0] if None not in throughput else None
+        print("%8d  " % cars + "  ".join("%14s" % ("%.1f" % t if t is not None else "failed") for t in throughput)
+              + "  %7s" % ("%.2f" % speedup if speedup is not None else "-"))
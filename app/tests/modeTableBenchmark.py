@@ -0,0 +1,48 @@
+# benchmark of the control step phases which depend on the platoon modes (mode switches, vType, speed factor and
+# lane change mode lookups, see simpla/_modetable.py) for growing numbers of platooning vehicles, on the pure Python
+# stand-in (see standInBenchmark.py). Compare the numbers with those of a checkout before the mode tables.
+# Run from the repository root: python -m app.tests.modeTableBenchmark [warm-up steps] [measured steps]
+import os
+import random
+import sys
+from collections import OrderedDict
+
+from app.tests.standInBenchmark import loadCorridor, mapDir, timed
+
+import app.Config as Config
+import app.simpla
+from app.sumo.Backend import traci
+
+CAR_COUNTS = [250, 1000, 5000]
+PHASES = ["_manageFollowers", "_manageLeaders", "_adviseLanes"]
+
+
+def benchmark(cars, warmupSteps, steps):
+    ''' returns the mean time per control step [ms] of each phase and of the whole step of the platoon manager '''
+    Config.parameters["contextual"]["platoonCarCounter"] = cars
+    Config.parameters["contextual"]["totalCarCounter"] = cars
+    random.seed(42)
+    loadCorridor()
+    app.simpla.clearCaches()
+    platoon_mgr = app.simpla.load(os.path.join(mapDir, "simpla.cfg"))
+    platoon_mgr.applyCarCounter()
+    for _ in range(warmupSteps):
+        traci.simulationStep()
+
+    timings = OrderedDict((name, 0.) for name in PHASES + ["step"])
+    for name in PHASES + ["step"]:
+        timed(platoon_mgr, name, timings)
+    for _ in range(steps):
+        traci.simulationStep()
+    app.simpla.stop()
+    traci.close()
+    return OrderedDict((name, 1000. * t / steps) for name, t in timings.items())
+
+
+if __name__ == '__main__':
+    warmupSteps = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    steps = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    print("vehicles  " + "  ".join(name.lstrip("_") for name in PHASES + ["step"]) + "  (mean per step [ms])")
+    for cars in CAR_COUNTS:
+        timings = benchmark(cars, warmupSteps, steps)
+        print("%8d  " % cars + "  ".join("%*.2f" % (len(name.lstrip("_")), t) for name, t in timings.items()))
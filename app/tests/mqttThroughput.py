@@ -0,0 +1,40 @@
+
+# publishes status messages through KafkaPublisher to a local mqtt broker (Config.mqttHost, e.g. mosquitto)
+# and reports the enqueue cost and the delivered message rate for some qos / packing settings
+import sys
+import time
+
+from app import Config
+from app.streaming import KafkaPublisher
+
+
+def run(messages, qos, recordsPerPayload):
+    Config.mqttQos = qos
+    Config.mqttRecordsPerPayload = recordsPerPayload
+    before = KafkaPublisher.getStats()
+    start = time.time()
+    for i in range(messages):
+        KafkaPublisher.publish({"tick": i, "speed": 13.9, "fuel": 0.4}, Config.kafkaTopicMeanCarData)
+    enqueued = time.time() - start
+    KafkaPublisher.flush(60.)
+    # wait for the acknowledgements of the broker
+    while KafkaPublisher.getStats()["mqttDelivered"] < KafkaPublisher.getStats()["mqttPublished"] \
+            and time.time() - start < 60.:
+        time.sleep(0.01)
+    total = time.time() - start
+    stats = KafkaPublisher.getStats()
+    payloads = stats["mqttDelivered"] - before["mqttDelivered"]
+    return 1e6 * enqueued / messages, messages / total, payloads, stats["mqttFailed"] - before["mqttFailed"]
+
+
+if __name__ == '__main__':
+    messages = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    Config.kafkaUpdates = False
+    Config.mqttUpdates = True
+    KafkaPublisher.connectMqtt()
+    time.sleep(1.)
+    print("qos  records/payload  enqueue [us/msg]  delivered [msg/s]  payloads  failed")
+    for qos in [0, 1]:
+        for recordsPerPayload in [1, 10, 100]:
+            print("%3d  %15d  %16.1f  %17.0f  %8d  %6d" % ((qos, recordsPerPayload) + run(messages, qos, recordsPerPayload)))
+    KafkaPublisher.close()
@@ -0,0 +1,32 @@
+
+# micro-benchmark for PlatoonManager.reorderVehicles() with growing platoon sizes (maxVehiclesInPlatoon)
+import random
+import timeit
+
+from app.simpla._platoonmanager import PlatoonManager
+
+
+def createCase(size, swaps):
+    ''' returns the registered vehicle order and the actual leaders after swapping some neighbours '''
+    vehicles = list(range(size))
+    actualOrder = list(vehicles)
+    for _ in range(swaps):
+        ix = random.randint(0, size - 2)
+        actualOrder[ix], actualOrder[ix + 1] = actualOrder[ix + 1], actualOrder[ix]
+    position = dict((veh, ix) for ix, veh in enumerate(actualOrder))
+    actualLeaders = [actualOrder[position[veh] - 1] if position[veh] > 0 else None for veh in vehicles]
+    return vehicles, actualLeaders
+
+
+def benchmark(size, swaps, repetitions=200):
+    vehicles, actualLeaders = createCase(size, swaps)
+    total = timeit.timeit(lambda: PlatoonManager.reorderVehicles(vehicles, actualLeaders), number=repetitions)
+    return 1e6 * total / repetitions
+
+
+if __name__ == '__main__':
+    random.seed(42)
+    print("maxVehiclesInPlatoon  consistent [us]  1 swap [us]  size/10 swaps [us]")
+    for size in [10, 25, 50, 100, 200]:
+        print("%20d  %15.1f  %11.1f  %18.1f" % (size, benchmark(size, 0), benchmark(size, 1),
+                                                 benchmark(size, size // 10)))
@@ -0,0 +1,87 @@
+# benchmark of the phases of the platoon manager's steps on the pure Python stand-in (see sumo/TraCIStandIn.py) for
+# growing numbers of platooning vehicles. Runs without SUMO, the time of SUMO's steps does not hide simpla's overhead.
+# The A9 corridor is widened and stretched by the factors below, such that all vehicles fit onto it.
+# Run from the repository root: python -m app.tests.standInBenchmark [warm-up steps] [measured steps]
+import os
+import random
+import sys
+import time
+from collections import OrderedDict
+
+import app.Config as Config
+
+Config.sumoBackend = "standin"
+Config.kafkaUpdates = False
+
+import app.simpla
+from app.sumo import TraCIStandIn
+from app.sumo.Backend import traci
+
+CAR_COUNTS = [250, 1000, 5000, 10000]
+LANE_FACTOR = 4
+LENGTH_FACTOR = 4
+# methods of the platoon manager measured separately (_spawnVehicles is called within _removeArrived)
+PHASES = ["_removeArrived", "_spawnVehicles", "_updateVehicleStates", "_manageFollowers", "_updatePlatoonOrdering",
+          "_manageLeaders", "_adviseLanes"]
+
+mapDir = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "map")
+
+
+def loadCorridor():
+    corridor = TraCIStandIn.readCorridor(os.path.join(mapDir, Config.sumoNet), Config.startEdgeID, Config.lastEdgeID)
+    vTypes, routes = TraCIStandIn.readRouteFiles([os.path.join(mapDir, "Flow.rou.xml")])
+    TraCIStandIn.loadCorridor([(edgeID, lanes * LANE_FACTOR, length * LENGTH_FACTOR, speed)
+                               for edgeID, lanes, length, speed in corridor], vTypes, routes, seed=42)
+
+
+def timed(obj, name, timings, key=None):
+    ''' replaces the method of the given object by one adding its run time to timings[key] (default: name) '''
+    method = getattr(obj, name)
+    key = key or name
+
+    def call(*args, **kwargs):
+        start = time.time()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            timings[key] += time.time() - start
+    setattr(obj, name, call)
+
+
+def benchmark(cars, warmupSteps, steps):
+    ''' returns the time of the initial spawn, the number of vehicles on the road and the mean time per step [ms]
+     of the stand-in and of each phase '''
+    Config.parameters["contextual"]["platoonCarCounter"] = cars
+    Config.parameters["contextual"]["totalCarCounter"] = cars
+    # the stand-in is deterministic given its seed, simpla also draws from random
+    random.seed(42)
+    loadCorridor()
+    app.simpla.clearCaches()
+    platoon_mgr = app.simpla.load(os.path.join(mapDir, "simpla.cfg"))
+    start = time.time()
+    platoon_mgr.applyCarCounter()
+    spawnTime = time.time() - start
+    for _ in range(warmupSteps):
+        traci.simulationStep()
+
+    timings = OrderedDict((name, 0.) for name in ["standIn"] + PHASES)
+    timed(TraCIStandIn._world, "step", timings, "standIn")
+    for name in PHASES:
+        timed(platoon_mgr, name, timings)
+    for _ in range(steps):
+        traci.simulationStep()
+    onRoad = traci.vehicle.getIDCount()
+    app.simpla.stop()
+    traci.close()
+    return 1000. * spawnTime, onRoad, OrderedDict((name, 1000. * t / steps) for name, t in timings.items())
+
+
+if __name__ == '__main__':
+    warmupSteps = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    steps = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    print("vehicles  spawn [ms]  on road  " + "  ".join(name.lstrip("_") for name in ["standIn"] + PHASES)
+          + "  (mean per step [ms])")
+    for cars in CAR_COUNTS:
+        spawnTime, onRoad, timings = benchmark(cars, warmupSteps, steps)
+        print("%8d  %10.1f  %7d  " % (cars, spawnTime, onRoad)
+              + "  ".join("%*.2f" % (len(name.lstrip("_")), t) for name, t in timings.items()))
@@ -0,0 +1,68 @@
+# regression test of the safety checks (see simpla/_safety.py) on the pure Python stand-in (see sumo/TraCIStandIn.py):
+# the platoon vTypes brake less than the original vType, so the halt at the end of the lane is checked for the switch
+# into every platooning mode, also for vehicles still waiting for their insertion (these are on no lane).
+# The control steps must run without errors and vehicles must be inserted, form platoons and arrive.
+# Run from the repository root: python -m app.tests.standInLowerDecel [steps]
+import os
+import random
+import shutil
+import sys
+import tempfile
+import xml.etree.ElementTree as ET
+
+import app.Config as Config
+
+Config.sumoBackend = "standin"
+Config.kafkaUpdates = False
+
+import app.simpla
+from app.sumo import TraCIStandIn
+from app.sumo.Backend import traci
+
+CARS = 1000
+VTYPES = [("car", dict(accel=2.6, decel=4.5, sigma=0.5, speedFactor=1.0)),
+          ("carP", dict(accel=2.6, decel=3.0, sigma=0.5, speedFactor=1.0))]
+# replaces the vTypeMap of the scenario's simpla config
+VTYPE_MAP = dict(original="car", leader="carP", follower="carP", catchup="carP", catchupFollower="carP")
+
+mapDir = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "map")
+
+
+def run(steps):
+    ''' simulates the given number of steps, returns the number of arrived vehicles and of platoons at the end '''
+    Config.parameters["contextual"]["platoonCarCounter"] = CARS
+    Config.parameters["contextual"]["totalCarCounter"] = CARS
+    random.seed(42)
+    corridor = TraCIStandIn.readCorridor(os.path.join(mapDir, Config.sumoNet), Config.startEdgeID, Config.lastEdgeID)
+    _, routes = TraCIStandIn.readRouteFiles([os.path.join(mapDir, "Flow.rou.xml")])
+    TraCIStandIn.loadCorridor(corridor, VTYPES, routes, seed=42)
+
+    directory = tempfile.mkdtemp(prefix="simpla")
+    try:
+        simplaConfig = os.path.join(directory, "simpla.cfg")
+        tree = ET.parse(os.path.join(mapDir, "simpla.cfg"))
+        vTypeMap = tree.getroot().find("vTypeMap")
+        vTypeMap.attrib.clear()
+        vTypeMap.attrib.update(VTYPE_MAP)
+        tree.write(simplaConfig)
+        app.simpla.clearCaches()
+        platoon_mgr = app.simpla.load(simplaConfig)
+    finally:
+        shutil.rmtree(directory)
+    platoon_mgr.applyCarCounter()
+    arrived = 0
+    for _ in range(steps):
+        traci.simulationStep()
+        arrived += len(traci.simulation.getArrivedIDList())
+    platoons = len([pltn for pltn in platoon_mgr._platoons.values() if pltn.size() > 1])
+    app.simpla.stop()
+    traci.close()
+    return arrived, platoons
+
+
+if __name__ == '__main__':
+    steps = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    arrived, platoons = run(steps)
+    print("%d steps: %d arrivals, %d platoons" % (steps, arrived, platoons))
+    if arrived == 0 or platoons == 0:
+        sys.exit("no vehicle arrived or no platoon formed")
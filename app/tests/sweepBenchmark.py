@@ -0,0 +1,59 @@
+# benchmark of the scaling of parameter sweeps (see simulation/ParameterSweep.py) with the number of worker processes.
+# The same grid of experiments is run with 1, 2, 4, ... workers (up to the number of CPUs) on the pure Python
+# stand-in (see sumo/TraCIStandIn.py), or on SUMO if a backend is given. The results of the sweeps must be equal,
+# each experiment is reproducible whichever worker runs it.
+# Run from the repository root: python -m app.tests.sweepBenchmark [steps] [backend]
+import json
+import multiprocessing
+import shutil
+import sys
+import tempfile
+import time
+
+import app.Config as Config
+
+Config.sumoBackend = sys.argv[2] if len(sys.argv) > 2 else "standin"
+Config.kafkaUpdates = False
+
+from app.simulation import ParameterSweep
+
+GRID = dict(maxPlatoonGap=[200.0, 500.0],
+            joinDistance=[1000.0, 3000.0],
+            maxVehiclesInPlatoon=[5, 10])
+
+
+def sweep(workers, steps, pinCPUs):
+    ''' runs the grid with the given number of workers, returns the wall time and the results '''
+    directory = tempfile.mkdtemp(prefix="sweep")
+    try:
+        start = time.time()
+        results = ParameterSweep.run(ParameterSweep.grid(GRID), steps, workers, pinCPUs, directory)
+        return time.time() - start, results
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    steps = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    cpus = multiprocessing.cpu_count()
+    workerCounts = [1]
+    while workerCounts[-1] * 2 <= cpus:
+        workerCounts.append(workerCounts[-1] * 2)
+
+    rows = []
+    reference = None
+    for workers in workerCounts:
+        for pinCPUs in [False, True]:
+            wallTime, results = sweep(workers, steps, pinCPUs)
+            # compared as json, the summaries contain NaN for empty metrics
+            summaries = json.dumps([(r.get("statistics", {}).get("summary"), r.get("error")) for r in results],
+                                   sort_keys=True, default=ParameterSweep.jsonValue)
+            reference = reference or summaries
+            failed = len(ParameterSweep.grid(GRID)) - len([r for r in results if "error" not in r])
+            rows.append((workers, pinCPUs, wallTime, failed, summaries == reference))
+
+    print("workers  pinned  wall time [s]  speedup  efficiency  failed  equal results")
+    for workers, pinCPUs, wallTime, failed, equal in rows:
+        speedup = rows[0][2] / wallTime
+        print("%7d  %6s  %13.1f  %7.2f  %10.2f  %6d  %13s" % (workers, pinCPUs, wallTime, speedup, speedup / workers,
+                                                               failed, equal))